@@ -1,20 +1,49 @@
+import asyncio
+import json
 from io import BytesIO
-import traceback
+import time
+import zipfile
+from typing import Optional
 
-from fastapi.responses import FileResponse, StreamingResponse
+from fastapi.responses import FileResponse, Response, StreamingResponse
 
 from backend.core.settings import settings
+from backend.services.append_service import AppendLockTimeout, AppendService, append_service
+from backend.services.diff_service import DiffService, DiffStatus, diff_service
 from backend.services.execution_service import ExecutionService, execution_service
-from backend.services.csv_service import CSVService, csv_service
+from backend.services.csv_service import (
+    COMPRESSIBLE_FORMATS,
+    PROCESSED_FORMATS,
+    CSVService,
+    ProcessedFormat,
+    csv_service,
+)
 from backend.services.llm_service import LLMService, llm_service
+from backend.services.pipeline_service import PipelineService, pipeline_service
+from backend.services.batch_service import BatchService, batch_service
+from backend.services.scheduler_service import (
+    JobPriority,
+    JobScheduler,
+    job_scheduler,
+    resolve_tenant,
+)
 from backend.core.cache_db import cache_db
-from fastapi import APIRouter, Depends, File, HTTPException, Query, status, UploadFile
+from fastapi import APIRouter, Depends, File, Header, HTTPException, Query, Request, status, UploadFile
 
 from backend.core.logging import log_error, log_request, setup_logging
+from backend.core.compression import compress_bytes, compress_stream, negotiate_encoding
+from backend.core.http_cache import bytes_etag, cache_headers, file_digest, make_etag, not_modified
+from backend.core.serialization import ResultOrient
 from backend.models.schemas import (
+    AppendResponseSchema,
+    ColumnarResultResponseSchema,
+    DiffResponseSchema,
     ErrorResponseSchema,
+    BatchResponseSchema,
     ExecuteResponseSchema,
+    JobResponseSchema,
     ProcessResponseSchema,
+    QueueMetricsSchema,
     ResultResponseSchema,
     UploadResponseSchema,
 )
@@ -22,6 +51,26 @@ from backend.models.schemas import (
 router = APIRouter()
 log = setup_logging("backend.route")
 
+JSON_MEDIA_TYPE = "application/json"
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+ARROW_STREAM_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+RESULT_MEDIA_TYPES = (JSON_MEDIA_TYPE, NDJSON_MEDIA_TYPE, ARROW_STREAM_MEDIA_TYPE)
+
+
+def encoding_headers(encoding: str | None, vary: str = "Accept-Encoding") -> dict[str, str]:
+    headers = {"Vary": vary}
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return headers
+
+
+def negotiate_media_type(accept: str, supported: tuple[str, ...]) -> str:
+    for media_range in accept.split(","):
+        media_type = media_range.split(";")[0].strip().lower()
+        if media_type in supported:
+            return media_type
+    return supported[0]
+
 
 def get_csv_service() -> CSVService:
     return csv_service
@@ -35,6 +84,34 @@ def get_execution_service() -> ExecutionService:
     return execution_service
 
 
+def get_pipeline_service() -> PipelineService:
+    return pipeline_service
+
+
+def get_batch_service() -> BatchService:
+    return batch_service
+
+
+def get_append_service() -> AppendService:
+    return append_service
+
+
+def get_diff_service() -> DiffService:
+    return diff_service
+
+
+def get_job_scheduler() -> JobScheduler:
+    return job_scheduler
+
+
+def validate_upload(file: UploadFile) -> None:
+    if not file.filename or not file.filename.endswith(".csv"):
+        raise ValueError("File must be an valid csv file")
+
+    if not file.size or file.size > settings.MAX_FILE_SIZE:
+        raise ValueError(f"File is too large (max: {settings.MAX_FILE_SIZE / 2**20:g}MB)")
+
+
 @router.post(
     "/upload",
     status_code=status.HTTP_201_CREATED,
@@ -47,23 +124,18 @@ def get_execution_service() -> ExecutionService:
 async def upload(
     file: UploadFile = File(...), csv_service: CSVService = Depends(get_csv_service)
 ):
-    log_request(f"POST /upload - filename: {file.filename}, size: {file.size}")
+    log_request("POST /upload", file_name=file.filename, size=file.size)
 
     log.info('Starting status object info into redis cache db')
     
 
     try:
-        if not file.filename or not file.filename.endswith(".csv"):
-            raise ValueError("File must be an valid csv file")
-
-        if not file.size or file.size > settings.MAX_FILE_SIZE:
-            raise ValueError("File is to large (max: 10MB)")
+        validate_upload(file)
 
         file_info = await csv_service.save_uploaded_file(file)
-        log.info(f"File {file.filename} salved successfully: {file_info.file_id}")
+        log.info("File %s salved successfully: %s", file.filename, file_info.file_id)
 
-        cache_db.initialize_hash(file_info.file_id)
-        cache_db.update_status(file_info.file_id, "uploaded", True)
+        await cache_db.initialize_hash(file_info.file_id, uploaded=True)
         log.info("File status updated into redis cache db")
 
         return UploadResponseSchema(
@@ -72,13 +144,13 @@ async def upload(
         )
 
     except ValueError as e:
-        log.error(e, "upload_csv - validation error")
+        log.exception("upload_csv failed (validation error) - %s", e)
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=str(e),
         )
     except Exception as e:
-        log.error(e, "upload_csv - unexpected error")
+        log.exception("upload_csv failed (unexpected error) - %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Sorry, internal server error",
@@ -88,62 +160,12 @@ async def upload(
 @router.post("/process")
 async def process(
     file_id: str = Query(..., description="send file id"),
-    csv_service: CSVService = Depends(get_csv_service),
-    llm_service: LLMService = Depends(get_llm_service),
+    pipeline_service: PipelineService = Depends(get_pipeline_service),
 ):
     
-    log_request(f"POST /process - file: {file_id}")
+    log_request("POST /process", file_id=file_id)
     try:
-        if not csv_service.file_exists(file_id=file_id):
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND, detail="File not found"
-            )
-        data_summary = await csv_service.get_data_summary(file_id)
-
-        prompt = f"""
-                    Analise os dados CSV abaixo e gere um script Python para limpeza:
-
-                    **Informações do Dataset:**
-                    - Arquivo: {data_summary.filename}
-                    - Linhas: {data_summary.rows_count}
-                    - Colunas: {data_summary.columns_count}
-                    - Colunas: {', '.join(data_summary.columns)}
-
-                    **Tipos de Dados:**
-                    {chr(10).join([f"- {col}: {dtype}" for col, dtype in data_summary.data_types.items()])}
-
-                    **Valores Faltantes:**
-                    {chr(10).join([f"- {col}: {count}" for col, count in data_summary.missing_values.items() if count > 0])}
-
-                    **Linhas Duplicadas:** {data_summary.duplicate_rows}
-
-                    **Amostra dos Dados:**
-                    {chr(10).join([str(row) for row in data_summary.sample_rows[:3]])}
-
-                    Gere um script Python que:
-                    1. Trate valores nulos de forma inteligente
-                    2. Remova duplicatas se necessário
-                    3. Corrija tipos de dados
-                    4. Padronize formatação (datas, emails, nomes, etc.)
-                    5. Remova linhas/colunas inválidas se necessário
-                    6. caso existe colunas com sequências numéricas, verifique se existem gaps e tente preenchê-los
-                    7. se uma sequencia de datas estiver incompleta, tente preenchê-la
-                    
-
-                    O script deve modificar o DataFrame 'df' in-place ou reatribuí-lo.
-                    """
-
-        # llm_service.initialize_gemini()
-        # system = llm_service.get_system_prompt()
-        # script = llm_service.send_gen_request(system_instruction=system, content=prompt)
-
-        llm_service.initialize_openai()
-        system = llm_service.get_system_prompt()
-        script = llm_service.send_openai_request(system_instruction=system, content=prompt)
-        await csv_service.save_script(file_id=file_id, script=script)
-        
-        log.info(f'Redis cachedb updated - Processed by LLM: {file_id}')
-        cache_db.update_status(file_id, "processed_by_llm", True)
+        script, data_summary = await pipeline_service.generate_script(file_id)
         return ProcessResponseSchema(
             file_id=file_id,
             message="Data Transformation was succesfully generated",
@@ -151,12 +173,10 @@ async def process(
             data_summary=data_summary.model_dump(),
         )
 
-    except HTTPException as http:
-        log_error(f"Error HTTP: {http}")
-        raise
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
     except Exception as exc:
-        log.error(f"Error processing file {file_id}: {exc}")
-        log.error(traceback.format_exc())
+        log.exception("Error processing file %s: %s", file_id, exc)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Error processing file with LLM",
@@ -173,39 +193,12 @@ async def process(
 )
 async def execute_script(
     file_id: str = Query(..., description="file id"),
-    csv_service: CSVService = Depends(get_csv_service),
-    execution_service: ExecutionService = Depends(get_execution_service),
+    pipeline_service: PipelineService = Depends(get_pipeline_service),
 ):
-    log_request(f"POST /execute: {file_id}")
+    log_request("POST /execute", file_id=file_id)
 
     try:
-        if not csv_service.file_exists(file_id):
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND, detail="File not found"
-            )
-
-        script = await csv_service.get_script(file_id)
-        if not script:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Script not found. Execute /process first.",
-            )
-
-        original_df = await csv_service.get_original_dataframe(file_id)
-        print(original_df.head())
-        result = await execution_service.execute_script(script, original_df)
-
-        if not result:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Error when trying to execute script: {result.error_message}",
-            )
-
-        await csv_service.save_processed_data(file_id, result.processed_dataframe)
-        log.info(f"Script successfully executed into file_id: {file_id}")
-
-        log.info(f'Redis cachedb updated - Script executed: {file_id}')
-        cache_db.update_status(file_id, "script_executed", True)
+        result = await pipeline_service.run_script(file_id)
 
         return ExecuteResponseSchema(
             file_id=file_id,
@@ -215,51 +208,236 @@ async def execute_script(
             processed_rows=result.processed_rows,
         )
 
-    except HTTPException:
-        raise
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     except Exception as e:
-        log.error(f"Error executing script for file {file_id}: {e}")
-        log.error(traceback.format_exc())
+        log.exception("Error executing script for file %s: %s", file_id, e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Error when trying to execute script",
         )
 
 
+@router.post(
+    "/append/{file_id}",
+    response_model=AppendResponseSchema,
+    responses={
+        400: {"model": ErrorResponseSchema},
+        404: {"model": ErrorResponseSchema},
+        409: {"model": ErrorResponseSchema},
+    },
+)
+async def append_rows(
+    file_id: str,
+    file: UploadFile = File(...),
+    append_service: AppendService = Depends(get_append_service),
+):
+    log_request("POST /append", file_id=file_id, file_name=file.filename, size=file.size)
+
+    try:
+        validate_upload(file)
+        # só as linhas novas passam pelo script quando ele é linha a linha
+        return await append_service.append(file_id, file)
+
+    except AppendLockTimeout as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        log.exception("Error appending rows to file %s: %s", file_id, e)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Error when trying to append rows",
+        )
+
+
+@router.post(
+    "/jobs",
+    status_code=status.HTTP_202_ACCEPTED,
+    response_model=JobResponseSchema,
+    responses={
+        400: {"model": ErrorResponseSchema},
+    },
+)
+async def create_job(
+    file: UploadFile = File(...),
+    priority: JobPriority = Query("normal", description="high | normal | low"),
+    x_api_key: Optional[str] = Header(None),
+    x_tenant_id: Optional[str] = Header(None),
+    csv_service: CSVService = Depends(get_csv_service),
+    pipeline_service: PipelineService = Depends(get_pipeline_service),
+):
+    log_request("POST /jobs", file_name=file.filename, size=file.size)
+
+    try:
+        validate_upload(file)
+        file_info = await csv_service.save_uploaded_file(file)
+        await cache_db.initialize_hash(file_info.file_id, uploaded=True)
+        # o id do job é o próprio file_id: status, /result e /download seguem valendo
+        tenant = resolve_tenant(x_api_key, x_tenant_id)
+        await pipeline_service.submit_job(file_info.file_id, tenant, priority, file.size)
+        log.info("Job %s queued for %s", file_info.file_id, file.filename)
+
+        return JobResponseSchema(
+            job_id=file_info.file_id,
+            job_state="queued",
+            job_tenant=tenant,
+            job_priority=priority,
+        )
+
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        log.exception("Error creating job for %s: %s", file.filename, e)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Sorry, internal server error",
+        )
+
+
+@router.post(
+    "/batch",
+    response_model=BatchResponseSchema,
+    responses={
+        400: {"model": ErrorResponseSchema},
+    },
+)
+async def batch(
+    files: list[UploadFile] = File(..., description="csv files and/or zip archives"),
+    batch_service: BatchService = Depends(get_batch_service),
+):
+    log_request("POST /batch", files=len(files))
+
+    try:
+        entries = await batch_service.read_files(files)
+    except (ValueError, zipfile.BadZipFile) as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    try:
+        return await batch_service.run_batch(entries)
+    except Exception as e:
+        log.exception("Error processing batch: %s", e)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Error processing batch",
+        )
+
+
+@router.get("/jobs/metrics", response_model=QueueMetricsSchema)
+async def jobs_metrics(scheduler: JobScheduler = Depends(get_job_scheduler)):
+    return await scheduler.metrics()
+
+
 @router.get(
+    "/jobs/{job_id}",
+    response_model=JobResponseSchema,
+    responses={404: {"model": ErrorResponseSchema}},
+)
+async def get_job(job_id: str):
+    status_info = await cache_db.get_status(job_id)
+    if not status_info or "job_state" not in status_info:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found")
+
+    return JobResponseSchema(
+        job_id=job_id,
+        job_state=status_info.pop("job_state"),
+        job_stage=status_info.pop("job_stage", None) or None,
+        job_error=status_info.pop("job_error", None) or None,
+        job_tenant=status_info.pop("job_tenant", None),
+        job_priority=status_info.pop("job_priority", None),
+        status=status_info,
+    )
+
+
+@router.delete(
+    "/jobs/{job_id}",
+    response_model=JobResponseSchema,
+    responses={
+        404: {"model": ErrorResponseSchema},
+        409: {"model": ErrorResponseSchema},
+    },
+)
+async def cancel_job(
+    job_id: str, pipeline_service: PipelineService = Depends(get_pipeline_service)
+):
+    log_request("DELETE /jobs", job_id=job_id)
+
+    if await pipeline_service.cancel_job(job_id):
+        return await get_job(job_id)
+
+    status_info = await cache_db.get_status(job_id)
+    if not status_info or "job_state" not in status_info:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found")
+    raise HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail=f"Job is {status_info['job_state']} and can no longer be cancelled",
+    )
+
+
+@router.api_route(
     "/download/{file_id}",
+    methods=["GET", "HEAD"],
     responses={
         404: {"model": ErrorResponseSchema},
     },
 )
-async def download(file_id: str, csv_service: CSVService = Depends(get_csv_service)):
-    log_request(f"GET /result - file: {file_id}")
+async def download(
+    file_id: str,
+    request: Request,
+    format: ProcessedFormat = Query("csv", description="csv, parquet, feather/arrow, jsonl or xlsx"),
+    csv_service: CSVService = Depends(get_csv_service),
+):
+    log_request("GET /download", file_id=file_id)
 
     try:
-        if not csv_service.processed_file_exists(file_id):
+        if not await csv_service.processed_file_exists(file_id):
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Arquivo processado não encontrado. Execute /execute primeiro.",
             )
 
-        processed_path = csv_service.processed_dir / f"{file_id}_processed.csv"
-        print("File status updated into redis cache db - ready: True")
-        print('file path: ' + str(processed_path))
-        
+        if not csv_service.format_available(format):
+            raise HTTPException(
+                status_code=status.HTTP_406_NOT_ACCEPTABLE,
+                detail=f"Format {format} is not available on this server",
+            )
+
+        processed_path = await csv_service.get_processed_file(file_id, format)
+        extension, media_type = PROCESSED_FORMATS[format]
+        encoding = None
+        if format in COMPRESSIBLE_FORMATS:
+            encoding = negotiate_encoding(request.headers.get("accept-encoding", ""))
+        if encoding:
+            processed_path = await csv_service.get_compressed_processed_file(
+                file_id, encoding, format
+            )
+
+        # cada variante (formato + encoding) tem bytes próprios, logo ETag próprio
+        etag = f'"{await file_digest(processed_path)}"'
+        if cached := not_modified(request, etag, vary="Accept-Encoding"):
+            await cache_db.touch(file_id)
+            return cached
+
+        log.debug("File status updated into redis cache db - ready: True - path: %s", processed_path)
 
-        cache_db.update_status(file_id, "ready", True)
-        print(f'File status updated into redis cachedb - {cache_db.get_status(file_id)}')
+        await cache_db.update_status(file_id, "ready", True)
         # cache_db.delete_status()
+        # Range/If-Range são tratados pelo FileResponse usando o ETag abaixo
         return FileResponse(
             path=str(processed_path),
-            media_type='text/csv',
-            filename=f"{file_id}_report_processed.csv",
+            media_type=media_type,
+            filename=f"{file_id}_report_processed.{extension}",
+            headers={**encoding_headers(encoding), **cache_headers(etag)},
         )
 
     except HTTPException:
         raise
     except Exception as e:
-        log.error(f"Error getting result for file {file_id}: {e}")
+        log.error("Error getting result for file %s: %s", file_id, e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Eror to get result",
@@ -268,56 +446,141 @@ async def download(file_id: str, csv_service: CSVService = Depends(get_csv_servi
 @router.get(
     "/result/{file_id}",
     responses={
+        200: {"model": ResultResponseSchema | ColumnarResultResponseSchema},
         404: {"model": ErrorResponseSchema},
     },
 )
-async def get_result(file_id: str, csv_service: CSVService = Depends(get_csv_service)):
-    log_request(f"GET /result - file: {file_id}")
+async def get_result(
+    file_id: str,
+    request: Request,
+    orient: ResultOrient = Query(
+        "records", description="records: one object per row; columns: one array per column"
+    ),
+    csv_service: CSVService = Depends(get_csv_service),
+):
+    log_request("GET /result", file_id=file_id)
 
     try:
-        if not csv_service.processed_file_exists(file_id):
+        if not await csv_service.processed_file_exists(file_id):
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Arquivo processado não encontrado. Execute /execute primeiro.",
             )
 
-        processed_path = csv_service.processed_dir / f"{file_id}_processed.csv"
-        processed_data = await csv_service.get_processed_data(file_id)
-        print("File status updated into redis cache db - ready: True")
-        print('file path: ' + str(processed_path))
-        
+        media_type = negotiate_media_type(
+            request.headers.get("accept", ""), RESULT_MEDIA_TYPES
+        )
+        encoding = negotiate_encoding(request.headers.get("accept-encoding", ""))
+
+        # o ETag é derivado do hash do artefato, então um 304 não lê nem serializa nada
+        processed_path = await csv_service.get_processed_file(file_id)
+        if processed_path.stat().st_size < settings.COMPRESSION_MIN_SIZE:
+            encoding = None
+        vary = "Accept, Accept-Encoding"
+        etag = make_etag(
+            await file_digest(processed_path), media_type, orient, encoding or "identity"
+        )
+        if cached := not_modified(request, etag, vary=vary):
+            await cache_db.touch(file_id)
+            return cached
+
+        if media_type in (NDJSON_MEDIA_TYPE, ARROW_STREAM_MEDIA_TYPE):
+            if media_type == NDJSON_MEDIA_TYPE:
+                chunks = csv_service.iter_processed_ndjson(file_id)
+            else:
+                if not csv_service.arrow_available():
+                    raise HTTPException(
+                        status_code=status.HTTP_406_NOT_ACCEPTABLE,
+                        detail="Arrow IPC streaming is not available on this server",
+                    )
+                chunks = csv_service.iter_processed_arrow(file_id)
+
+            await cache_db.update_status(file_id, "ready", True)
+            return StreamingResponse(
+                compress_stream(chunks, encoding) if encoding else chunks,
+                media_type=media_type,
+                headers={**encoding_headers(encoding, vary), **cache_headers(etag)},
+            )
 
-        cache_db.update_status(file_id, "ready", True)
-        return ResultResponseSchema(
-            file_id=file_id,
-            message="Dados processados obtidos com sucesso",
-            data=processed_data.data,
-            columns=processed_data.columns,
-            rows_count=processed_data.rows_count,
+        payload = await csv_service.get_processed_payload(file_id, orient)
+        if encoding:
+            payload = await asyncio.get_event_loop().run_in_executor(
+                None, compress_bytes, payload, encoding
+            )
+
+        await cache_db.update_status(file_id, "ready", True)
+        return Response(
+            content=payload,
+            media_type=JSON_MEDIA_TYPE,
+            headers={**encoding_headers(encoding, vary), **cache_headers(etag)},
         )
 
     except HTTPException:
         raise
     except Exception as e:
-        log.error(f"Error getting result for file {file_id}: {e}")
+        log.error("Error getting result for file %s: %s", file_id, e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Eror to get result",
         )
 
 
+@router.get(
+    "/diff/{file_id}",
+    response_model=DiffResponseSchema,
+    responses={
+        400: {"model": ErrorResponseSchema},
+        404: {"model": ErrorResponseSchema},
+    },
+)
+async def get_diff(
+    file_id: str,
+    key: Optional[list[str]] = Query(None, description="columns that identify a row (default: tracked lineage)"),
+    status_filter: DiffStatus = Query("all", alias="status", description="all | changed | added | dropped"),
+    page: int = Query(1, ge=1),
+    page_size: int = Query(100, ge=1, le=1000),
+    diff_service: DiffService = Depends(get_diff_service),
+):
+    log_request("GET /diff", file_id=file_id)
+
+    try:
+        if not diff_service.available():
+            raise HTTPException(
+                status_code=status.HTTP_406_NOT_ACCEPTABLE,
+                detail="Diff reports are not available on this server",
+            )
+
+        # o diff é recalculado só quando o arquivo processado muda
+        diff = await diff_service.diff(file_id, key, status_filter, page, page_size)
+        await cache_db.touch(file_id)
+        return diff
+
+    except HTTPException:
+        raise
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        log.exception("Error building diff for file %s: %s", file_id, e)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Error when trying to build the diff",
+        )
+
+
 @router.get('/clean/{file_id}')
 async def clean(file_id: str):
-    print(f'File status updated into redis cachedb - {cache_db.get_status(file_id)}')
-    cache_db.delete_status(file_id)
+    log.debug("Clearing status for %s", file_id)
+    await cache_db.delete_status(file_id)
 
 @router.get("/status/{file_id}", responses={404: {"model": ErrorResponseSchema}})
 async def get_status(file_id: str, csv_service: CSVService = Depends(get_csv_service)):
-    log_request(f"GET /status - file: {file_id}")
+    log_request("GET /status", file_id=file_id)
 
     try:
-        has_original = csv_service.file_exists(file_id)
-        status_info = cache_db.get_status(file_id)
+        has_original = await csv_service.file_exists(file_id)
+        status_info = await cache_db.get_status(file_id)
 
         if not has_original or not status_info:
             raise HTTPException(
@@ -329,15 +592,79 @@ async def get_status(file_id: str, csv_service: CSVService = Depends(get_csv_ser
     except HTTPException:
         raise
     except Exception as e:
-        log.error(f"Error getting status for file {file_id}: {e}")
+        log.error("Error getting status for file %s: %s", file_id, e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Error retrieving status",
         )
 
 
+TERMINAL_JOB_STATES = ("done", "failed", "cancelled")
+
+
+def format_sse(data: dict, event: str = "status") -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def stream_end_reason(status_info: dict) -> Optional[str]:
+    if status_info.get("ready"):
+        return "ready"
+    if status_info.get("job_state") in TERMINAL_JOB_STATES:
+        return status_info["job_state"]
+    return None
+
+
+@router.get("/status/{file_id}/stream", responses={404: {"model": ErrorResponseSchema}})
+async def stream_status(
+    file_id: str, request: Request, csv_service: CSVService = Depends(get_csv_service)
+):
+    log_request("GET /status/stream", file_id=file_id)
+
+    if not await csv_service.file_exists(file_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="File not found"
+        )
+
+    async def events():
+        # assina antes de ler o snapshot para não perder transições entre os dois
+        async with cache_db.subscribe(file_id) as updates:
+            status_info = await cache_db.get_status(file_id)
+            yield format_sse(status_info)
+
+            # o stream sempre termina com um evento "end": pronto, job encerrado
+            # (done/failed/cancelled) ou prazo esgotado sem nenhum dos dois
+            deadline = time.monotonic() + settings.STATUS_STREAM_MAX_SECONDS
+            while (reason := stream_end_reason(status_info)) is None:
+                if await request.is_disconnected():
+                    return
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    reason = "timeout"
+                    break
+                try:
+                    fields = await asyncio.wait_for(
+                        updates.get(), timeout=min(settings.STATUS_STREAM_KEEPALIVE, remaining)
+                    )
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+
+                status_info = {**status_info, **fields}
+                yield format_sse(status_info)
+
+            yield format_sse({"reason": reason, "job_error": status_info.get("job_error") or None}, "end")
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.get("/script/{file_id}", responses={404: {"model": ErrorResponseSchema}})
-async def get_script(file_id: str, csv_service: CSVService = Depends(get_csv_service)):
+async def get_script(
+    file_id: str, request: Request, csv_service: CSVService = Depends(get_csv_service)
+):
     try:
         script = await csv_service.get_script(file_id)
         if not script:
@@ -345,16 +672,25 @@ async def get_script(file_id: str, csv_service: CSVService = Depends(get_csv_ser
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Script not found for this file_id",
             )
-        file_stream = BytesIO(script.encode('utf-8'))
+        content = script.encode('utf-8')
+        etag = bytes_etag(content)
+        if cached := not_modified(request, etag):
+            await cache_db.touch(file_id)
+            return cached
+
+        file_stream = BytesIO(content)
         return StreamingResponse(
             file_stream,
             media_type="application/octet-stream",
-            headers={"Content-Disposition": f"attachment; filename={file_id}_script.py"},
+            headers={
+                "Content-Disposition": f"attachment; filename={file_id}_script.py",
+                **cache_headers(etag),
+            },
         )
     except HTTPException:
         raise
     except Exception as e:
-        log.error(f"Error getting script for file {file_id}: {e}")
+        log.error("Error getting script for file %s: %s", file_id, e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Error retrieving script",
@@ -1,27 +1,116 @@
-import redis
-
-class RedisCacheDB:
-    def __init__(self, host='localhost', port=6379, db=0):
-        self.client = redis.StrictRedis(host=host, port=port, db=db, decode_responses=True)
-    
-    def initialize_hash(self, file_id: str):
-        file_id = file_id
-        key = f"file_status:{file_id}"
-        self.client.hset(key, mapping={
-            "file_id": file_id,
-            "uploaded": "False",
-            "processed_by_llm": "False",
-            "script_executed": "False",
-            "ready": "False",
-        })
-    
-    def update_status(self, file_id: str, field: str, value: bool):
-        key = f"file_status:{file_id}"
-        self.client.hset(key, field, str(value))
-    
-    def get_status(self, file_id: str):
-        key = f"file_status:{file_id}"
-        status_info = self.client.hgetall(key)
+import asyncio
+import heapq
+import json
+import time
+import uuid
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+
+import redis.asyncio as redis
+from cachetools import TTLCache
+
+from backend.core.logging import setup_logging
+from backend.core.metrics import record_cache
+from backend.core.settings import settings
+
+log = setup_logging("backend.cache_db")
+
+STATUS_FIELDS = ("uploaded", "processed_by_llm", "script_executed", "ready")
+STATUS_CHANNEL_PREFIX = "file_status_events:"
+LAST_ACCESS_KEY = "artifacts:last_access"
+JOB_TENANTS_KEY = "jobs:tenants"  # anel round-robin com os tenants que têm jobs na fila
+JOB_TENANT_PREFIX = "jobs:tenant:"  # zset por tenant: job_id -> score (menor sai primeiro)
+JOB_META_KEY = "jobs:meta"  # job_id -> "tenant|priority|enqueued_at"
+JOB_WAKEUP_KEY = "jobs:wakeup"  # sinal para os workers bloqueados em BRPOP
+JOB_WAIT_SAMPLES_KEY = "jobs:wait_samples"  # "priority|segundos" dos últimos jobs iniciados
+JOB_WAIT_SAMPLES = 1000
+
+# o invariante "tenant está no anel <=> seu zset não está vazio" só é mantido
+# porque enqueue, dequeue e cancel rodam atomicamente no Redis
+ENQUEUE_SCRIPT = """
+local tenant_key = KEYS[3] .. ARGV[2]
+redis.call('ZADD', tenant_key, ARGV[3], ARGV[1])
+redis.call('HSET', KEYS[2], ARGV[1], ARGV[2] .. '|' .. ARGV[4] .. '|' .. ARGV[5])
+if redis.call('ZCARD', tenant_key) == 1 then
+    redis.call('RPUSH', KEYS[1], ARGV[2])
+end
+redis.call('LPUSH', KEYS[4], '1')
+redis.call('LTRIM', KEYS[4], 0, tonumber(ARGV[6]) - 1)
+return 1
+"""
+
+DEQUEUE_SCRIPT = """
+local tenants = redis.call('LLEN', KEYS[1])
+for _ = 1, tenants do
+    local tenant = redis.call('LMOVE', KEYS[1], KEYS[1], 'LEFT', 'RIGHT')
+    if not tenant then
+        return false
+    end
+    local tenant_key = KEYS[3] .. tenant
+    local popped = redis.call('ZPOPMIN', tenant_key)
+    if redis.call('ZCARD', tenant_key) == 0 then
+        redis.call('LREM', KEYS[1], 0, tenant)
+    end
+    if popped[1] then
+        local job_id = popped[1]
+        local meta = redis.call('HGET', KEYS[2], job_id)
+        redis.call('HDEL', KEYS[2], job_id)
+        if meta then
+            local _, _, priority, enqueued_at = string.find(meta, '^[^|]*|([^|]*)|(.*)$')
+            local now = redis.call('TIME')
+            local wait = tonumber(now[1]) + tonumber(now[2]) / 1000000 - tonumber(enqueued_at)
+            redis.call('LPUSH', KEYS[4], priority .. '|' .. string.format('%.3f', wait))
+            redis.call('LTRIM', KEYS[4], 0, tonumber(ARGV[1]) - 1)
+        end
+        return job_id
+    end
+end
+return false
+"""
+
+CANCEL_SCRIPT = """
+local meta = redis.call('HGET', KEYS[2], ARGV[1])
+if not meta then
+    return 0
+end
+local tenant = string.match(meta, '^([^|]*)|')
+local tenant_key = KEYS[3] .. tenant
+redis.call('ZREM', tenant_key, ARGV[1])
+redis.call('HDEL', KEYS[2], ARGV[1])
+if redis.call('ZCARD', tenant_key) == 0 then
+    redis.call('LREM', KEYS[1], 0, tenant)
+end
+return 1
+"""
+
+# só quem adquiriu o lock o remove: se o TTL venceu e outro worker pegou o lock,
+# o DEL incondicional apagaria o lock dele
+RELEASE_LOCK_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+# base comum aos backends: chaves, conversão de booleanos e fan-out local de eventos
+class CacheDB:
+    def __init__(self) -> None:
+        self._listeners: dict[str, set[asyncio.Queue]] = {}
+
+    def _key(self, file_id: str) -> str:
+        return f"file_status:{file_id}"
+
+    def _channel(self, file_id: str) -> str:
+        return f"{STATUS_CHANNEL_PREFIX}{file_id}"
+
+    def _initial_mapping(self, file_id: str, fields: dict[str, bool]) -> dict[str, str]:
+        mapping = {"file_id": file_id, **{field: "False" for field in STATUS_FIELDS}}
+        mapping.update({field: str(value) for field, value in fields.items()})
+        return mapping
+
+    def _decode(self, status_info: dict) -> dict:
         for k, v in status_info.items():
             if v == "True":
                 status_info[k] = True
@@ -29,9 +118,357 @@ class RedisCacheDB:
                 status_info[k] = False
         return status_info
 
-    def delete_status(self, file_id: str):
-        key = f"file_status:{file_id}"
-        deleted = self.client.delete(key)
+    def _dispatch(self, file_id: str, fields: dict) -> None:
+        if not fields:
+            return
+        for queue in self._listeners.get(file_id, ()):
+            queue.put_nowait(self._decode(dict(fields)))
+
+    async def _start_listening(self) -> None:
+        pass
+
+    @asynccontextmanager
+    async def subscribe(self, file_id: str) -> AsyncIterator[asyncio.Queue]:
+        await self._start_listening()
+        queue: asyncio.Queue = asyncio.Queue()
+        self._listeners.setdefault(file_id, set()).add(queue)
+        try:
+            yield queue
+        finally:
+            listeners = self._listeners.get(file_id)
+            if listeners is not None:
+                listeners.discard(queue)
+                if not listeners:
+                    del self._listeners[file_id]
+
+    async def update_status(self, file_id: str, field: str, value: bool):
+        await self.update_statuses(file_id, {field: value})
+
+
+class RedisCacheDB(CacheDB):
+    def __init__(
+        self,
+        host: str = settings.REDIS_HOST,
+        port: int = settings.REDIS_PORT,
+        db: int = settings.REDIS_DB,
+        max_connections: int = settings.REDIS_MAX_CONNECTIONS,
+    ):
+        super().__init__()
+        # um único pool compartilhado por todas as requisições do processo
+        self.pool = redis.ConnectionPool(
+            host=host,
+            port=port,
+            db=db,
+            max_connections=max_connections,
+            decode_responses=True,
+        )
+        self.client = redis.Redis(connection_pool=self.pool)
+        self._listener_task: Optional[asyncio.Task] = None
+        self._listening = asyncio.Event()
+        # L1 em processo com hashes já decodificados; o Redis é o L2
+        self._local: TTLCache = TTLCache(
+            maxsize=settings.STATUS_L1_MAXSIZE, ttl=settings.STATUS_L1_TTL
+        )
+        self._enqueue_script = self.client.register_script(ENQUEUE_SCRIPT)
+        self._dequeue_script = self.client.register_script(DEQUEUE_SCRIPT)
+        self._cancel_script = self.client.register_script(CANCEL_SCRIPT)
+        self._release_lock_script = self.client.register_script(RELEASE_LOCK_SCRIPT)
+
+    async def initialize_hash(self, file_id: str, **fields: bool):
+        mapping = self._initial_mapping(file_id, fields)
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.hset(self._key(file_id), mapping=mapping)
+            pipe.expire(self._key(file_id), settings.STATUS_TTL_SECONDS)
+            pipe.zadd(LAST_ACCESS_KEY, {file_id: time.time()})
+            pipe.publish(self._channel(file_id), json.dumps(mapping))
+            await pipe.execute()
+        self._local.pop(file_id, None)
+
+    async def update_statuses(self, file_id: str, fields: dict[str, bool | str]):
+        mapping = {field: str(value) for field, value in fields.items()}
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.hset(self._key(file_id), mapping=mapping)
+            pipe.expire(self._key(file_id), settings.STATUS_TTL_SECONDS)
+            pipe.zadd(LAST_ACCESS_KEY, {file_id: time.time()})
+            pipe.publish(self._channel(file_id), json.dumps(mapping))
+            await pipe.execute()
+        self._local.pop(file_id, None)
+
+    async def get_status(self, file_id: str):
+        self._ensure_listener()
+        # sem o listener ativo não há invalidação, então o L1 é ignorado
+        use_local = self._listening.is_set()
+        if use_local and (status_info := self._local.get(file_id)) is not None:
+            record_cache("status_l1", True)
+            return dict(status_info)
+        record_cache("status_l1", False)
+
+        status_info = self._decode(await self.client.hgetall(self._key(file_id)))
+        if use_local and status_info:
+            self._local[file_id] = dict(status_info)
+        return status_info
+
+    async def get_statuses(self, file_ids: list[str]) -> list[dict]:
+        async with self.client.pipeline(transaction=False) as pipe:
+            for file_id in file_ids:
+                pipe.hgetall(self._key(file_id))
+            results = await pipe.execute()
+        return [self._decode(status_info) for status_info in results]
+
+    async def delete_status(self, file_id: str):
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.delete(self._key(file_id))
+            pipe.publish(self._channel(file_id), json.dumps({}))
+            deleted, _ = await pipe.execute()
+        self._local.pop(file_id, None)
         return deleted > 0
 
-cache_db = RedisCacheDB(host='cachedb', port=6379, db=0)
\ No newline at end of file
+    async def touch(self, file_id: str) -> None:
+        await self.client.zadd(LAST_ACCESS_KEY, {file_id: time.time()})
+
+    async def get_last_access(self) -> dict[str, float]:
+        return dict(await self.client.zrange(LAST_ACCESS_KEY, 0, -1, withscores=True))
+
+    async def purge(self, file_id: str) -> None:
+        # remove hash e registro de acesso numa única transação e avisa os outros workers
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.delete(self._key(file_id))
+            pipe.zrem(LAST_ACCESS_KEY, file_id)
+            pipe.publish(self._channel(file_id), json.dumps({}))
+            await pipe.execute()
+        self._local.pop(file_id, None)
+
+    async def try_lock(self, name: str, ttl: int) -> Optional[str]:
+        # devolve o token do dono, exigido para liberar o lock
+        token = uuid.uuid4().hex
+        if await self.client.set(f"lock:{name}", token, nx=True, ex=ttl):
+            return token
+        return None
+
+    async def release_lock(self, name: str, token: str) -> bool:
+        return bool(await self._release_lock_script(keys=[f"lock:{name}"], args=[token]))
+
+    async def enqueue_job(
+        self, job_id: str, tenant: str, score: float, priority: str
+    ) -> None:
+        await self._enqueue_script(
+            keys=[JOB_TENANTS_KEY, JOB_META_KEY, JOB_TENANT_PREFIX, JOB_WAKEUP_KEY],
+            args=[job_id, tenant, score, priority, time.time(), JOB_WAIT_SAMPLES],
+        )
+
+    async def dequeue_job(self, timeout: int) -> Optional[str]:
+        keys = [JOB_TENANTS_KEY, JOB_META_KEY, JOB_TENANT_PREFIX, JOB_WAIT_SAMPLES_KEY]
+        deadline = time.monotonic() + timeout
+        while True:
+            job_id = await self._dequeue_script(keys=keys, args=[JOB_WAIT_SAMPLES])
+            if job_id:
+                return job_id
+            # fila vazia: bloqueia até um enqueue sinalizar; sinais que sobraram
+            # de jobs já consumidos só custam uma volta a mais no laço
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            if await self.client.brpop([JOB_WAKEUP_KEY], timeout=remaining) is None:
+                return None
+
+    async def cancel_job(self, job_id: str) -> bool:
+        return bool(
+            await self._cancel_script(
+                keys=[JOB_TENANTS_KEY, JOB_META_KEY, JOB_TENANT_PREFIX], args=[job_id]
+            )
+        )
+
+    async def get_queue_depths(self) -> dict[str, int]:
+        tenants = await self.client.lrange(JOB_TENANTS_KEY, 0, -1)
+        async with self.client.pipeline(transaction=False) as pipe:
+            for tenant in tenants:
+                pipe.zcard(f"{JOB_TENANT_PREFIX}{tenant}")
+            depths = await pipe.execute()
+        return dict(zip(tenants, depths))
+
+    async def get_wait_samples(self) -> list[tuple[str, float]]:
+        samples = await self.client.lrange(JOB_WAIT_SAMPLES_KEY, 0, -1)
+        return [
+            (priority, float(wait))
+            for priority, _, wait in (sample.partition("|") for sample in samples)
+        ]
+
+    def _ensure_listener(self) -> None:
+        if self._listener_task is None or self._listener_task.done():
+            self._listener_task = asyncio.create_task(self._listen())
+
+    async def _start_listening(self) -> None:
+        self._ensure_listener()
+        # garante que o psubscribe terminou antes de o chamador ler o snapshot
+        try:
+            await asyncio.wait_for(self._listening.wait(), timeout=5)
+        except asyncio.TimeoutError:
+            log.warning("Status listener is not subscribed yet")
+
+    async def _listen(self) -> None:
+        # uma única conexão pub/sub por processo, repassada para as filas locais
+        while True:
+            pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.psubscribe(f"{STATUS_CHANNEL_PREFIX}*")
+                # eventos perdidos enquanto desconectado podem ter deixado o L1 obsoleto
+                self._local.clear()
+                self._listening.set()
+                async for message in pubsub.listen():
+                    file_id = message["channel"][len(STATUS_CHANNEL_PREFIX):]
+                    self._local.pop(file_id, None)
+                    self._dispatch(file_id, json.loads(message["data"]))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                log.error("Status listener disconnected, retrying: %s", e)
+                await asyncio.sleep(1)
+            finally:
+                self._listening.clear()
+                await pubsub.aclose()
+
+    async def close(self) -> None:
+        if self._listener_task is not None:
+            self._listener_task.cancel()
+        await self.client.aclose()
+        await self.pool.disconnect()
+
+
+# backend em memória para testes e instâncias de um único processo
+class InMemoryCacheDB(CacheDB):
+    def __init__(self) -> None:
+        super().__init__()
+        # guarda os valores já decodificados, então leituras não convertem nada
+        self._hashes: dict[str, dict] = {}
+        self._last_access: dict[str, float] = {}
+        self._locks: dict[str, tuple[str, float]] = {}  # nome -> (token, expira em)
+        self._tenants: deque[str] = deque()
+        self._tenant_jobs: dict[str, list[tuple[float, str]]] = {}
+        self._job_meta: dict[str, tuple[str, str, float]] = {}
+        self._wait_samples: deque[tuple[str, float]] = deque(maxlen=JOB_WAIT_SAMPLES)
+        self._jobs_ready: Optional[asyncio.Condition] = None
+
+    async def initialize_hash(self, file_id: str, **fields: bool):
+        mapping = self._initial_mapping(file_id, fields)
+        self._hashes.setdefault(file_id, {}).update(self._decode(dict(mapping)))
+        self._last_access[file_id] = time.time()
+        self._dispatch(file_id, mapping)
+
+    async def update_statuses(self, file_id: str, fields: dict[str, bool | str]):
+        self._hashes.setdefault(file_id, {}).update(fields)
+        self._last_access[file_id] = time.time()
+        self._dispatch(file_id, {field: str(value) for field, value in fields.items()})
+
+    async def get_status(self, file_id: str):
+        return dict(self._hashes.get(file_id, {}))
+
+    async def get_statuses(self, file_ids: list[str]) -> list[dict]:
+        return [await self.get_status(file_id) for file_id in file_ids]
+
+    async def delete_status(self, file_id: str):
+        return self._hashes.pop(file_id, None) is not None
+
+    async def touch(self, file_id: str) -> None:
+        self._last_access[file_id] = time.time()
+
+    async def get_last_access(self) -> dict[str, float]:
+        return dict(self._last_access)
+
+    async def purge(self, file_id: str) -> None:
+        self._hashes.pop(file_id, None)
+        self._last_access.pop(file_id, None)
+
+    async def try_lock(self, name: str, ttl: int) -> Optional[str]:
+        now = time.time()
+        if name in self._locks and self._locks[name][1] > now:
+            return None
+        token = uuid.uuid4().hex
+        self._locks[name] = (token, now + ttl)
+        return token
+
+    async def release_lock(self, name: str, token: str) -> bool:
+        # mesma semântica do Redis: lock expirado ou de outro dono fica onde está
+        held = self._locks.get(name)
+        if held is None or held[0] != token or held[1] <= time.time():
+            return False
+        del self._locks[name]
+        return True
+
+    def _job_signal(self) -> asyncio.Condition:
+        # criada sob demanda para ficar presa ao event loop em execução
+        if self._jobs_ready is None:
+            self._jobs_ready = asyncio.Condition()
+        return self._jobs_ready
+
+    def _pop_job(self) -> Optional[str]:
+        # mesma política do script Lua: round-robin entre tenants, menor score primeiro
+        while self._tenants:
+            tenant = self._tenants[0]
+            self._tenants.rotate(-1)
+            queue = self._tenant_jobs[tenant]
+            job_id = None
+            while queue and job_id is None:
+                _, candidate = heapq.heappop(queue)
+                if candidate in self._job_meta:
+                    job_id = candidate
+            if not queue:
+                self._tenants.remove(tenant)
+                del self._tenant_jobs[tenant]
+            if job_id is not None:
+                _, priority, enqueued_at = self._job_meta.pop(job_id)
+                self._wait_samples.appendleft((priority, time.time() - enqueued_at))
+                return job_id
+        return None
+
+    async def enqueue_job(
+        self, job_id: str, tenant: str, score: float, priority: str
+    ) -> None:
+        if tenant not in self._tenant_jobs:
+            self._tenant_jobs[tenant] = []
+            self._tenants.append(tenant)
+        heapq.heappush(self._tenant_jobs[tenant], (score, job_id))
+        self._job_meta[job_id] = (tenant, priority, time.time())
+        async with self._job_signal():
+            self._job_signal().notify()
+
+    async def dequeue_job(self, timeout: int) -> Optional[str]:
+        async with self._job_signal():
+            try:
+                await asyncio.wait_for(
+                    self._job_signal().wait_for(lambda: bool(self._job_meta)), timeout=timeout
+                )
+            except asyncio.TimeoutError:
+                return None
+            return self._pop_job()
+
+    async def cancel_job(self, job_id: str) -> bool:
+        # o heap mantém a entrada; ela é descartada quando chegar ao topo
+        meta = self._job_meta.pop(job_id, None)
+        if meta is None:
+            return False
+        tenant = meta[0]
+        if not any(candidate in self._job_meta for _, candidate in self._tenant_jobs[tenant]):
+            self._tenants.remove(tenant)
+            del self._tenant_jobs[tenant]
+        return True
+
+    async def get_queue_depths(self) -> dict[str, int]:
+        depths: dict[str, int] = {}
+        for tenant, _, _ in self._job_meta.values():
+            depths[tenant] = depths.get(tenant, 0) + 1
+        return depths
+
+    async def get_wait_samples(self) -> list[tuple[str, float]]:
+        return list(self._wait_samples)
+
+    async def close(self) -> None:
+        self._listeners.clear()
+
+
+def create_cache_db() -> CacheDB:
+    if settings.CACHE_BACKEND == "memory":
+        return InMemoryCacheDB()
+    return RedisCacheDB()
+
+
+cache_db = create_cache_db()
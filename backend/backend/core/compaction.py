@@ -0,0 +1,99 @@
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from backend.core.settings import settings
+
+try:
+    import pyarrow  # noqa: F401
+
+    ARROW_STRINGS = True
+except ImportError:  # sem pyarrow, texto de alta cardinalidade continua object
+    ARROW_STRINGS = False
+
+# tipos originais das colunas compactadas, para desfazer a compactação se preciso
+ORIGINAL_DTYPES_ATTR = "compacted_dtypes"
+
+INT32 = np.iinfo(np.int32)
+
+
+def _compact_series(series: pd.Series, category_max_ratio: float) -> Optional[pd.Series]:
+    kind = series.dtype.kind
+
+    if kind == "i" and series.dtype.itemsize > 4:
+        # nunca abaixo de int32: scripts que fazem contas em int8/int16 estouram calados
+        if len(series) and INT32.min <= series.min() and series.max() <= INT32.max:
+            return series.astype(np.int32)
+        return None
+
+    if kind == "f" and series.dtype.itemsize > 4:
+        # só quando todo valor cabe exato em float32
+        compacted = series.astype(np.float32)
+        if (compacted.astype(np.float64).eq(series) | series.isna()).all():
+            return compacted
+        return None
+
+    if kind == "O" and pd.api.types.infer_dtype(series, skipna=True) == "string":
+        non_null = series.count()
+        if not non_null:
+            return None
+        if series.nunique(dropna=True) <= category_max_ratio * non_null:
+            return series.astype("category")
+        if ARROW_STRINGS:
+            return series.astype("string[pyarrow]")
+    return None
+
+
+def compact_dataframe(
+    df: pd.DataFrame, category_max_ratio: float = settings.COMPACT_CATEGORY_MAX_RATIO
+) -> pd.DataFrame:
+    if not df.columns.is_unique:
+        return df
+
+    original: dict[str, str] = {}
+    compacted = df.copy(deep=False)
+    for position, column in enumerate(df.columns):
+        series = _compact_series(df.iloc[:, position], category_max_ratio)
+        if series is not None:
+            original[column] = str(df.dtypes.iloc[position])
+            compacted.isetitem(position, series)
+
+    if not original:
+        return df
+    compacted.attrs = {**df.attrs, ORIGINAL_DTYPES_ATTR: original}
+    return compacted
+
+
+def is_compacted(df: pd.DataFrame) -> bool:
+    return bool(df.attrs.get(ORIGINAL_DTYPES_ATTR))
+
+
+def restore_dtypes(df: pd.DataFrame, only: Optional[set[str]] = None) -> pd.DataFrame:
+    # only: restaura só as colunas cujo tipo atual está no conjunto (ex.: {"string"})
+    original = df.attrs.get(ORIGINAL_DTYPES_ATTR) or {}
+    restore = {
+        column: dtype
+        for column, dtype in original.items()
+        if column in df.columns and (only is None or str(df[column].dtype) in only)
+    }
+    if not restore:
+        return df
+
+    restored = df.copy(deep=False)
+    for column, dtype in restore.items():
+        series = df[column]
+        if dtype == "object":
+            # volta com NaN nos nulos, como o leitor de CSV entrega (e não pd.NA)
+            values = series.to_numpy(dtype=object, na_value=np.nan)
+        else:
+            values = series.astype(dtype)
+        restored[column] = values
+
+    remaining = {column: dtype for column, dtype in original.items() if column not in restore}
+    restored.attrs = {**df.attrs, ORIGINAL_DTYPES_ATTR: remaining}
+    return restored
+
+
+def memory_bytes(df: pd.DataFrame) -> int:
+    return int(df.memory_usage(deep=True).sum())
@@ -0,0 +1,121 @@
+import gzip
+import os
+import shutil
+import uuid
+import zlib
+from pathlib import Path
+from typing import Iterator, Optional
+
+try:
+    import brotli
+except ImportError:  # brotli é opcional
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # zstandard é opcional
+    zstandard = None
+
+# ordem de preferência do servidor quando o cliente aceita mais de uma
+ENCODING_PREFERENCE = ("zstd", "br", "gzip")
+
+ENCODING_SUFFIXES = {
+    "zstd": ".zst",
+    "br": ".br",
+    "gzip": ".gz",
+}
+
+# artefatos são comprimidos uma única vez, então vale pagar por um nível alto
+ARTIFACT_LEVELS = {"zstd": 19, "br": 9, "gzip": 9}
+# respostas comprimidas por requisição usam níveis rápidos
+RESPONSE_LEVELS = {"zstd": 3, "br": 4, "gzip": 5}
+
+COPY_CHUNK_SIZE = 1024 * 1024
+
+
+def available_encodings() -> tuple[str, ...]:
+    return tuple(
+        encoding
+        for encoding in ENCODING_PREFERENCE
+        if (encoding != "br" or brotli is not None)
+        and (encoding != "zstd" or zstandard is not None)
+    )
+
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    weights: dict[str, float] = {}
+    for coding in accept_encoding.split(","):
+        name, _, params = coding.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        weights[name] = quality
+
+    best: Optional[str] = None
+    best_quality = 0.0
+    for encoding in available_encodings():
+        quality = weights.get(encoding, weights.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def _compressor(encoding: str, level: int):
+    if encoding == "gzip":
+        return zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    if encoding == "br":
+        return brotli.Compressor(quality=level)
+    if encoding == "zstd":
+        return zstandard.ZstdCompressor(level=level).compressobj()
+    raise ValueError(f"Unsupported content encoding: {encoding}")
+
+
+def _flush(compressor, encoding: str) -> bytes:
+    if encoding == "br":
+        return compressor.finish()
+    return compressor.flush()
+
+
+def compress_bytes(data: bytes, encoding: str) -> bytes:
+    level = RESPONSE_LEVELS[encoding]
+    if encoding == "gzip":
+        return gzip.compress(data, compresslevel=level)
+    if encoding == "br":
+        return brotli.compress(data, quality=level)
+    if encoding == "zstd":
+        return zstandard.ZstdCompressor(level=level).compress(data)
+    raise ValueError(f"Unsupported content encoding: {encoding}")
+
+
+def compress_stream(chunks: Iterator[bytes], encoding: str) -> Iterator[bytes]:
+    compressor = _compressor(encoding, RESPONSE_LEVELS[encoding])
+    for chunk in chunks:
+        data = compressor.process(chunk) if encoding == "br" else compressor.compress(chunk)
+        if data:
+            yield data
+    yield _flush(compressor, encoding)
+
+
+def compress_file(source: Path, target: Path, encoding: str) -> None:
+    # escreve num arquivo temporário e troca atomicamente para que leitores
+    # concorrentes nunca vejam uma variante pela metade
+    tmp_path = target.with_name(f"{target.name}.{uuid.uuid4().hex}.tmp")
+    compressor = _compressor(encoding, ARTIFACT_LEVELS[encoding])
+    try:
+        with open(source, "rb") as src, open(tmp_path, "wb") as dst:
+            while chunk := src.read(COPY_CHUNK_SIZE):
+                data = compressor.process(chunk) if encoding == "br" else compressor.compress(chunk)
+                dst.write(data)
+            dst.write(_flush(compressor, encoding))
+        shutil.copystat(source, tmp_path)
+        os.replace(tmp_path, target)
+    finally:
+        if tmp_path.exists():
+            tmp_path.unlink()
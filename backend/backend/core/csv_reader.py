@@ -0,0 +1,264 @@
+import codecs
+import csv
+import io
+from typing import Iterable, NamedTuple, Optional
+
+import numpy as np
+import pandas as pd
+
+from backend.core.logging import setup_logging
+from backend.core.settings import settings
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    from pyarrow import csv as pa_csv
+except ImportError:  # pyarrow é opcional; sem ele a leitura usa o engine C do pandas
+    pa = None
+
+log = setup_logging("backend.csv_reader")
+
+SNIFF_DELIMITERS = ",;\t|"
+SNIFF_LINES = 50  # o csv.Sniffer é quadrático; poucas linhas bastam
+INT64_LIMIT = 2.0**63  # inteiros a partir daqui não cabem no int64 e o arrow os infere como double
+INTEGER_PATTERN = r"^\s*[+-]?\d+\s*$"
+
+BOMS = (
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+)
+
+# mesmos valores que o pandas trata como nulo e como booleano, para que os dois
+# engines devolvam o mesmo DataFrame
+NA_VALUES = [
+    "", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan", "1.#IND",
+    "1.#QNAN", "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a", "nan", "null",
+]
+TRUE_VALUES = ["True", "TRUE", "true"]
+FALSE_VALUES = ["False", "FALSE", "false"]
+
+
+class CSVDialect(NamedTuple):
+    encoding: str = "utf-8"
+    delimiter: str = ","
+    header: bool = True
+    names: Optional[tuple[str, ...]] = None  # nomes gerados quando o arquivo não tem cabeçalho
+    multiline: bool = False  # há campos entre aspas com quebra de linha
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "CSVDialect":
+        names = data.get("names")
+        return cls(
+            encoding=data["encoding"],
+            delimiter=data["delimiter"],
+            header=data["header"],
+            names=tuple(names) if names is not None else None,
+            multiline=data.get("multiline", False),
+        )
+
+
+def _sniff_encoding(sample: bytes) -> str:
+    for bom, encoding in BOMS:
+        if sample.startswith(bom):
+            return encoding
+    try:
+        sample.decode("utf-8")
+        return "utf-8"
+    except UnicodeDecodeError as e:
+        # o prefixo pode cortar um caractere multibyte no meio
+        if e.start >= len(sample) - 3 and e.reason == "unexpected end of data":
+            return "utf-8"
+    try:
+        # planilhas exportadas no Windows em pt-BR
+        sample.decode("cp1252")
+        return "cp1252"
+    except UnicodeDecodeError:
+        return "latin-1"
+
+
+def _is_number(value: str) -> bool:
+    try:
+        float(value)
+        return True
+    except ValueError:
+        return False
+
+
+def sniff_dialect(path: str, sample_size: int = settings.CSV_SNIFF_BYTES) -> CSVDialect:
+    with open(path, "rb") as f:
+        sample = f.read(sample_size)
+
+    encoding = _sniff_encoding(sample)
+    lines = sample.decode(encoding, errors="ignore").splitlines()
+    if len(sample) == sample_size and len(lines) > 1:
+        # descarta a última linha, provavelmente incompleta
+        lines.pop()
+    text = "\n".join(lines[:SNIFF_LINES])
+    if not text.strip():
+        return CSVDialect(encoding=encoding)
+
+    sniffer = csv.Sniffer()
+    try:
+        delimiter = sniffer.sniff(text, delimiters=SNIFF_DELIMITERS).delimiter
+    except csv.Error:
+        delimiter = ","
+
+    # o Sniffer.has_header erra em arquivos só de texto; sem cabeçalho só quando
+    # ele concorda e a primeira linha tem números, coisa rara num cabeçalho
+    first_row = next(csv.reader(lines[:1], delimiter=delimiter), [])
+    header = True
+    try:
+        if not sniffer.has_header(text) and any(_is_number(value) for value in first_row):
+            header = False
+    except csv.Error:
+        pass
+
+    names = tuple(f"column_{i + 1}" for i in range(len(first_row))) if not header else None
+    multiline = '"' in text and any(
+        "\n" in value or "\r" in value
+        for row in csv.reader(io.StringIO("\n".join(lines)), delimiter=delimiter)
+        for value in row
+    )
+    return CSVDialect(
+        encoding=encoding, delimiter=delimiter, header=header, names=names, multiline=multiline
+    )
+
+
+def _pandas_kwargs(dialect: CSVDialect) -> dict:
+    kwargs = {"sep": dialect.delimiter, "encoding": dialect.encoding}
+    if not dialect.header:
+        kwargs.update(header=None, names=list(dialect.names or ()))
+    return kwargs
+
+
+def _use_arrow(chunked: bool) -> bool:
+    # o pyarrow lê em várias threads; leituras em blocos (chunksize) ficam no engine C
+    return settings.CSV_ENGINE == "pyarrow" and pa is not None and not chunked
+
+
+_ARROW_TYPES = {
+    "object": "string",
+    "int64": "int64",
+    "float64": "float64",
+    "bool": "bool_",
+}
+
+
+def _arrow_types(dtypes: dict[str, str]) -> dict[str, "pa.DataType"]:
+    return {
+        column: getattr(pa, _ARROW_TYPES[dtype])()
+        for column, dtype in dtypes.items()
+        if dtype in _ARROW_TYPES
+    }
+
+
+def _column_to_pandas(column: "pa.ChunkedArray") -> np.ndarray:
+    if pa.types.is_null(column.type):
+        # coluna inteira vazia: o pandas devolve float64 (ou object sem linhas)
+        return np.full(len(column), np.nan) if len(column) else np.array([], dtype=object)
+    if pa.types.is_string(column.type) or pa.types.is_large_string(column.type) or (
+        pa.types.is_boolean(column.type) and column.null_count
+    ):
+        # texto (e bool com nulos) vira object com NaN nos nulos; o to_pandas do arrow usaria None
+        values = column.to_numpy(zero_copy_only=False)
+        if column.null_count:
+            values[column.is_null().to_numpy(zero_copy_only=False)] = np.nan
+        return values
+    return column.to_pandas()
+
+
+def _read_arrow(
+    path: str,
+    dialect: CSVDialect,
+    column_types: dict[str, "pa.DataType"],
+    usecols: Optional[list[str]],
+) -> Optional[pd.DataFrame]:
+    read_options = pa_csv.ReadOptions(
+        use_threads=True,
+        encoding=dialect.encoding,
+        column_names=list(dialect.names) if not dialect.header else None,
+    )
+    # quebras de linha dentro de valores impedem dividir o arquivo em blocos paralelos;
+    # se o prefixo não tinha nenhuma e aparecer uma depois, o erro de parse cai no engine C
+    parse_options = pa_csv.ParseOptions(
+        delimiter=dialect.delimiter, newlines_in_values=dialect.multiline
+    )
+
+    def read(types: dict[str, "pa.DataType"], columns: Optional[list[str]] = usecols) -> "pa.Table":
+        convert_options = pa_csv.ConvertOptions(
+            column_types=types,
+            include_columns=columns or [],
+            null_values=NA_VALUES,
+            strings_can_be_null=True,
+            true_values=TRUE_VALUES,
+            false_values=FALSE_VALUES,
+        )
+        return pa_csv.read_csv(
+            path, read_options=read_options, parse_options=parse_options, convert_options=convert_options
+        )
+
+    table = read(column_types)
+    names = table.column_names
+    if len(set(names)) != len(names) or "" in names:
+        # colunas repetidas ou sem nome: o pandas renomeia ("a.1", "Unnamed: 0")
+        return None
+
+    # o arrow reconhece datas ISO sozinho; o pandas deixa como texto
+    temporal = [
+        field.name for field in table.schema
+        if pa.types.is_temporal(field.type) and field.name not in column_types
+    ]
+    if temporal:
+        table = read({**column_types, **{name: pa.string() for name in temporal}})
+
+    # inteiros fora do int64 viram double no arrow e perdem precisão; o pandas os
+    # mantém exatos (uint64 ou texto). Só relê como texto as colunas com valores nessa faixa
+    overflow = [
+        field.name for field in table.schema
+        if pa.types.is_floating(field.type)
+        and field.name not in column_types
+        and (pc.max(pc.abs(table[field.name])).as_py() or 0) >= INT64_LIMIT
+    ]
+    if overflow:
+        raw = read({name: pa.string() for name in overflow}, overflow)
+        if any(pc.any(pc.match_substring_regex(raw[name], INTEGER_PATTERN)).as_py() for name in overflow):
+            return None
+
+    return pd.DataFrame(
+        {name: _column_to_pandas(column) for name, column in zip(table.column_names, table.columns)},
+        columns=table.column_names,
+    )
+
+
+def read_csv(
+    path: str,
+    dialect: Optional[CSVDialect] = None,
+    dtypes: Optional[dict[str, str]] = None,
+    usecols: Optional[Iterable[str]] = None,
+    chunksize: Optional[int] = None,
+):
+    if dialect is None:
+        dialect = sniff_dialect(path)
+    usecols = list(usecols) if usecols is not None else None
+    if dtypes and usecols is not None:
+        dtypes = {column: dtype for column, dtype in dtypes.items() if column in usecols}
+
+    if _use_arrow(chunksize is not None):
+        try:
+            df = _read_arrow(path, dialect, _arrow_types(dtypes or {}), usecols)
+        except (pa.ArrowInvalid, pa.ArrowNotImplementedError, UnicodeDecodeError) as e:
+            # linhas curtas, inteiros fora do int64, etc.: o engine C decide (ou dá o erro)
+            log.debug("pyarrow csv reader fell back to the C engine for %s: %s", path, e)
+            df = None
+        if df is not None:
+            return df
+
+    kwargs = _pandas_kwargs(dialect)
+    if dtypes:
+        kwargs["dtype"] = {column: dtype for column, dtype in dtypes.items() if dtype in _ARROW_TYPES}
+    if usecols is not None:
+        kwargs["usecols"] = usecols
+    if chunksize is not None:
+        kwargs["chunksize"] = chunksize
+    return pd.read_csv(path, **kwargs)
@@ -0,0 +1,70 @@
+import asyncio
+import hashlib
+from pathlib import Path
+from typing import Optional
+
+from cachetools import LRUCache
+from fastapi import Request, Response, status
+
+from backend.core.metrics import record_cache
+from backend.core.settings import settings
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+# (path, mtime, tamanho) -> hash; evita reler o artefato a cada requisição
+_file_digests: LRUCache = LRUCache(maxsize=4096)
+
+
+def _hash_file(path: Path) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        while chunk := f.read(HASH_CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+async def file_digest(path: Path) -> str:
+    stat = path.stat()
+    key = (str(path), stat.st_mtime_ns, stat.st_size)
+    digest = _file_digests.get(key)
+    record_cache("file_digest", digest is not None)
+    if digest is None:
+        digest = await asyncio.get_event_loop().run_in_executor(None, _hash_file, path)
+        _file_digests[key] = digest
+    return digest
+
+
+def make_etag(*parts: str) -> str:
+    digest = hashlib.blake2b("|".join(parts).encode("utf-8"), digest_size=16)
+    return f'"{digest.hexdigest()}"'
+
+
+def bytes_etag(data: bytes) -> str:
+    return f'"{hashlib.blake2b(data, digest_size=16).hexdigest()}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # If-None-Match usa comparação fraca (RFC 9110 13.1.2)
+    candidates = (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+    return etag.removeprefix("W/") in candidates
+
+
+def cache_headers(etag: str, vary: Optional[str] = None) -> dict[str, str]:
+    headers = {"ETag": etag, "Cache-Control": settings.ARTIFACT_CACHE_CONTROL}
+    if vary:
+        headers["Vary"] = vary
+    return headers
+
+
+def not_modified(request: Request, etag: str, vary: Optional[str] = None) -> Optional[Response]:
+    matched = etag_matches(request.headers.get("if-none-match"), etag)
+    record_cache("http_conditional", matched)
+    if matched:
+        return Response(
+            status_code=status.HTTP_304_NOT_MODIFIED, headers=cache_headers(etag, vary)
+        )
+    return None
@@ -1,20 +1,155 @@
+import atexit
+import contextvars
+import json
 import logging
-from typing import Any
+import os
+import queue
+import random
+import sys
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Optional
 
-def setup_logging(name_log: str, level_log=logging.DEBUG) -> logging.Logger:
+# request id da requisição corrente; o tracing e os registros de log leem daqui
+request_id_var: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar(
+    "request_id", default=None
+)
+
+DEFAULT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+LOG_QUEUE_SIZE = 10000
+
+# atributos padrão do LogRecord; o que sobrar veio de extra= e vai para o JSON
+_RECORD_ATTRS = set(logging.makeLogRecord({}).__dict__) | {"message", "asctime", "request_id"}
+
+_level = logging.INFO
+_sample_rate = 1.0
+_loggers: set[str] = set()
+_queue: "queue.Queue[logging.LogRecord]" = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+_listener: Optional[QueueListener] = None
+_output = logging.StreamHandler(sys.stderr)
+
+
+def _extra_fields(record: logging.LogRecord) -> dict[str, Any]:
+    return {
+        key: value
+        for key, value in record.__dict__.items()
+        if key not in _RECORD_ATTRS and not key.startswith("_")
+    }
+
+
+class TextFormatter(logging.Formatter):
+    # formato legível para desenvolvimento; campos extras no fim, como key=value
+    def format(self, record: logging.LogRecord) -> str:
+        message = super().format(record)
+        fields = _extra_fields(record)
+        if getattr(record, "request_id", None):
+            fields = {"request_id": record.request_id, **fields}
+        if fields:
+            message += " - " + " - ".join(f"{k}={v}" for k, v in fields.items())
+        return message
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        payload: dict[str, Any] = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if getattr(record, "request_id", None):
+            payload["request_id"] = record.request_id
+        payload.update(_extra_fields(record))
+        if record.exc_info:
+            payload["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(payload, default=str, ensure_ascii=False)
+
+
+# só enfileira o record: a mensagem (msg % args) e o JSON são montados na thread
+# do QueueListener, fora do event loop
+class _AsyncQueueHandler(QueueHandler):
+    dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.request_id = request_id_var.get()
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            # fila cheia: descarta em vez de bloquear a requisição
+            type(self).dropped += 1
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        # amostragem vale só para DEBUG/INFO; avisos e erros sempre passam
+        if _sample_rate < 1.0 and record.levelno < logging.WARNING and random.random() >= _sample_rate:
+            return False
+        return super().filter(record)
+
+
+_handler = _AsyncQueueHandler(_queue)
+_output.setFormatter(TextFormatter(DEFAULT_FORMAT, datefmt='%d/%m/%Y %H:%M:%S'))
+
+
+def _start_listener() -> None:
+    global _listener
+    _listener = QueueListener(_queue, _output, respect_handler_level=False)
+    _listener.start()
+
+
+def _stop_listener() -> None:
+    # esvazia a fila antes de sair
+    if _listener is not None and _listener._thread is not None:
+        _listener.stop()
+
+
+def _restart_after_fork() -> None:
+    # threads não sobrevivem ao fork (gunicorn --preload): cada worker sobe a sua
+    global _queue
+    _queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+    _handler.queue = _queue
+    _start_listener()
+
+
+_start_listener()
+atexit.register(_stop_listener)
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_restart_after_fork)
+
+
+def dropped_log_records() -> int:
+    return _AsyncQueueHandler.dropped
+
+
+def configure_logging(
+    level: str = "INFO",
+    json_format: bool = True,
+    sample_rate: float = 1.0,
+    fmt: str = DEFAULT_FORMAT,
+) -> None:
+    global _level, _sample_rate
+    _level = logging.getLevelName(level.upper()) if isinstance(level, str) else level
+    if not isinstance(_level, int):
+        _level = logging.INFO
+    _sample_rate = min(max(sample_rate, 0.0), 1.0)
+    _output.setFormatter(
+        JsonFormatter() if json_format else TextFormatter(fmt, datefmt='%d/%m/%Y %H:%M:%S')
+    )
+    # o nível fica no logger: chamadas abaixo dele retornam antes de criar o record
+    for name in _loggers:
+        logging.getLogger(name).setLevel(_level)
+
+
+def setup_logging(name_log: str, level_log: Optional[int] = None) -> logging.Logger:
     logger = logging.getLogger(name_log)
-    logger.setLevel(level_log)
-    
-    if not logger.handlers:
-        console_handler = logging.StreamHandler()
-        console_handler.setLevel(level=level_log)
-         
-        formatter = logging.Formatter(
-            '%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-            datefmt='%d/%m/%Y %H:%M:%S'
-        )
-        console_handler.setFormatter(formatter)
-        logger.addHandler(console_handler)
+    logger.setLevel(level_log if level_log is not None else _level)
+
+    if level_log is None:
+        _loggers.add(name_log)
+    if _handler not in logger.handlers:
+        logger.addHandler(_handler)
+        logger.propagate = False
 
     return logger
 
@@ -22,13 +157,21 @@ def get_logger(name: str) -> logging.Logger:
     return logging.getLogger(name)
 
 
+_api_log = setup_logging("app.api")
+_error_log = setup_logging("app.error")
+
+
 def log_request(endpoint: str, **kwargs: Any) -> None:
-    logger = get_logger("app.api")
-    extra_info = " - ".join([f"{k}={v}" for k, v in kwargs.items()])
-    logger.info(f"Request to {endpoint} - {extra_info}")
+    if not _api_log.isEnabledFor(logging.INFO):
+        return
+    # os campos vão estruturados no JSON em vez de concatenados na mensagem;
+    # nomes que colidem com atributos do LogRecord (ex.: filename) ganham um "_"
+    fields = {f"{k}_" if k in _RECORD_ATTRS else k: v for k, v in kwargs.items()}
+    _api_log.info("Request to %s", endpoint, extra=fields)
 
 
 def log_error(error: Exception, context: str = "") -> None:
-    logger = get_logger("app.error")
-    context_str = f" - Context: {context}" if context else ""
-    logger.error(f"Error: {str(error)}{context_str}", exc_info=True)
\ No newline at end of file
+    if context:
+        _error_log.error("Error: %s - Context: %s", error, context, exc_info=error)
+    else:
+        _error_log.error("Error: %s", error, exc_info=error)
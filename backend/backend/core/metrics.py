@@ -0,0 +1,182 @@
+import functools
+import os
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterator, Optional
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from backend.core.logging import dropped_log_records
+from backend.core.tracing import set_attributes, span
+
+METRICS_PREFIX = "dataprocessor"
+
+registry = CollectorRegistry(auto_describe=True)
+
+# com vários workers (gunicorn.conf.py) cada processo grava as métricas em arquivos
+# nesse diretório e o /metrics agrega os de todos
+MULTIPROCESS = bool(os.environ.get("PROMETHEUS_MULTIPROC_DIR"))
+
+# estágios vão de milissegundos (validação) a dezenas de segundos (LLM)
+STAGE_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+STAGE_SECONDS = Histogram(
+    f"{METRICS_PREFIX}_stage_duration_seconds",
+    "Duration of each pipeline stage",
+    ["stage"],
+    buckets=STAGE_BUCKETS,
+    registry=registry,
+)
+STAGE_ERRORS = Counter(
+    f"{METRICS_PREFIX}_stage_errors_total",
+    "Pipeline stages that raised",
+    ["stage"],
+    registry=registry,
+)
+HTTP_REQUESTS = Counter(
+    f"{METRICS_PREFIX}_http_requests_total",
+    "HTTP requests by route template and status code",
+    ["method", "route", "status"],
+    registry=registry,
+)
+HTTP_ERRORS = Counter(
+    f"{METRICS_PREFIX}_http_request_errors_total",
+    "HTTP requests that ended in 5xx or an unhandled exception",
+    ["method", "route"],
+    registry=registry,
+)
+HTTP_SECONDS = Histogram(
+    f"{METRICS_PREFIX}_http_request_duration_seconds",
+    "HTTP request duration, including the streamed body",
+    ["method", "route"],
+    buckets=STAGE_BUCKETS,
+    registry=registry,
+)
+HTTP_IN_FLIGHT = Gauge(
+    f"{METRICS_PREFIX}_http_requests_in_flight",
+    "HTTP requests being served",
+    multiprocess_mode="livesum",
+    registry=registry,
+)
+CACHE_REQUESTS = Counter(
+    f"{METRICS_PREFIX}_cache_requests_total",
+    "Cache lookups by cache and result (hit|miss)",
+    ["cache", "result"],
+    registry=registry,
+)
+LLM_TOKENS = Counter(
+    f"{METRICS_PREFIX}_llm_tokens_total",
+    "LLM tokens by model and kind (input|output)",
+    ["model", "kind"],
+    registry=registry,
+)
+
+LOG_DROPPED = Gauge(
+    f"{METRICS_PREFIX}_log_records_dropped",
+    "Log records discarded because the logging queue was full",
+    multiprocess_mode="livesum",
+    registry=registry,
+)
+if not MULTIPROCESS:
+    LOG_DROPPED.set_function(dropped_log_records)
+
+
+# cada estágio vira uma amostra no histograma e um span no trace do arquivo
+@contextmanager
+def stage_timer(stage: str) -> Iterator[None]:
+    start = time.perf_counter()
+    with span(stage):
+        try:
+            yield
+        except Exception:
+            STAGE_ERRORS.labels(stage=stage).inc()
+            raise
+        finally:
+            STAGE_SECONDS.labels(stage=stage).observe(time.perf_counter() - start)
+
+
+def timed_stage(stage: str) -> Callable:
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage_timer(stage):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def record_cache(cache: str, hit: bool) -> None:
+    CACHE_REQUESTS.labels(cache=cache, result="hit" if hit else "miss").inc()
+
+
+def record_llm_tokens(model: str, input_tokens: Optional[int], output_tokens: Optional[int]) -> None:
+    if input_tokens:
+        LLM_TOKENS.labels(model=model, kind="input").inc(input_tokens)
+    if output_tokens:
+        LLM_TOKENS.labels(model=model, kind="output").inc(output_tokens)
+    set_attributes(
+        {"llm.model": model, "llm.input_tokens": input_tokens, "llm.output_tokens": output_tokens}
+    )
+
+
+def render_metrics() -> tuple[bytes, str]:
+    if MULTIPROCESS:
+        collected = CollectorRegistry()
+        multiprocess.MultiProcessCollector(collected)
+        return generate_latest(collected), CONTENT_TYPE_LATEST
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+def _route_template(scope: Scope) -> str:
+    # o template ("/api/v1/result/{file_id}") mantém a cardinalidade baixa; o path nunca entra
+    route = scope.get("route")
+    return getattr(route, "path_format", None) or getattr(route, "path", None) or "unmatched"
+
+
+# ASGI puro: mede até o fim do corpo, inclusive em StreamingResponse e SSE
+class MetricsMiddleware:
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        method = scope["method"]
+        start = time.perf_counter()
+        HTTP_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except Exception:
+            status_code = 500
+            raise
+        finally:
+            HTTP_IN_FLIGHT.dec()
+            route = _route_template(scope)
+            HTTP_REQUESTS.labels(method=method, route=route, status=str(status_code)).inc()
+            HTTP_SECONDS.labels(method=method, route=route).observe(time.perf_counter() - start)
+            if status_code >= 500:
+                HTTP_ERRORS.labels(method=method, route=route).inc()
+            if MULTIPROCESS:
+                # set_function não vale entre processos; o valor é gravado a cada requisição
+                LOG_DROPPED.set(dropped_log_records())
@@ -0,0 +1,77 @@
+import datetime
+from typing import Any, Literal
+
+import numpy as np
+import orjson
+import pandas as pd
+
+from backend.core.metrics import timed_stage
+from backend.core.tracing import set_attributes
+
+ResultOrient = Literal["records", "columns"]
+
+ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+
+def _default(obj: Any) -> Any:
+    if isinstance(obj, (pd.Timestamp, datetime.date, datetime.time)):
+        return obj.isoformat()
+    if isinstance(obj, pd.Timedelta):
+        return obj.isoformat()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+def dumps(payload: Any) -> bytes:
+    return orjson.dumps(payload, default=_default, option=ORJSON_OPTIONS)
+
+
+def column_values(series: pd.Series) -> np.ndarray | list[Any]:
+    # arrays numéricos vão direto para o orjson, sem passar por objetos Python
+    values = series.to_numpy()
+    if values.dtype.kind in "biuf":
+        return np.ascontiguousarray(values)
+    return series.astype(object).where(series.notna(), None).tolist()
+
+
+def dataframe_to_columnar(df: pd.DataFrame) -> dict[str, Any]:
+    return {
+        "columns": [str(col) for col in df.columns],
+        "values": [column_values(df.iloc[:, i]) for i in range(df.shape[1])],
+        "rows_count": len(df),
+    }
+
+
+def fill_missing(df: pd.DataFrame) -> pd.DataFrame:
+    # colunas category (DTYPE_COMPACTION) não aceitam "" como valor novo
+    categorical = [col for col, dtype in df.dtypes.items() if isinstance(dtype, pd.CategoricalDtype)]
+    if categorical:
+        df = df.astype({col: object for col in categorical})
+    return df.fillna("")
+
+
+def dataframe_to_records(df: pd.DataFrame) -> dict[str, Any]:
+    return {
+        "columns": [str(col) for col in df.columns],
+        "data": fill_missing(df).to_dict("records"),
+        "rows_count": len(df),
+    }
+
+
+@timed_stage("result_serialize")
+def encode_result(file_id: str, df: pd.DataFrame, orient: ResultOrient) -> bytes:
+    if orient == "columns":
+        payload = dataframe_to_columnar(df)
+    else:
+        payload = dataframe_to_records(df)
+
+    encoded = dumps(
+        {
+            "file_id": file_id,
+            "message": "Dados processados obtidos com sucesso",
+            **payload,
+        }
+    )
+    set_attributes({"data.rows": len(df), "data.bytes": len(encoded)})
+    return encoded
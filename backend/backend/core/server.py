@@ -0,0 +1,14 @@
+from uvicorn_worker import UvicornWorker
+
+
+# worker do gunicorn (gunicorn.conf.py): cada processo roda o app ASGI no uvicorn
+class Worker(UvicornWorker):
+    # explícitos: sem uvloop/httptools instalados o worker falha no boot em vez de
+    # cair calado no asyncio/h11, bem mais lentos
+    CONFIG_KWARGS = {"loop": "uvloop", "http": "httptools"}
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        # no SIGTERM o uvicorn fecha os keep-alives e espera as requisições em andamento;
+        # streams longos (SSE do /status) são cortados antes do SIGKILL do gunicorn
+        self.config.timeout_graceful_shutdown = max(self.cfg.graceful_timeout - 5, 1)
@@ -1,8 +1,9 @@
 from pathlib import Path
+from typing import Optional
 from pydantic import model_validator
 from pydantic_settings import BaseSettings
 
-from backend.core.logging import setup_logging
+from backend.core.logging import configure_logging, setup_logging
 
 log = setup_logging("backend.llm_service")
 class Settings(BaseSettings):
@@ -17,6 +18,8 @@ class Settings(BaseSettings):
     OPENAI_SECRET_KEY: str
     OPENAI_MODEL: str = "gpt-3.5-turbo"
     OPENAI_MAX_TOKENS: int = 2000
+    OPENAI_BASE_URL: Optional[str] = None  # ex.: http://localhost:8900/v1 (servidor falso do loadtest)
+    LLM_PRELOAD: bool = True  # importa os SDKs dos provedores em background logo após o startup
     
     GEMINI_SECRET_KEY: str
     GEMINI_BASE_MODEL: str = "gemini-2.5-flash"
@@ -35,27 +38,91 @@ class Settings(BaseSettings):
     MAX_FILE_SIZE: int = 10 * 1024 * 1024  # 10MB
     ALLOWED_FILE_EXTENSIONS: set[str] = {".csv"}
     
+    REDIS_HOST: str = "cachedb"
+    REDIS_PORT: int = 6379
+    REDIS_DB: int = 0
+    REDIS_MAX_CONNECTIONS: int = 50
+    CACHE_BACKEND: str = "redis"  # redis | memory (testes e instância única)
+    STATUS_L1_TTL: float = 2.0  # segundos; limite de obsolescência caso uma invalidação se perca
+    STATUS_L1_MAXSIZE: int = 10000
+    STATUS_STREAM_KEEPALIVE: int = 15  # segundos entre comentários de keep-alive no SSE
+    STATUS_STREAM_MAX_SECONDS: int = 30 * 60  # o SSE encerra com "end"/"timeout" depois disso; o cliente reconecta
+
+    # ciclo de vida dos artefatos em upload/ e processed/
+    GC_ENABLED: bool = True
+    GC_INTERVAL_SECONDS: int = 600
+    ARTIFACT_TTL_SECONDS: int = 7 * 24 * 3600  # tempo máximo sem acesso
+    STATUS_TTL_SECONDS: int = 7 * 24 * 3600  # expiração dos hashes file_status:
+    DISK_QUOTA_BYTES: int = 5 * 1024 * 1024 * 1024  # 5GB
+    GC_MIN_IDLE_SECONDS: int = 300  # nunca remove artefatos usados há menos tempo que isso
+
+    # pipeline em background (/jobs)
+    JOB_WORKERS: int = 2  # workers no processo da API; 0 deixa a fila só para `python -m backend.worker`
+    JOB_DEQUEUE_TIMEOUT: int = 5  # segundos bloqueado na fila antes de checar o cancelamento
+    JOB_SJF_BYTES_PER_SECOND: int = 1024 * 1024  # custo estimado de um job: 1MB equivale a 1s de espera
+    JOB_PRIORITY_STEP_SECONDS: int = 600  # quanto um nível de prioridade adianta ou atrasa o job
+
+    BATCH_MAX_FILES: int = 100  # arquivos por requisição em /batch, somando os de dentro de zips
+    BATCH_MAX_BYTES: int = 200 * 1024 * 1024  # soma dos CSVs descompactados por requisição em /batch
+    APPEND_LOCK_TTL_SECONDS: int = 600  # limite de um /append parado segurando o lock do arquivo
+    APPEND_LOCK_WAIT_SECONDS: float = 30  # espera pelo lock antes de responder 409
+
+    # onde ficam os artefatos de upload/ e processed/
+    STORAGE_BACKEND: str = "local"  # local | s3 (S3 ou compatível, ex.: MinIO)
+    STORAGE_CACHE_DIR: Path = BASE_DIR / ".storage_cache"  # cópias locais quando o backend é s3
+    STORAGE_MULTIPART_CHUNK_SIZE: int = 8 * 1024 * 1024  # tamanho das partes no upload multipart
+    STORAGE_FRESHNESS_TTL: float = 1.0  # segundos em que uma cópia local validada dispensa novo HEAD
+    S3_BUCKET: str = "data-processor"
+    S3_PREFIX: str = ""
+    S3_ENDPOINT_URL: Optional[str] = None  # ex.: http://minio:9000
+    S3_REGION: Optional[str] = None
+
+    # tracing com OpenTelemetry (opcional); o trace_id de cada arquivo é o próprio file_id
+    TRACING_ENABLED: bool = False
+    TRACING_EXPORTER: str = "otlp"  # otlp | file | console
+    TRACING_OTLP_ENDPOINT: str = "http://localhost:4318/v1/traces"
+    TRACING_FILE_PATH: Path = BASE_DIR / "traces.jsonl"
+    TRACING_SERVICE_NAME: str = "data-processor-backend"
+
     LOG_LEVEL: str = "INFO"
-    LOG_FORMAT: str = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+    LOG_FORMAT: str = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"  # usado com LOG_JSON=false
+    LOG_JSON: bool = True  # um objeto JSON por linha, com request_id e campos extras
+    LOG_SAMPLE_RATE: float = 1.0  # fração de DEBUG/INFO mantida; WARNING ou acima nunca é amostrado
     
     EXECUTION_TIMEOUT: int = 30  # segundos
     MAX_SCRIPT_LENGTH: int = 10000  # caracteres
 
+    CSV_ENGINE: str = "pyarrow"  # pyarrow | c; sem o pyarrow instalado a leitura usa o engine C
+    CSV_SNIFF_BYTES: int = 64 * 1024  # prefixo lido para detectar encoding, separador e cabeçalho
+
+    # compactação de tipos (opt-in): texto vira category/string[pyarrow] e numéricos encolhem
+    DTYPE_COMPACTION: bool = False
+    COMPACT_CATEGORY_MAX_RATIO: float = 0.5  # valores distintos / não nulos até aqui viram category
+    COMPACT_CHECK_ROWS: int = 1000  # amostra em que o script roda com e sem compactação antes do arquivo todo
+
+    RESULT_STREAM_CHUNK_ROWS: int = 10000  # linhas por lote no streaming do /result
+    COMPRESSION_MIN_SIZE: int = 1024  # bytes; respostas menores seguem sem compressão
+    # artefatos só mudam se o script for reexecutado, então o cliente revalida via ETag
+    ARTIFACT_CACHE_CONTROL: str = "private, no-cache"
+
     @model_validator(mode='after')
     def setup_directories(self) -> 'Settings':
-        log.info(f"Setting directories on base dir: {self.BASE_DIR}")
+        log.info("Setting directories on base dir: %s", self.BASE_DIR)
         self.UPLOAD_DIR = self.BASE_DIR / "upload"
         self.PROCESSED_DIR = self.BASE_DIR / "processed"
-        
-        self.UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
-        self.PROCESSED_DIR.mkdir(parents=True, exist_ok=True)
-        log.info(f"Base settings done")
+        # os diretórios são criados pelo storage.setup() no startup
+        log.info("Base settings done")
         
         return self
     
     @model_validator(mode="after")
     def validate_environment(self) -> 'Settings':
-        missing = [field for field, value in self.__dict__.items() if value in (None, '')]
+        # só os campos obrigatórios; os opcionais podem ficar vazios
+        missing = [
+            field
+            for field, info in type(self).model_fields.items()
+            if info.is_required() and getattr(self, field) in (None, '')
+        ]
         if missing:
             raise ValueError(f"Missing environment variables: {', '.join(missing)}")
         
@@ -69,4 +136,10 @@ class Settings(BaseSettings):
         case_sensitive = True
 
 
-settings = Settings()
\ No newline at end of file
+settings = Settings()
+configure_logging(
+    level=settings.LOG_LEVEL,
+    json_format=settings.LOG_JSON,
+    sample_rate=settings.LOG_SAMPLE_RATE,
+    fmt=settings.LOG_FORMAT,
+)
\ No newline at end of file
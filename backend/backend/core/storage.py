@@ -0,0 +1,317 @@
+import abc
+import asyncio
+import importlib.util
+import os
+import uuid
+from pathlib import Path
+from typing import AsyncIterator, NamedTuple, Optional
+
+import aiofiles
+from cachetools import TTLCache
+
+from backend.core.logging import setup_logging
+from backend.core.metrics import record_cache
+from backend.core.settings import settings
+
+log = setup_logging("backend.storage")
+
+COPY_CHUNK_SIZE = 1024 * 1024
+
+
+class StoredObject(NamedTuple):
+    key: str
+    size: int
+    mtime: float
+
+
+# chaves são caminhos relativos ("upload/<id>.csv", "processed/<id>_processed.csv").
+# Todo objeto tem uma cópia local em path(key): pandas, pyarrow e FileResponse
+# continuam trabalhando com arquivos, e o backend decide onde fica a fonte da verdade.
+class Storage(abc.ABC):
+    def __init__(self, root: Path) -> None:
+        self.root = Path(root)
+
+    def path(self, key: str) -> Path:
+        return self.root / key
+
+    def setup(self) -> None:
+        # chamado no startup (lifespan/worker), não no import
+        for directory in ("upload", "processed"):
+            self.path(directory).mkdir(parents=True, exist_ok=True)
+
+    def _tmp_path(self, path: Path) -> Path:
+        return path.with_name(f"{path.name}.{uuid.uuid4().hex}.tmp")
+
+    async def write_stream(self, key: str, chunks: AsyncIterator[bytes]) -> int:
+        path = self.path(key)
+        tmp_path = self._tmp_path(path)
+        size = 0
+        try:
+            async with aiofiles.open(tmp_path, "wb") as f:
+                async for chunk in chunks:
+                    await f.write(chunk)
+                    size += len(chunk)
+            os.replace(tmp_path, path)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+        await self.publish(key)
+        return size
+
+    async def write_bytes(self, key: str, data: bytes) -> None:
+        # mesma troca atômica do write_stream: leitores nunca veem o arquivo pela metade
+        path = self.path(key)
+        tmp_path = self._tmp_path(path)
+        try:
+            async with aiofiles.open(tmp_path, "wb") as f:
+                await f.write(data)
+            os.replace(tmp_path, path)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+        await self.publish(key)
+
+    @abc.abstractmethod
+    async def exists(self, key: str) -> bool:
+        ...
+
+    @abc.abstractmethod
+    async def fetch(self, key: str) -> Optional[Path]:
+        # read-through: devolve a cópia local atualizada ou None se o objeto não existe
+        ...
+
+    @abc.abstractmethod
+    async def publish(self, key: str) -> None:
+        # envia a cópia local escrita em path(key) para o backend
+        ...
+
+    @abc.abstractmethod
+    async def delete(self, key: str) -> None:
+        ...
+
+    @abc.abstractmethod
+    async def list_objects(self, prefix: str) -> list[StoredObject]:
+        ...
+
+
+class LocalStorage(Storage):
+    # a cópia local é o próprio objeto: nada é copiado
+    async def exists(self, key: str) -> bool:
+        return self.path(key).exists()
+
+    async def fetch(self, key: str) -> Optional[Path]:
+        path = self.path(key)
+        return path if path.exists() else None
+
+    async def publish(self, key: str) -> None:
+        pass
+
+    async def delete(self, key: str) -> None:
+        self.path(key).unlink(missing_ok=True)
+
+    def _list(self, prefix: str) -> list[StoredObject]:
+        directory, _, name_prefix = prefix.rpartition("/")
+        objects: list[StoredObject] = []
+        for path in self.path(directory).rglob(f"{name_prefix}*"):
+            try:
+                if not path.is_file():
+                    continue
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            key = path.relative_to(self.root).as_posix()
+            objects.append(StoredObject(key, stat.st_size, stat.st_mtime))
+        return objects
+
+    async def list_objects(self, prefix: str) -> list[StoredObject]:
+        return await asyncio.get_event_loop().run_in_executor(None, self._list, prefix)
+
+
+# S3 ou compatível (MinIO) como fonte da verdade, compartilhado entre réplicas;
+# o disco local vira um cache validado por tamanho + LastModified a cada leitura
+class S3Storage(Storage):
+    def __init__(
+        self,
+        root: Path,
+        bucket: str,
+        prefix: str = "",
+        endpoint_url: Optional[str] = None,
+        region: Optional[str] = None,
+        part_size: int = settings.STORAGE_MULTIPART_CHUNK_SIZE,
+    ) -> None:
+        # boto3 é opcional e pesado: só é importado quando o backend s3 é usado
+        if importlib.util.find_spec("boto3") is None:
+            raise RuntimeError("boto3 is required for STORAGE_BACKEND=s3")
+        import boto3
+        from botocore.config import Config as BotoConfig
+        from botocore.exceptions import ClientError
+
+        super().__init__(root)
+        self._client_error = ClientError
+        self.bucket = bucket
+        self.prefix = prefix.strip("/")
+        # S3 exige partes de pelo menos 5MB, exceto a última
+        self.part_size = max(part_size, 5 * 1024 * 1024)
+        # credenciais seguem a cadeia padrão do boto3 (env, profile, IAM role)
+        self.client = boto3.client(
+            "s3",
+            endpoint_url=endpoint_url,
+            region_name=region,
+            config=BotoConfig(
+                max_pool_connections=settings.REDIS_MAX_CONNECTIONS,
+                retries={"mode": "standard"},
+            ),
+        )
+        self._fetch_locks: dict[str, asyncio.Lock] = {}
+        # chaves validadas há pouco dispensam um novo HEAD (várias leituras por requisição)
+        self._verified: TTLCache = TTLCache(maxsize=10000, ttl=settings.STORAGE_FRESHNESS_TTL)
+
+    def _object_key(self, key: str) -> str:
+        return f"{self.prefix}/{key}" if self.prefix else key
+
+    def _head(self, key: str) -> Optional[dict]:
+        try:
+            return self.client.head_object(Bucket=self.bucket, Key=self._object_key(key))
+        except self._client_error as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return None
+            raise
+
+    def _is_fresh(self, path: Path, head: dict) -> bool:
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            return False
+        return (
+            stat.st_size == head["ContentLength"]
+            and stat.st_mtime == head["LastModified"].timestamp()
+        )
+
+    def _download(self, key: str, head: dict) -> None:
+        path = self.path(key)
+        tmp_path = self._tmp_path(path)
+        try:
+            response = self.client.get_object(Bucket=self.bucket, Key=self._object_key(key))
+            with open(tmp_path, "wb") as f:
+                for chunk in response["Body"].iter_chunks(COPY_CHUNK_SIZE):
+                    f.write(chunk)
+            # o mtime local espelha o LastModified: é o que o _is_fresh compara
+            # e o que as variantes derivadas herdam via copystat
+            modified = head["LastModified"].timestamp()
+            os.utime(tmp_path, (modified, modified))
+            os.replace(tmp_path, path)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+        log.info("Storage cache filled: %s", key)
+
+    def _fetch(self, key: str) -> Optional[Path]:
+        head = self._head(key)
+        path = self.path(key)
+        if head is None:
+            path.unlink(missing_ok=True)
+            return None
+        fresh = self._is_fresh(path, head)
+        record_cache("storage", fresh)
+        if not fresh:
+            self._download(key, head)
+        return path
+
+    async def exists(self, key: str) -> bool:
+        return await asyncio.get_event_loop().run_in_executor(None, self._head, key) is not None
+
+    async def fetch(self, key: str) -> Optional[Path]:
+        # uma única cópia em andamento por chave dentro do processo
+        lock = self._fetch_locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            path = self.path(key)
+            if key in self._verified and path.exists():
+                record_cache("storage", True)
+                return path
+            path = await asyncio.get_event_loop().run_in_executor(None, self._fetch, key)
+            if path is not None:
+                self._verified[key] = True
+            return path
+
+    def _upload(self, key: str) -> None:
+        path = self.path(key)
+        object_key = self._object_key(key)
+        if path.stat().st_size <= self.part_size:
+            with open(path, "rb") as f:
+                self.client.put_object(Bucket=self.bucket, Key=object_key, Body=f)
+        else:
+            upload_id = self.client.create_multipart_upload(
+                Bucket=self.bucket, Key=object_key
+            )["UploadId"]
+            try:
+                parts = []
+                with open(path, "rb") as f:
+                    while chunk := f.read(self.part_size):
+                        part_number = len(parts) + 1
+                        part = self.client.upload_part(
+                            Bucket=self.bucket,
+                            Key=object_key,
+                            UploadId=upload_id,
+                            PartNumber=part_number,
+                            Body=chunk,
+                        )
+                        parts.append({"ETag": part["ETag"], "PartNumber": part_number})
+                self.client.complete_multipart_upload(
+                    Bucket=self.bucket,
+                    Key=object_key,
+                    UploadId=upload_id,
+                    MultipartUpload={"Parts": parts},
+                )
+            except Exception:
+                self.client.abort_multipart_upload(
+                    Bucket=self.bucket, Key=object_key, UploadId=upload_id
+                )
+                raise
+
+        # a cópia local passa a valer como cache do objeto recém-enviado
+        head = self._head(key)
+        modified = head["LastModified"].timestamp()
+        os.utime(path, (modified, modified))
+
+    async def publish(self, key: str) -> None:
+        await asyncio.get_event_loop().run_in_executor(None, self._upload, key)
+        self._verified[key] = True
+
+    def _delete(self, key: str) -> None:
+        self.client.delete_object(Bucket=self.bucket, Key=self._object_key(key))
+        self.path(key).unlink(missing_ok=True)
+
+    async def delete(self, key: str) -> None:
+        self._fetch_locks.pop(key, None)
+        self._verified.pop(key, None)
+        await asyncio.get_event_loop().run_in_executor(None, self._delete, key)
+
+    def _list(self, prefix: str) -> list[StoredObject]:
+        base = f"{self.prefix}/" if self.prefix else ""
+        objects: list[StoredObject] = []
+        paginator = self.client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=base + prefix):
+            for item in page.get("Contents", ()):
+                objects.append(
+                    StoredObject(
+                        item["Key"][len(base):], item["Size"], item["LastModified"].timestamp()
+                    )
+                )
+        return objects
+
+    async def list_objects(self, prefix: str) -> list[StoredObject]:
+        return await asyncio.get_event_loop().run_in_executor(None, self._list, prefix)
+
+
+def create_storage() -> Storage:
+    if settings.STORAGE_BACKEND == "s3":
+        storage: Storage = S3Storage(
+            root=settings.STORAGE_CACHE_DIR,
+            bucket=settings.S3_BUCKET,
+            prefix=settings.S3_PREFIX,
+            endpoint_url=settings.S3_ENDPOINT_URL,
+            region=settings.S3_REGION,
+        )
+    else:
+        storage = LocalStorage(settings.BASE_DIR)
+    return storage
+
+
+storage = create_storage()
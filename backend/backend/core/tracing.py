@@ -0,0 +1,217 @@
+import asyncio
+import contextvars
+import hashlib
+import re
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Iterator, Optional
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from backend.core.logging import request_id_var, setup_logging
+from backend.core.settings import settings
+
+try:
+    from opentelemetry import trace
+    from opentelemetry.sdk.resources import Resource
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import (
+        BatchSpanProcessor,
+        ConsoleSpanExporter,
+        SpanExporter,
+        SpanExportResult,
+    )
+    from opentelemetry.trace import Link, NonRecordingSpan, SpanContext, SpanKind, TraceFlags
+except ImportError:  # opentelemetry é opcional; sem ele os helpers viram no-op
+    trace = None
+    SpanExporter = object
+
+log = setup_logging("backend.tracing")
+
+UUID_PATTERN = re.compile(
+    r"[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}", re.IGNORECASE
+)
+
+_provider: Optional["TracerProvider"] = None
+
+
+def trace_id_for(file_id: str) -> int:
+    # o file_id já é um uuid de 128 bits: vira o trace_id, e toda requisição ou
+    # worker que toca o arquivo cai no mesmo trace sem precisar propagar contexto
+    try:
+        return uuid.UUID(file_id).int
+    except ValueError:
+        return int.from_bytes(hashlib.blake2b(file_id.encode("utf-8"), digest_size=16).digest(), "big")
+
+
+def _file_context(file_id: str):
+    # pai sintético e remoto, igual para todos os processos
+    span_id = int.from_bytes(hashlib.blake2b(file_id.encode("utf-8"), digest_size=8).digest(), "big")
+    parent = SpanContext(
+        trace_id=trace_id_for(file_id),
+        span_id=span_id or 1,
+        is_remote=True,
+        trace_flags=TraceFlags(TraceFlags.SAMPLED),
+    )
+    return trace.set_span_in_context(NonRecordingSpan(parent))
+
+
+def _clean(attributes: dict[str, Any]) -> dict[str, Any]:
+    return {key: value for key, value in attributes.items() if value is not None}
+
+
+@contextmanager
+def span(name: str, attributes: Optional[dict[str, Any]] = None) -> Iterator[Any]:
+    if trace is None:
+        yield None
+        return
+    with trace.get_tracer("backend").start_as_current_span(
+        name, attributes=_clean(attributes or {})
+    ) as current:
+        yield current
+
+
+@contextmanager
+def file_trace(
+    file_id: str, name: str, attributes: Optional[dict[str, Any]] = None, kind=None
+) -> Iterator[Any]:
+    if trace is None:
+        yield None
+        return
+
+    current = trace.get_current_span().get_span_context()
+    context, links = None, []
+    if not (current.is_valid and current.trace_id == trace_id_for(file_id)):
+        context = _file_context(file_id)
+        # a requisição que originou o trabalho (ex.: upload) continua navegável
+        if current.is_valid:
+            links.append(Link(current))
+
+    with trace.get_tracer("backend").start_as_current_span(
+        name,
+        context=context,
+        links=links,
+        kind=kind or SpanKind.INTERNAL,
+        attributes=_clean(
+            {"file.id": file_id, "request.id": request_id_var.get(), **(attributes or {})}
+        ),
+    ) as current_span:
+        yield current_span
+
+
+def set_attributes(attributes: dict[str, Any]) -> None:
+    if trace is None:
+        return
+    current = trace.get_current_span()
+    if current.is_recording():
+        current.set_attributes(_clean(attributes))
+
+
+class FileSpanExporter(SpanExporter):
+    # um span por linha (JSON), para inspecionar sem um collector
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+
+    def export(self, spans) -> "SpanExportResult":
+        with open(self.path, "a", encoding="utf-8") as f:
+            for finished in spans:
+                f.write(finished.to_json(indent=None) + "\n")
+        return SpanExportResult.SUCCESS
+
+    def shutdown(self) -> None:
+        pass
+
+
+def setup_tracing() -> None:
+    global _provider
+    if not settings.TRACING_ENABLED or _provider is not None:
+        return
+    if trace is None:
+        log.warning("TRACING_ENABLED is set but opentelemetry-sdk is not installed")
+        return
+
+    if settings.TRACING_EXPORTER == "file":
+        exporter = FileSpanExporter(settings.TRACING_FILE_PATH)
+    elif settings.TRACING_EXPORTER == "console":
+        exporter = ConsoleSpanExporter()
+    else:
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+
+        exporter = OTLPSpanExporter(endpoint=settings.TRACING_OTLP_ENDPOINT)
+
+    _provider = TracerProvider(
+        resource=Resource.create({"service.name": settings.TRACING_SERVICE_NAME})
+    )
+    _provider.add_span_processor(BatchSpanProcessor(exporter))
+    trace.set_tracer_provider(_provider)
+    log.info("Tracing enabled - exporter: %s", settings.TRACING_EXPORTER)
+
+
+def shutdown_tracing() -> None:
+    if _provider is not None:
+        _provider.shutdown()
+
+
+class ContextThreadPoolExecutor(ThreadPoolExecutor):
+    # run_in_executor não copia contextvars; sem isso os spans (e o request id)
+    # abertos nas threads perderiam o pai
+    def submit(self, fn, /, *args, **kwargs):
+        return super().submit(contextvars.copy_context().run, fn, *args, **kwargs)
+
+
+def install_context_executor() -> None:
+    asyncio.get_running_loop().set_default_executor(ContextThreadPoolExecutor())
+
+
+def _find_file_id(scope: Scope) -> Optional[str]:
+    match = UUID_PATTERN.search(scope.get("path", "")) or UUID_PATTERN.search(
+        scope.get("query_string", b"").decode("latin-1")
+    )
+    return match.group(0).lower() if match else None
+
+
+# request id (X-Request-ID recebido ou gerado) + span da requisição no trace do file_id
+class RequestContextMiddleware:
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or ())
+        request_id = headers.get(b"x-request-id", b"").decode("latin-1") or uuid.uuid4().hex
+        token = request_id_var.set(request_id)
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                message.setdefault("headers", [])
+                message["headers"] = [*message["headers"], (b"x-request-id", request_id.encode("latin-1"))]
+            await send(message)
+
+        method = scope["method"]
+        file_id = _find_file_id(scope)
+        attributes = {"http.request.method": method, "url.path": scope.get("path")}
+        try:
+            if file_id is not None and trace is not None:
+                request_span = file_trace(file_id, method, attributes, kind=SpanKind.SERVER)
+            else:
+                request_span = span(method, {**attributes, "request.id": request_id})
+            with request_span as current:
+                try:
+                    await self.app(scope, receive, send_wrapper)
+                finally:
+                    if current is not None:
+                        route = getattr(scope.get("route"), "path", None)
+                        if route:
+                            current.update_name(f"{method} {route}")
+                            current.set_attribute("http.route", route)
+                        current.set_attribute("http.response.status_code", status_code)
+        finally:
+            request_id_var.reset(token)
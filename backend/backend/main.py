@@ -1,16 +1,51 @@
-from fastapi import FastAPI
+import asyncio
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 from backend.api.routes import router
 
 from backend.core.cache_db import cache_db
+from backend.core.storage import storage
+from backend.core.metrics import MetricsMiddleware, render_metrics
+from backend.core.tracing import (
+    RequestContextMiddleware,
+    install_context_executor,
+    setup_tracing,
+    shutdown_tracing,
+)
 from backend.services.csv_service import csv_service
+from backend.services.gc_service import gc_service
+from backend.services.llm_service import llm_service
+from backend.services.pipeline_service import pipeline_service
 from backend.core.logging import setup_logging
 from backend.core.settings import settings
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # o import não tem efeitos colaterais; diretórios, tracing e SDKs entram aqui
+    storage.setup()
+    setup_tracing()
+    install_context_executor()
+    if settings.LLM_PRELOAD:
+        # a API já responde enquanto os SDKs carregam; o primeiro /process não paga o import
+        asyncio.get_event_loop().run_in_executor(None, llm_service.preload)
+    gc_task = asyncio.create_task(gc_service.run_forever()) if settings.GC_ENABLED else None
+    job_tasks = pipeline_service.start_workers(settings.JOB_WORKERS)
+    yield
+    if gc_task is not None:
+        gc_task.cancel()
+    for task in job_tasks:
+        task.cancel()
+    await cache_db.close()
+    shutdown_tracing()
+
+
 app = FastAPI(
     title=settings.PROJECT_NAME,
     description="API to process csv files using LLM",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
 log = setup_logging("backend.main")
@@ -23,19 +58,25 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(RequestContextMiddleware)
 
 
 @app.get("/")
 async def health_check() -> dict[str, str]:
     return {"status": "healthy", "message": "CSV Processor API is running"}
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics() -> Response:
+    payload, content_type = render_metrics()
+    return Response(content=payload, media_type=content_type)
+
 @app.get('/data')
 async def data(file_id: str):
-    print(file_id)
     data_summary = await csv_service.get_data_summary(file_id)
     return data_summary
 
 @app.get('/redis/{file_id}')
 async def redis_status(file_id: str):
-    status = cache_db.get_status(file_id)
+    status = await cache_db.get_status(file_id)
     return status
\ No newline at end of file
@@ -35,6 +35,7 @@ class DataSummarySchema(BaseModel):
     sample_rows: list[dict[str, Any]]
     duplicate_rows: int
     memory_usage: str
+    memory_usage_compacted: Optional[str] = None  # com DTYPE_COMPACTION ligado
 
 class ProcessResponseSchema(BaseResponseSchema):
     script: str
@@ -54,6 +55,39 @@ class ExecuteResponseSchema(BaseResponseSchema):
     error_message: Optional[str] = None
     processed_rows: Optional[int] = None
 
+class AppendResponseSchema(BaseResponseSchema):
+    mode: str  # incremental | full | stored
+    appended_rows: int  # linhas recebidas neste append
+    processed_rows: Optional[int] = None  # total do arquivo processado, em qualquer modo
+    skipped_duplicates: int = 0
+
+class DiffRecordSchema(BaseModel):
+    status: str  # changed | added | dropped
+    row: Optional[int] = None  # posição no arquivo processado
+    original_row: Optional[int] = None  # posição no arquivo original
+    columns: list[str]  # alteradas (changed) ou todas as do arquivo (added/dropped)
+    before: Optional[list[Optional[str]]] = None
+    after: Optional[list[Optional[str]]] = None
+
+class DiffResponseSchema(BaseResponseSchema):
+    alignment: str  # key | lineage | position | content
+    key: Optional[list[str]] = None
+    original_rows: int
+    processed_rows: int
+    changed_rows: int
+    added_rows: int
+    dropped_rows: int
+    changed_cells: int
+    column_changes: dict[str, int]
+    added_columns: list[str]
+    dropped_columns: list[str]
+    renamed_columns: dict[str, str]
+    status: str
+    page: int
+    page_size: int
+    total: int
+    records: list[DiffRecordSchema]
+
 class ProcessedDataSchema(BaseModel):
     columns: list[str]
     data: list[dict[str, Any]]
@@ -63,3 +97,51 @@ class ResultResponseSchema(BaseResponseSchema):
     data: list[dict[str, Any]]
     columns: list[str]
     rows_count: int
+
+class ColumnarResultResponseSchema(BaseResponseSchema):
+    columns: list[str]
+    values: list[list[Any]]
+    rows_count: int
+
+class GCReportSchema(BaseModel):
+    expired: int = 0
+    evicted: int = 0
+    reclaimed_bytes: int = 0
+    disk_usage_bytes: int = 0
+    duration_seconds: float = 0.0
+
+class JobResponseSchema(BaseModel):
+    job_id: str
+    job_state: str
+    job_stage: Optional[str] = None
+    job_error: Optional[str] = None
+    job_tenant: Optional[str] = None
+    job_priority: Optional[str] = None
+    status: dict[str, Any] = {}
+
+class BatchFileReportSchema(BaseModel):
+    filename: str
+    file_id: Optional[str] = None
+    schema_group: Optional[str] = None
+    execution_success: bool = False
+    processed_rows: Optional[int] = None
+    error_message: Optional[str] = None
+
+class BatchResponseSchema(BaseModel):
+    message: str
+    files_count: int
+    groups_count: int
+    succeeded: int
+    failed: int
+    duration_seconds: float
+    files: list[BatchFileReportSchema]
+
+class WaitTimeSchema(BaseModel):
+    samples: int
+    p50: float
+    p95: float
+
+class QueueMetricsSchema(BaseModel):
+    depth: int
+    tenants: dict[str, int]
+    wait_seconds: dict[str, WaitTimeSchema]
@@ -0,0 +1,678 @@
+import ast
+import asyncio
+import os
+import time
+import uuid
+from contextlib import asynccontextmanager
+from typing import Literal, Optional
+
+import numpy as np
+import pandas as pd
+from fastapi import UploadFile
+
+from backend.core.cache_db import CacheDB, cache_db
+from backend.core.logging import setup_logging
+from backend.core.metrics import stage_timer
+from backend.core.settings import settings
+from backend.core.tracing import file_trace, set_attributes
+from backend.models.schemas import AppendResponseSchema
+from backend.services.csv_service import CSVService, csv_service
+from backend.services.execution_service import ExecutionService, execution_service, script_digest
+from backend.services.pipeline_service import PipelineService, pipeline_service
+
+log = setup_logging("backend.append_service")
+
+AppendMode = Literal["incremental", "full", "stored"]
+# rows: cada linha de saída depende só da sua linha de entrada
+# dedup: idem, mais drop_duplicates, checado contra o índice de chaves persistido
+# dataset: agregações, ordem, janelas... o arquivo inteiro é reprocessado
+ScriptScope = Literal["rows", "dedup", "dataset"]
+
+DEDUP_HOOK = "__append_dedup__"
+
+# só estas construções são reconhecidas como por linha; qualquer outra coisa aplicada aos
+# dados (chamada, atributo, builtin) faz o arquivo inteiro ser reprocessado
+
+# métodos de Series/DataFrame em que cada linha de saída depende só da sua linha de entrada
+VALUE_METHODS = frozenset({
+    "astype", "fillna", "replace", "map", "apply", "applymap", "where", "mask", "clip", "round",
+    "abs", "isna", "isnull", "notna", "notnull", "isin", "between", "rename", "drop", "dropna",
+    "drop_duplicates", "copy", "assign", "insert", "pop", "reset_index", "combine_first",
+    "to_frame", "get", "eq", "ne", "lt", "le", "gt", "ge", "add", "sub", "mul", "div", "truediv",
+    "floordiv", "mod", "pow", "radd", "rsub", "rmul", "rdiv", "rtruediv", "rfloordiv", "rmod",
+})
+# agregações que com axis=1 ficam dentro da linha
+ROW_WISE_CALLS = frozenset({
+    "mean", "median", "std", "var", "sum", "prod", "min", "max", "count", "nunique", "all", "any",
+})
+# atributos dos dados que não olham para as outras linhas (além das próprias colunas)
+VALUE_ATTRIBUTES = frozenset({"str", "dt", "loc", "columns", "dtypes", "dtype", "name"})
+# colunas e tipos são os mesmos no delta: não contaminam o que é derivado deles
+SCHEMA_ATTRIBUTES = frozenset({"columns", "dtypes", "dtype"})
+# métodos dos acessores são por valor (.str.len(), .dt.day), menos estes
+VALUE_ACCESSORS = frozenset({"str", "dt"})
+ACCESSOR_DATASET_METHODS = frozenset({"cat", "get_dummies"})
+
+# funções de módulo por valor; None libera o módulo inteiro
+MODULE_CALLS: dict[str, Optional[frozenset]] = {
+    "pandas": frozenset({
+        "to_numeric", "to_datetime", "to_timedelta", "isna", "isnull", "notna", "notnull",
+        "Timestamp", "Timedelta", "cut",
+    }),
+    "numpy": frozenset({
+        "where", "select", "isnan", "isfinite", "floor", "ceil", "round", "abs", "sign", "log",
+        "log1p", "log10", "log2", "exp", "sqrt", "clip", "maximum", "minimum", "power", "mod",
+        "float64", "float32", "int64", "int32",
+    }),
+    "re": None,
+    "datetime": None,
+    "math": None,
+}
+DEFAULT_MODULES = {"pd": "pandas", "np": "numpy", "re": "re", "datetime": "datetime"}
+
+# métodos de texto, regex, datas e leitura de dict: seguros em constantes e variáveis locais
+PURE_METHODS = frozenset({
+    "strip", "lstrip", "rstrip", "lower", "upper", "title", "capitalize", "casefold", "replace",
+    "split", "rsplit", "join", "startswith", "endswith", "find", "rfind", "count", "format",
+    "zfill", "ljust", "rjust", "center", "partition", "rpartition", "encode", "decode",
+    "isdigit", "isalpha", "isalnum", "isnumeric", "isdecimal", "isspace", "islower", "isupper",
+    "sub", "subn", "match", "fullmatch", "search", "findall", "finditer", "group", "groups",
+    "get", "strftime", "strptime", "date", "time", "isoformat",
+})
+
+
+def _keyword(node: ast.Call, name: str) -> Optional[ast.expr]:
+    return next((kw.value for kw in node.keywords if kw.arg == name), None)
+
+
+def _is_constant(node: Optional[ast.expr], *values) -> bool:
+    return isinstance(node, ast.Constant) and node.value in values
+
+
+def _row_wise(node: ast.Call) -> bool:
+    return _is_constant(_keyword(node, "axis"), 1, "columns")
+
+
+def _frame_receiver(node: ast.expr) -> bool:
+    # df.apply(f) e df[["a", "b"]].apply(f) recebem colunas inteiras; df["a"].apply(f) não
+    if isinstance(node, ast.Name):
+        return True
+    return isinstance(node, ast.Subscript) and isinstance(node.slice, (ast.List, ast.Tuple))
+
+
+# máscaras booleanas: selecionam linhas pelo valor, não pelo rótulo
+MASK_METHODS = frozenset({
+    "isna", "isnull", "notna", "notnull", "isin", "between", "eq", "ne", "lt", "le", "gt", "ge",
+    "contains", "startswith", "endswith", "match", "fullmatch",
+})
+
+
+def _is_mask(node: ast.expr) -> bool:
+    if isinstance(node, ast.Compare):
+        return True
+    if isinstance(node, ast.BinOp) and isinstance(node.op, (ast.BitAnd, ast.BitOr, ast.BitXor)):
+        return True
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.Invert):
+        return True
+    return (
+        isinstance(node, ast.Call)
+        and isinstance(node.func, ast.Attribute)
+        and node.func.attr in MASK_METHODS
+    )
+
+
+def _is_full_slice(node: ast.expr) -> bool:
+    return isinstance(node, ast.Slice) and node.lower is None and node.upper is None and node.step is None
+
+
+def _is_label(node: ast.expr) -> bool:
+    # rótulos de linha (df["a"][0], s[[1, 2]]); o delta começa no índice 0 de novo
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.USub, ast.UAdd)):
+        node = node.operand
+    if isinstance(node, ast.Constant):
+        return not isinstance(node.value, str)
+    if isinstance(node, (ast.List, ast.Tuple)):
+        return any(_is_label(element) for element in node.elts)
+    return False
+
+
+def _is_dedup(node: ast.AST) -> bool:
+    return (
+        isinstance(node, ast.Call)
+        and isinstance(node.func, ast.Attribute)
+        and node.func.attr == "drop_duplicates"
+    )
+
+
+def _root(node: ast.expr) -> ast.expr:
+    while True:
+        if isinstance(node, (ast.Attribute, ast.Subscript)):
+            node = node.value
+        elif isinstance(node, ast.Call):
+            node = node.func
+        else:
+            return node
+
+
+def _assigned_names(target: ast.expr) -> set[str]:
+    # df[col] = ... altera df, não col
+    if isinstance(target, (ast.Tuple, ast.List)):
+        return set().union(*(_assigned_names(element) for element in target.elts))
+    if isinstance(target, ast.Starred):
+        return _assigned_names(target.value)
+    root = _root(target)
+    return {root.id} if isinstance(root, ast.Name) else set()
+
+
+def _modules(tree: ast.AST) -> dict[str, str]:
+    # nome local -> módulo (import numpy as np, from datetime import datetime)
+    modules = dict(DEFAULT_MODULES)
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                modules[alias.asname or alias.name.split(".")[0]] = alias.name.split(".")[0]
+        elif isinstance(node, ast.ImportFrom) and node.module:
+            for alias in node.names:
+                modules[alias.asname or alias.name] = node.module.split(".")[0]
+    return modules
+
+
+class _ScopeVisitor(ast.NodeVisitor):
+    def __init__(self, modules: dict[str, str], columns: frozenset = frozenset()) -> None:
+        self.reasons: list[str] = []
+        self.dedup_sites = 0
+        self.modules = modules
+        self.columns = columns
+        self.tainted: set[str] = {"df"}
+        self._inplace_ok: set[int] = set()
+        self._parameters: list[set[str]] = []
+
+    def taint(self, tree: ast.AST) -> None:
+        # nomes derivados dos dados, em ponto fixo (a ordem das atribuições não importa)
+        assignments = []
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Assign):
+                assignments.append((node.targets, node.value))
+            elif isinstance(node, (ast.AugAssign, ast.AnnAssign)) and node.value is not None:
+                assignments.append(([node.target], node.value))
+            elif isinstance(node, (ast.For, ast.comprehension)):
+                assignments.append(([node.target], node.iter))
+            elif isinstance(node, ast.NamedExpr):
+                assignments.append(([node.target], node.value))
+        changed = True
+        while changed:
+            changed = False
+            for targets, value in assignments:
+                if self._derived(value):
+                    names = set().union(*(_assigned_names(target) for target in targets))
+                    if not names <= self.tainted:
+                        self.tainted |= names
+                        changed = True
+
+    def _derived(self, node: ast.AST) -> bool:
+        # a expressão usa valores dos dados? df.columns e df.dtypes não contam
+        if isinstance(node, ast.Attribute) and node.attr in SCHEMA_ATTRIBUTES:
+            return False
+        if isinstance(node, ast.Name):
+            return node.id in self.tainted
+        return any(self._derived(child) for child in ast.iter_child_nodes(node))
+
+    def _in_function(self) -> bool:
+        return bool(self._parameters)
+
+    def _is_parameter(self, node: ast.expr) -> bool:
+        return isinstance(node, ast.Name) and any(node.id in names for names in self._parameters)
+
+    def _is_module(self, node: ast.expr) -> bool:
+        return isinstance(node, ast.Name) and node.id in self.modules and node.id not in self.tainted
+
+    def _is_data(self, node: ast.expr) -> bool:
+        # dados do dataset: derivados de df ou resultado de uma função do pandas/numpy
+        root = _root(node)
+        return self._derived(node) or (
+            node is not root and self._is_module(root) and self.modules[root.id] in ("pandas", "numpy")
+        )
+
+    def _visit_function(self, node) -> None:
+        # parâmetros de lambda/função são valores (ou a linha, com axis=1), nunca o dataset
+        self._parameters.append({arg.arg for arg in node.args.args})
+        if isinstance(node, ast.Lambda):
+            self.visit(node.body)
+        else:
+            for statement in node.body:
+                self.visit(statement)
+        self._parameters.pop()
+
+    visit_Lambda = visit_FunctionDef = _visit_function
+
+    def visit_Global(self, node) -> None:
+        # estado compartilhado entre as linhas (contadores, conjuntos de vistos)
+        self.reasons.append("global")
+
+    visit_Nonlocal = visit_Global
+
+    def visit_Name(self, node: ast.Name) -> None:
+        if self._in_function() and node.id in self.tainted:
+            # callback que enxerga o dataset
+            self.reasons.append(f"closure:{node.id}")
+
+    def visit_Expr(self, node: ast.Expr) -> None:
+        # df.drop_duplicates(inplace=True) como instrução vira uma atribuição
+        if _is_dedup(node.value) and isinstance(node.value.func.value, ast.Name):
+            self._inplace_ok.add(id(node.value))
+        self.generic_visit(node)
+
+    def _visit_iteration(self, node) -> None:
+        if self._derived(node.iter):
+            self.reasons.append("iteration")
+        self.generic_visit(node)
+
+    visit_For = visit_comprehension = _visit_iteration
+
+    def _visit_arguments(self, node: ast.Call) -> None:
+        for arg in node.args:
+            self.visit(arg)
+        for keyword in node.keywords:
+            self.visit(keyword.value)
+
+    def _module_call(self, module: str, name: str, node: ast.Call) -> None:
+        allowed = MODULE_CALLS.get(module, frozenset())
+        if allowed is not None and name not in allowed:
+            self.reasons.append(f"{module}.{name}")
+        elif module == "pandas" and name == "to_datetime" and _keyword(node, "format") is None:
+            # sem format, o pandas deduz o formato pela primeira data válida
+            self.reasons.append("to_datetime")
+        elif module == "pandas" and name == "cut":
+            bins = node.args[1] if len(node.args) > 1 else _keyword(node, "bins")
+            if not isinstance(bins, (ast.List, ast.Tuple)):
+                self.reasons.append("cut")
+
+    def visit_Call(self, node: ast.Call) -> None:
+        func = node.func
+        if isinstance(func, ast.Name):
+            if func.id == "print":
+                # o que o script só imprime não muda os dados
+                return
+            if func.id in self.modules and func.id not in self.tainted:
+                # from pandas import to_numeric
+                self._module_call(self.modules[func.id], func.id, node)
+            elif any(self._derived(arg) for arg in [*node.args, *(kw.value for kw in node.keywords)]):
+                # max(df["id"]), set(df["id"]), len(df), helper(df)...
+                self.reasons.append(f"{func.id}()")
+            self.visit(func)
+            self._visit_arguments(node)
+            return
+        if not isinstance(func, ast.Attribute):
+            self.reasons.append("call")
+            self.generic_visit(node)
+            return
+
+        receiver, name = func.value, func.attr
+        self._visit_arguments(node)
+        if self._is_parameter(_root(receiver)):
+            # x.strip() dentro de um callback
+            self.visit(receiver)
+            return
+        if self._is_module(receiver) or (
+            isinstance(receiver, ast.Attribute) and self._is_module(_root(receiver))
+            and not self._derived(receiver)
+        ):
+            self._module_call(self.modules[_root(receiver).id], name, node)
+            return
+
+        self.visit(receiver)
+        if not self._is_data(receiver):
+            # constantes e variáveis locais ("-".join, padrao.sub)
+            if name not in PURE_METHODS:
+                self.reasons.append(name)
+            return
+
+        if isinstance(receiver, ast.Attribute) and receiver.attr in VALUE_ACCESSORS:
+            if name in ACCESSOR_DATASET_METHODS and not (name == "cat" and (node.args or node.keywords)):
+                self.reasons.append(f"{receiver.attr}.{name}")
+            return
+        if name == "drop_duplicates":
+            keep = _keyword(node, "keep")
+            inplace = _keyword(node, "inplace")
+            if keep is not None and not _is_constant(keep, "first"):
+                self.reasons.append("drop_duplicates(keep=...)")
+            elif inplace is not None and not _is_constant(inplace, False) and id(node) not in self._inplace_ok:
+                self.reasons.append("drop_duplicates(inplace=...)")
+            self.dedup_sites += 1
+        elif name in ROW_WISE_CALLS and _row_wise(node):
+            return
+        elif name not in VALUE_METHODS:
+            self.reasons.append(name)
+        elif name == "apply" and _frame_receiver(receiver) and not _row_wise(node):
+            self.reasons.append("apply")
+        elif name == "fillna" and _keyword(node, "method") is not None:
+            self.reasons.append("fillna(method=...)")
+        elif name == "dropna" and _row_wise(node):
+            self.reasons.append("dropna(axis=1)")
+        elif name == "drop" and not (_row_wise(node) or _keyword(node, "columns") is not None):
+            # drop(0), drop(index=...): rótulos de linha apontam para outras linhas no delta
+            self.reasons.append("drop")
+        elif name == "reset_index" and not _is_constant(_keyword(node, "drop"), True):
+            # sem drop=True a posição vira coluna
+            self.reasons.append("reset_index")
+        elif name == "isin" and not all(
+            isinstance(arg, (ast.List, ast.Tuple, ast.Set, ast.Constant)) for arg in node.args
+        ):
+            self.reasons.append("isin")
+
+    def visit_Attribute(self, node: ast.Attribute) -> None:
+        self.visit(node.value)
+        root = _root(node.value)
+        if self._is_parameter(root) or self._is_module(root) or not self._derived(node.value):
+            return
+        if node.attr not in VALUE_ATTRIBUTES and node.attr not in self.columns:
+            # df.index, df.values, df.shape, df.iloc...
+            self.reasons.append(node.attr)
+
+    def visit_Subscript(self, node: ast.Subscript) -> None:
+        value, selector = node.value, node.slice
+        if isinstance(value, ast.Attribute) and value.attr == "str" or not self._is_data(value):
+            # .str[:3] e x[0] num callback são por valor
+            self.generic_visit(node)
+            return
+        if isinstance(value, ast.Attribute) and value.attr == "loc":
+            # .loc só com máscara booleana ou todas as linhas: df.loc[df.a > 1, "b"] = ...
+            rows = selector.elts[0] if isinstance(selector, ast.Tuple) and selector.elts else selector
+            if not (_is_mask(rows) or _is_full_slice(rows)):
+                self.reasons.append("loc")
+        elif isinstance(selector, ast.Slice):
+            # fatias de linhas (df[:10])
+            self.reasons.append("slice")
+        elif _is_label(selector) or (self._derived(selector) and not _is_mask(selector)):
+            # df["a"][0], df[serie_de_rotulos]
+            self.reasons.append("label")
+        self.generic_visit(node)
+
+
+def script_scope(script: str, columns: Optional[list[str]] = None) -> ScriptScope:
+    try:
+        tree = ast.parse(script)
+    except SyntaxError:
+        return "dataset"
+    visitor = _ScopeVisitor(_modules(tree), frozenset(columns or ()))
+    visitor.taint(tree)
+    visitor.visit(tree)
+    if visitor.reasons:
+        log.info("Script is dataset-wide: %s", ", ".join(sorted(set(visitor.reasons))))
+        return "dataset"
+    return "dedup" if visitor.dedup_sites else "rows"
+
+
+class _DedupRewriter(ast.NodeTransformer):
+    def __init__(self) -> None:
+        self.sites = 0
+
+    def _hook(self, node: ast.Call) -> ast.Call:
+        subset = node.args[0] if node.args else _keyword(node, "subset")
+        ignore_index = _keyword(node, "ignore_index")
+        call = ast.Call(
+            func=ast.Name(id=DEDUP_HOOK, ctx=ast.Load()),
+            args=[node.func.value, ast.Constant(self.sites)],
+            keywords=[
+                ast.keyword(arg="subset", value=subset or ast.Constant(None)),
+                ast.keyword(arg="ignore_index", value=ignore_index or ast.Constant(False)),
+            ],
+        )
+        self.sites += 1
+        return ast.copy_location(call, node)
+
+    def visit_Expr(self, node: ast.Expr):
+        call = node.value
+        inplace = (
+            _is_dedup(call)
+            and isinstance(call.func.value, ast.Name)
+            and _is_constant(_keyword(call, "inplace"), True)
+        )
+        self.generic_visit(node)
+        if not inplace:
+            return node
+        # df.drop_duplicates(inplace=True) vira df = __append_dedup__(df, ...)
+        return ast.copy_location(
+            ast.Assign(targets=[ast.Name(id=call.func.value.id, ctx=ast.Store())], value=node.value), node
+        )
+
+    def visit_Call(self, node: ast.Call):
+        self.generic_visit(node)
+        return self._hook(node) if _is_dedup(node) else node
+
+
+def instrument_dedup(script: str) -> str:
+    # troca cada drop_duplicates por uma chamada ao índice de chaves, uma por ponto do script
+    tree = _DedupRewriter().visit(ast.parse(script))
+    return ast.unparse(ast.fix_missing_locations(tree))
+
+
+def key_hashes(frame, subset=None) -> np.ndarray:
+    if isinstance(frame, pd.Series):
+        keys = frame.to_frame()
+    elif subset is None:
+        keys = frame
+    else:
+        keys = frame[[subset] if isinstance(subset, str) else list(subset)]
+
+    # o delta e o arquivo inteiro podem inferir tipos diferentes para o mesmo valor (1 e 1.0)
+    normalized = {}
+    for position in range(keys.shape[1]):
+        series = keys.iloc[:, position]
+        if series.dtype.kind in "biuf":
+            series = series.astype(np.float64)
+        elif isinstance(series.dtype, pd.CategoricalDtype) or series.dtype == "string":
+            series = series.astype(object).where(series.notna(), np.nan)
+        normalized[position] = series.reset_index(drop=True)
+    return pd.util.hash_pandas_object(pd.DataFrame(normalized), index=False).to_numpy()
+
+
+EMPTY_KEYS = np.empty(0, dtype=np.uint64)
+
+
+class DedupIndex:
+    # chaves já vistas por ponto de drop_duplicates, como arrays uint64 ordenados
+    def __init__(self, keys: Optional[dict[int, np.ndarray]] = None) -> None:
+        self.keys = keys or {}
+        self.skipped = 0
+
+    def seen(self, site: int, hashes: np.ndarray) -> np.ndarray:
+        known = self.keys.get(site, EMPTY_KEYS)
+        if not len(known):
+            return np.zeros(len(hashes), dtype=bool)
+        positions = np.searchsorted(known, hashes)
+        positions[positions == len(known)] = 0
+        return known[positions] == hashes
+
+    def __call__(self, frame, site: int, subset=None, ignore_index: bool = False):
+        if isinstance(frame, pd.Series):
+            result = frame.drop_duplicates(keep="first")
+        else:
+            result = frame.drop_duplicates(subset=subset, keep="first")
+
+        hashes = key_hashes(result, subset)
+        seen = self.seen(site, hashes)
+        if seen.any():
+            result = result[~seen]
+            hashes = hashes[~seen]
+            self.skipped += int(seen.sum())
+        self.keys[site] = np.union1d(self.keys.get(site, EMPTY_KEYS), hashes)
+        return result.reset_index(drop=True) if ignore_index else result
+
+
+class AppendLockTimeout(TimeoutError):
+    pass
+
+
+class AppendService:
+    def __init__(
+        self,
+        csv_service: CSVService,
+        execution_service: ExecutionService,
+        pipeline_service: PipelineService,
+        cache_db: CacheDB,
+    ) -> None:
+        self.csv_service = csv_service
+        self.execution_service = execution_service
+        self.pipeline_service = pipeline_service
+        self.cache_db = cache_db
+
+    @asynccontextmanager
+    async def _file_lock(self, file_id: str):
+        # appends no mesmo arquivo são serializados entre todos os workers
+        name = f"append:{file_id}"
+        deadline = time.monotonic() + settings.APPEND_LOCK_WAIT_SECONDS
+        while not (token := await self.cache_db.try_lock(name, settings.APPEND_LOCK_TTL_SECONDS)):
+            if time.monotonic() >= deadline:
+                raise AppendLockTimeout(f"Another append to file {file_id} is still running")
+            await asyncio.sleep(0.1)
+        try:
+            yield
+        finally:
+            if not await self.cache_db.release_lock(name, token):
+                log.warning(
+                    "Append lock on %s expired before the append finished (APPEND_LOCK_TTL_SECONDS=%d)",
+                    file_id, settings.APPEND_LOCK_TTL_SECONDS,
+                )
+
+    def _index_key(self, file_id: str) -> str:
+        return f"processed/{file_id}_dedup.npz"
+
+    async def _load_index(self, file_id: str, digest: str, upload_bytes: int) -> Optional[DedupIndex]:
+        index_path = await self.csv_service.storage.fetch(self._index_key(file_id))
+        if index_path is None:
+            return None
+
+        def load() -> Optional[DedupIndex]:
+            with np.load(index_path) as data:
+                # o índice só vale para o mesmo script e o mesmo upload que o gerou
+                if str(data["script"]) != digest or int(data["upload_bytes"]) != upload_bytes:
+                    return None
+                return DedupIndex({
+                    int(name.removeprefix("site_")): data[name]
+                    for name in data.files
+                    if name.startswith("site_")
+                })
+
+        return await asyncio.get_event_loop().run_in_executor(None, load)
+
+    async def _save_index(self, file_id: str, digest: str, index: DedupIndex) -> None:
+        key = self._index_key(file_id)
+        index_path = self.csv_service.storage.path(key)
+        upload_bytes = self.csv_service.storage.path(self.csv_service._upload_key(file_id)).stat().st_size
+
+        def save() -> None:
+            tmp_path = index_path.with_name(f"{index_path.name}.{uuid.uuid4().hex}.tmp")
+            try:
+                with open(tmp_path, "wb") as f:
+                    np.savez(
+                        f,
+                        script=np.array(digest),
+                        upload_bytes=np.array(upload_bytes),
+                        **{f"site_{site}": keys for site, keys in index.keys.items()},
+                    )
+                os.replace(tmp_path, index_path)
+            finally:
+                tmp_path.unlink(missing_ok=True)
+
+        await asyncio.get_event_loop().run_in_executor(None, save)
+        await self.csv_service.storage.publish(key)
+
+    async def _run_full(self, file_id: str, script: str, scope: ScriptScope) -> int:
+        if scope != "dedup":
+            result = await self.pipeline_service.run_script(file_id)
+            return result.processed_rows
+
+        # mesma saída do /execute; o índice de chaves sai de brinde
+        index = DedupIndex()
+        df = await self.csv_service.get_original_dataframe(file_id)
+        result = await self.execution_service.execute_script(
+            instrument_dedup(script), df, {DEDUP_HOOK: index}
+        )
+        if result.error_message:
+            raise ValueError(f"Error when trying to execute script: {result.error_message}")
+        await self.csv_service.save_processed_data(file_id, result.processed_dataframe)
+        await self._save_index(file_id, script_digest(script), index)
+        return result.processed_rows
+
+    async def _run_delta(
+        self, file_id: str, script: str, rows: pd.DataFrame, index: Optional[DedupIndex]
+    ) -> Optional[int]:
+        if index is not None:
+            result = await self.execution_service.execute_script(
+                instrument_dedup(script), rows, {DEDUP_HOOK: index}
+            )
+        else:
+            result = await self.execution_service.execute_script(script, rows)
+        if result.error_message:
+            raise ValueError(f"Error when trying to execute script: {result.error_message}")
+
+        # total de linhas do arquivo processado, como no modo full
+        total_rows = await self.csv_service.append_processed_data(file_id, result.processed_dataframe)
+        if total_rows is None:
+            return None
+        if index is not None:
+            await self._save_index(file_id, script_digest(script), index)
+        return total_rows
+
+    async def append(self, file_id: str, file: UploadFile) -> AppendResponseSchema:
+        async with self._file_lock(file_id):
+            with file_trace(file_id, "append", {"file.name": file.filename}):
+                if not await self.csv_service.file_exists(file_id):
+                    raise FileNotFoundError("File not found")
+
+                script = await self.csv_service.get_script(file_id)
+                status_info = await self.cache_db.get_status(file_id)
+                executed = (
+                    script is not None
+                    and status_info.get("executed_script") == script_digest(script)
+                    and await self.csv_service.processed_file_exists(file_id)
+                )
+
+                appended = await self.csv_service.append_uploaded_rows(file_id, file)
+                if script is None or not await self.csv_service.processed_file_exists(file_id):
+                    # nada processado ainda: o próximo /execute lê o arquivo inteiro
+                    return AppendResponseSchema(
+                        message="Rows appended", file_id=file_id, mode="stored",
+                        appended_rows=len(appended.rows),
+                    )
+
+                scope = script_scope(script, appended.rows.columns.tolist())
+                index = None
+                if executed and scope == "dedup":
+                    index = await self._load_index(file_id, script_digest(script), appended.previous_bytes)
+                incremental = (
+                    executed
+                    and not appended.dtypes_changed
+                    and (scope == "rows" or (scope == "dedup" and index is not None))
+                )
+
+                # se algo falhar no meio, o próximo append reprocessa tudo
+                await self.cache_db.update_statuses(file_id, {"executed_script": ""})
+                processed_rows = None
+                if incremental:
+                    with stage_timer("append_delta"):
+                        processed_rows = await self._run_delta(file_id, script, appended.rows, index)
+                if processed_rows is None:
+                    log.info("Append on %s reprocesses the whole file (scope: %s)", file_id, scope)
+                    incremental = False
+                    with stage_timer("append_full"):
+                        processed_rows = await self._run_full(file_id, script, scope)
+                await self.cache_db.update_statuses(
+                    file_id, {"script_executed": True, "executed_script": script_digest(script)}
+                )
+
+                mode: AppendMode = "incremental" if incremental else "full"
+                set_attributes({"append.mode": mode, "append.scope": scope})
+                log.info("%d rows appended to %s (%s)", len(appended.rows), file_id, mode)
+                return AppendResponseSchema(
+                    message="Rows appended and processed",
+                    file_id=file_id,
+                    mode=mode,
+                    appended_rows=len(appended.rows),
+                    processed_rows=processed_rows,
+                    skipped_duplicates=index.skipped if incremental and index is not None else 0,
+                )
+
+
+append_service = AppendService(csv_service, execution_service, pipeline_service, cache_db)
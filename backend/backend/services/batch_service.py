@@ -0,0 +1,179 @@
+import asyncio
+import hashlib
+import io
+import time
+import zipfile
+from collections import defaultdict
+from pathlib import PurePosixPath
+from typing import Optional
+
+from fastapi import UploadFile
+
+from backend.core.cache_db import CacheDB, cache_db
+from backend.core.logging import setup_logging
+from backend.core.settings import settings
+from backend.core.tracing import file_trace
+from backend.models.schemas import (
+    BatchFileReportSchema,
+    BatchResponseSchema,
+    DataSummarySchema,
+)
+from backend.services.csv_service import CSVService, csv_service
+from backend.services.pipeline_service import PipelineService, pipeline_service
+
+log = setup_logging("backend.batch_service")
+
+
+def schema_fingerprint(data_summary: DataSummarySchema) -> str:
+    # mesma ordem de colunas e mesmos dtypes -> o mesmo script serve para todos
+    schema = "|".join(f"{column}:{data_summary.data_types[column]}" for column in data_summary.columns)
+    return hashlib.blake2b(schema.encode("utf-8"), digest_size=8).hexdigest()
+
+
+def _megabytes(size: int) -> str:
+    return f"{size / 2**20:g}MB"
+
+
+def _file_too_large(filename: str) -> ValueError:
+    return ValueError(f"File {filename} is too large (max: {_megabytes(settings.MAX_FILE_SIZE)})")
+
+
+def _batch_too_large() -> ValueError:
+    return ValueError(
+        f"Batch is too large (max: {settings.BATCH_MAX_FILES} files, "
+        f"{_megabytes(settings.BATCH_MAX_BYTES)} uncompressed)"
+    )
+
+
+def _extract_zip(content: bytes, max_files: int, max_bytes: int) -> list[tuple[str, bytes]]:
+    with zipfile.ZipFile(io.BytesIO(content)) as archive:
+        members = [
+            info for info in archive.infolist()
+            if not info.is_dir()
+            and PurePosixPath(info.filename).suffix.lower() == ".csv"
+            and "__MACOSX" not in PurePosixPath(info.filename).parts
+        ]
+        # quantidade e tamanhos declarados são checados no índice, antes de descompactar
+        if len(members) > max_files:
+            raise _batch_too_large()
+        for info in members:
+            if info.file_size > settings.MAX_FILE_SIZE:
+                raise _file_too_large(info.filename)
+        if sum(info.file_size for info in members) > max_bytes:
+            raise _batch_too_large()
+        return [(PurePosixPath(info.filename).name, archive.read(info)) for info in members]
+
+
+class BatchService:
+    def __init__(
+        self, csv_service: CSVService, pipeline_service: PipelineService, cache_db: CacheDB
+    ) -> None:
+        self.csv_service = csv_service
+        self.pipeline_service = pipeline_service
+        self.cache_db = cache_db
+
+    async def read_files(self, files: list[UploadFile]) -> list[tuple[str, bytes]]:
+        entries: list[tuple[str, bytes]] = []
+        total_bytes = 0
+        for file in files:
+            filename = file.filename or "unknown.csv"
+            content = await file.read()
+            if filename.lower().endswith(".zip"):
+                extracted = await asyncio.get_event_loop().run_in_executor(
+                    None,
+                    _extract_zip,
+                    content,
+                    settings.BATCH_MAX_FILES - len(entries),
+                    settings.BATCH_MAX_BYTES - total_bytes,
+                )
+            elif filename.lower().endswith(".csv"):
+                if len(content) > settings.MAX_FILE_SIZE:
+                    raise _file_too_large(filename)
+                extracted = [(filename, content)]
+            else:
+                raise ValueError(f"File {filename} must be a csv or zip file")
+
+            entries.extend(extracted)
+            total_bytes += sum(len(data) for _, data in extracted)
+            if len(entries) > settings.BATCH_MAX_FILES:
+                raise _batch_too_large()
+            if total_bytes > settings.BATCH_MAX_BYTES:
+                raise _batch_too_large()
+
+        if not entries:
+            raise ValueError("No csv files found in the batch")
+        return entries
+
+    async def _profile(self, report: BatchFileReportSchema, content: bytes) -> Optional[DataSummarySchema]:
+        try:
+            report.file_id = await self.csv_service.save_csv_content(content)
+            with file_trace(report.file_id, "batch.profile", {"file.name": report.filename}):
+                await self.cache_db.initialize_hash(report.file_id, uploaded=True)
+                data_summary = await self.csv_service.get_data_summary(report.file_id)
+                report.schema_group = schema_fingerprint(data_summary)
+                return data_summary
+        except Exception as e:
+            log.error("Error profiling %s: %s", report.filename, e)
+            report.error_message = f"Invalid csv file: {e}"
+            return None
+
+    async def _execute(self, report: BatchFileReportSchema, script: str) -> None:
+        try:
+            await self.pipeline_service.assign_script(report.file_id, script)
+            result = await self.pipeline_service.run_script(report.file_id)
+            report.execution_success = True
+            report.processed_rows = result.processed_rows
+        except Exception as e:
+            log.error("Error executing batch file %s: %s", report.filename, e)
+            report.error_message = str(e)
+
+    async def _run_group(
+        self, group: str, members: list[tuple[BatchFileReportSchema, DataSummarySchema]]
+    ) -> None:
+        # o maior arquivo do grupo é o que melhor representa os problemas dos dados
+        _, representative = max(members, key=lambda member: member[1].rows_count)
+        log.info("Generating script for schema group %s (%s files)", group, len(members))
+        try:
+            script = await self.pipeline_service.request_script(representative)
+        except Exception as e:
+            log.error("Error generating script for schema group %s: %s", group, e)
+            for report, _ in members:
+                report.error_message = f"Error processing file with LLM: {e}"
+            return
+
+        await asyncio.gather(*(self._execute(report, script) for report, _ in members))
+
+    async def run_batch(self, entries: list[tuple[str, bytes]]) -> BatchResponseSchema:
+        started = time.time()
+        reports = [BatchFileReportSchema(filename=filename) for filename, _ in entries]
+
+        summaries = await asyncio.gather(
+            *(self._profile(report, content) for report, (_, content) in zip(reports, entries))
+        )
+
+        groups: dict[str, list[tuple[BatchFileReportSchema, DataSummarySchema]]] = defaultdict(list)
+        for report, data_summary in zip(reports, summaries):
+            if data_summary is not None:
+                groups[report.schema_group].append((report, data_summary))
+
+        # grupos independentes rodam juntos: o lote leva o tempo do grupo mais lento
+        await asyncio.gather(*(self._run_group(group, members) for group, members in groups.items()))
+
+        succeeded = sum(report.execution_success for report in reports)
+        duration = round(time.time() - started, 3)
+        log.info(
+            "Batch finished - files: %s, groups: %s, succeeded: %s, duration: %ss",
+            len(reports), len(groups), succeeded, duration,
+        )
+        return BatchResponseSchema(
+            message="Batch processado",
+            files_count=len(reports),
+            groups_count=len(groups),
+            succeeded=succeeded,
+            failed=len(reports) - succeeded,
+            duration_seconds=duration,
+            files=reports,
+        )
+
+
+batch_service = BatchService(csv_service, pipeline_service, cache_db)
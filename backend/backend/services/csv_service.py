@@ -1,10 +1,22 @@
 import asyncio
+import importlib.util
+import io
+import json
+import os
+import shutil
 from pathlib import Path
-from typing import Optional
+from typing import AsyncIterator, Iterator, Literal, NamedTuple, Optional
 import aiofiles
 import uuid
 from backend.core.settings import settings
+from backend.core.compaction import compact_dataframe, memory_bytes
+from backend.core.compression import ENCODING_SUFFIXES, compress_file
+from backend.core.csv_reader import CSVDialect, read_csv, sniff_dialect
 from backend.core.logging import setup_logging
+from backend.core.metrics import record_cache, stage_timer, timed_stage
+from backend.core.tracing import file_trace, set_attributes
+from backend.core.serialization import ResultOrient, encode_result, fill_missing
+from backend.core.storage import Storage, storage
 from backend.models.schemas import (
     DataSummarySchema,
     FileInfoSchema,
@@ -14,31 +26,143 @@ import pandas as pd
 
 from fastapi import UploadFile
 
+try:
+    import pyarrow as pa
+    from pyarrow import csv as pa_csv
+    from pyarrow import ipc as pa_ipc
+    from pyarrow import parquet as pq
+except ImportError:  # pyarrow é opcional; sem ele só o CSV é servido
+    pa = None
+
+# openpyxl é opcional, apenas o formato xlsx depende dele; o pandas o importa só ao gerar o xlsx
+XLSX_AVAILABLE = importlib.util.find_spec("openpyxl") is not None
+
 log = setup_logging("CSVService.py")
 
+ProcessedFormat = Literal["csv", "parquet", "feather", "arrow", "jsonl", "xlsx"]
 
-class CSVService:
+# formato -> (extensão do artefato, media type)
+PROCESSED_FORMATS: dict[str, tuple[str, str]] = {
+    "csv": ("csv", "text/csv"),
+    "parquet": ("parquet", "application/vnd.apache.parquet"),
+    "feather": ("arrow", "application/vnd.apache.arrow.file"),
+    "arrow": ("arrow", "application/vnd.apache.arrow.file"),
+    "jsonl": ("jsonl", "application/x-ndjson"),
+    "xlsx": ("xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+}
+
+# formatos binários já são compactos; só os textuais passam por Content-Encoding
+COMPRESSIBLE_FORMATS = {"csv", "jsonl"}
+
+
+class _ChunkSink(io.RawIOBase):
     def __init__(self) -> None:
-        log.info(f"Inicialize CSV Service")
-        self.upload_dir = settings.UPLOAD_DIR
-        self.processed_dir = settings.PROCESSED_DIR
-        log.info(f"CSV Service has been initialized")
+        self.chunks: list[bytes] = []
 
-    async def save_uploaded_file(self, file: UploadFile) -> FileInfoSchema:
-        try:
-            file_id = str(uuid.uuid4())
+    def writable(self) -> bool:
+        return True
 
-            file_path = self.upload_dir / f"{file_id}.csv"
+    def write(self, data) -> int:
+        self.chunks.append(bytes(data))
+        return len(data)
 
-            async with aiofiles.open(file_path, "wb") as buffer:
-                content = await file.read()
-                await buffer.write(content)
+    def drain(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks.clear()
+        return data
 
-            log.info(f"File salvo: {file_path}")
 
-            df = await asyncio.get_event_loop().run_in_executor(
-                None, pd.read_csv, str(file_path)
-            )
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+# o CSV processado é sempre escrito pelo próprio serviço: separador ";" em UTF-8
+PROCESSED_DIALECT = CSVDialect(delimiter=";")
+
+
+@timed_stage("csv_parse")
+def _read_csv(
+    path: str,
+    dialect: Optional[CSVDialect] = None,
+    dtypes: Optional[dict[str, str]] = None,
+    usecols: Optional[list[str]] = None,
+) -> pd.DataFrame:
+    df = read_csv(path, dialect, dtypes, usecols)
+    set_attributes(
+        {"data.rows": len(df), "data.columns": len(df.columns), "data.bytes": os.path.getsize(path)}
+    )
+    return df
+
+
+async def _iter_upload(file: UploadFile) -> AsyncIterator[bytes]:
+    while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+        yield chunk
+
+
+class AppendedRows(NamedTuple):
+    rows: pd.DataFrame  # só as linhas novas, com os tipos do upload original
+    previous_bytes: int  # tamanho do upload antes do append
+    dtypes_changed: bool  # as linhas novas não cabem nos tipos inferidos no upload
+
+
+def _append_bytes(source: Path, target: Path, skip_header: bool) -> None:
+    with open(target, "rb+") as out:
+        out.seek(0, os.SEEK_END)
+        if out.tell():
+            out.seek(-1, os.SEEK_END)
+            if out.read(1) not in (b"\n", b"\r"):
+                out.write(b"\n")
+        with open(source, "rb") as f:
+            if skip_header:
+                f.readline()
+            shutil.copyfileobj(f, out, UPLOAD_CHUNK_SIZE)
+
+
+class CSVService:
+    def __init__(self, storage: Storage) -> None:
+        log.info("Inicialize CSV Service")
+        self.storage = storage
+        # cópias locais dos artefatos; com o backend local são os próprios arquivos
+        self.upload_dir = storage.path("upload")
+        self.processed_dir = storage.path("processed")
+        self._variant_locks: dict[Path, asyncio.Lock] = {}
+        log.info("CSV Service has been initialized")
+
+    def _upload_key(self, file_id: str) -> str:
+        return f"upload/{file_id}.csv"
+
+    def _script_key(self, file_id: str) -> str:
+        return f"upload/{file_id}_script.py"
+
+    def _metadata_key(self, file_id: str) -> str:
+        return f"upload/{file_id}_meta.json"
+
+    def _processed_key(self, file_id: str, format: ProcessedFormat = "csv") -> str:
+        extension = PROCESSED_FORMATS[format][0]
+        return f"processed/{file_id}_processed.{extension}"
+
+    async def save_csv_content(self, content: bytes) -> str:
+        file_id = str(uuid.uuid4())
+        await self.storage.write_bytes(self._upload_key(file_id), content)
+
+        log.info("File salvo: %s", self._upload_key(file_id))
+        return file_id
+
+    async def save_uploaded_file(self, file: UploadFile) -> FileInfoSchema:
+        try:
+            # gravado em blocos: o upload nunca fica inteiro em memória
+            file_id = str(uuid.uuid4())
+            with file_trace(file_id, "upload", {"file.name": file.filename}):
+                with stage_timer("upload_write"):
+                    size = await self.storage.write_stream(
+                        self._upload_key(file_id), _iter_upload(file)
+                    )
+                    set_attributes({"data.bytes": size})
+                file_path = self.storage.path(self._upload_key(file_id))
+                log.info("File salvo: %s", file_path)
+
+                loop = asyncio.get_event_loop()
+                dialect = await loop.run_in_executor(None, sniff_dialect, str(file_path))
+                df = await loop.run_in_executor(None, _read_csv, str(file_path), dialect)
+                await self._save_metadata(file_id, dialect, df)
 
             return FileInfoSchema(
                 file_id=file_id,
@@ -54,47 +178,169 @@ class CSVService:
         except pd.errors.ParserError as e:
             raise ValueError(f"Erro ao analisar CSV: {str(e)}")
         except Exception as e:
-            log.error(e, "save_uploaded_file")
+            log.exception("save_uploaded_file failed - %s", e)
             raise
 
-    def file_exists(self, file_id: str) -> bool:
-        file_path = self.upload_dir / f"{file_id}.csv"
-        return file_path.exists()
+    async def append_uploaded_rows(self, file_id: str, file: UploadFile) -> AppendedRows:
+        upload_path = await self.storage.fetch(self._upload_key(file_id))
+        if upload_path is None:
+            raise FileNotFoundError(f"File {file_id} not found")
+
+        metadata = await self._load_metadata(file_id)
+        if metadata is None:
+            # uploads sem metadata: uma leitura completa detecta e grava
+            await self._read_upload(file_id)
+            metadata = await self._load_metadata(file_id)
+        dialect = CSVDialect.from_dict(metadata["dialect"])
+        dtypes = metadata["dtypes"]
+
+        staging_path = self.upload_dir / f"{file_id}_append.{uuid.uuid4().hex}.tmp"
+        loop = asyncio.get_event_loop()
+        try:
+            with stage_timer("upload_write"):
+                async with aiofiles.open(staging_path, "wb") as f:
+                    async for chunk in _iter_upload(file):
+                        await f.write(chunk)
+
+            delta_dialect = await loop.run_in_executor(None, sniff_dialect, str(staging_path))
+            if delta_dialect.header != dialect.header:
+                delta_dialect = delta_dialect._replace(header=dialect.header, names=dialect.names)
+            try:
+                rows = await loop.run_in_executor(None, _read_csv, str(staging_path), delta_dialect, dtypes)
+                dtypes_changed = rows.dtypes.astype(str).to_dict() != dtypes
+            except ValueError:
+                # ex.: texto numa coluna int64; os tipos do arquivo inteiro mudam
+                rows = await loop.run_in_executor(None, _read_csv, str(staging_path), delta_dialect)
+                dtypes_changed = True
+
+            if rows.columns.tolist() != list(dtypes):
+                raise ValueError(
+                    f"Appended rows must have the same columns as the original file: {list(dtypes)}"
+                )
+
+            previous_bytes = upload_path.stat().st_size
+            with stage_timer("upload_append"):
+                if delta_dialect._replace(multiline=dialect.multiline) == dialect:
+                    # mesmo formato: os bytes vão direto, sem reescrever o CSV
+                    await loop.run_in_executor(
+                        None, _append_bytes, staging_path, upload_path, dialect.header
+                    )
+                else:
+                    await loop.run_in_executor(None, lambda: rows.to_csv(
+                        str(upload_path), mode="a", header=False, index=False,
+                        sep=dialect.delimiter, encoding=dialect.encoding.replace("-sig", ""),
+                    ))
+            await self.storage.publish(self._upload_key(file_id))
+            set_attributes({"data.rows": len(rows), "data.bytes": upload_path.stat().st_size - previous_bytes})
+
+            if dtypes_changed:
+                # a próxima leitura completa infere os tipos de novo
+                await self.storage.delete(self._metadata_key(file_id))
+            elif delta_dialect.multiline and not dialect.multiline:
+                await self._save_metadata(file_id, dialect._replace(multiline=True), rows)
+
+            log.info("%d rows appended to %s", len(rows), upload_path)
+            return AppendedRows(rows, previous_bytes, dtypes_changed)
+
+        except pd.errors.EmptyDataError:
+            raise ValueError("File CSV está vazio")
+        except pd.errors.ParserError as e:
+            raise ValueError(f"Erro ao analisar CSV: {str(e)}")
+        finally:
+            staging_path.unlink(missing_ok=True)
+
+    async def file_exists(self, file_id: str) -> bool:
+        return await self.storage.exists(self._upload_key(file_id))
 
     def script_exists(self, file_id: str) -> bool:
         file_path = self.upload_dir / f'{file_id}_script.py' 
-        log.info(f"starting to search File: {file_id}")
+        log.info("starting to search File: %s", file_id)
         try:
             if (file_path): 
-                log.info(f'File has been processed by LLM')
+                log.info("File has been processed by LLM")
                 return True
-        except Exception as ex:
-            log.error(ex, f"File ID {file_id} was not found")
+        except Exception:
+            log.exception("File ID %s was not found", file_id)
             raise
 
-    def processed_file_exists(self, file_id: str) -> bool:
-        file_path = self.processed_dir / f"{file_id}_processed.csv"
-        return file_path.exists()
+    async def processed_file_exists(self, file_id: str) -> bool:
+        return await self._fetch_processed(file_id) is not None
+
+    async def _fetch_processed(self, file_id: str) -> Optional[Path]:
+        # traz para o disco local o CSV processado e o artefato tipado; os
+        # leitores síncronos (streaming, pyarrow) trabalham só com as cópias locais
+        processed_path = await self.storage.fetch(self._processed_key(file_id))
+        if processed_path is None or pa is None:
+            return processed_path
+
+        typed_key = self._processed_key(file_id, "arrow")
+        if await self.storage.fetch(typed_key) is None:
+            typed_path = await asyncio.get_event_loop().run_in_executor(
+                None, self._typed_artifact, file_id
+            )
+            if typed_path is not None:
+                await self.storage.publish(typed_key)
+        return processed_path
+
+    async def _save_metadata(self, file_id: str, dialect: CSVDialect, df: pd.DataFrame) -> None:
+        # dialeto e tipos inferidos no upload; as leituras seguintes pulam a detecção e a inferência
+        metadata = {
+            "dialect": dialect._asdict(),
+            "dtypes": df.dtypes.astype(str).to_dict(),
+        }
+        await self.storage.write_bytes(self._metadata_key(file_id), json.dumps(metadata).encode("utf-8"))
+
+    async def _load_metadata(self, file_id: str) -> Optional[dict]:
+        metadata_path = await self.storage.fetch(self._metadata_key(file_id))
+        if metadata_path is None:
+            return None
+        async with aiofiles.open(metadata_path, "r", encoding="utf-8") as f:
+            return json.loads(await f.read())
+
+    async def _read_upload(self, file_id: str, columns: Optional[list[str]] = None) -> pd.DataFrame:
+        file_path = await self.storage.fetch(self._upload_key(file_id))
+
+        if file_path is None:
+            raise FileNotFoundError(f"File {file_id} not found")
+
+        loop = asyncio.get_event_loop()
+        metadata = await self._load_metadata(file_id)
+        if metadata is not None:
+            return await loop.run_in_executor(
+                None,
+                _read_csv,
+                str(file_path),
+                CSVDialect.from_dict(metadata["dialect"]),
+                metadata["dtypes"],
+                columns,
+            )
+
+        # uploads anteriores ao metadata (ou gravados via /batch): detecta agora e guarda
+        dialect = await loop.run_in_executor(None, sniff_dialect, str(file_path))
+        df = await loop.run_in_executor(None, _read_csv, str(file_path), dialect, None, columns)
+        if columns is None:
+            await self._save_metadata(file_id, dialect, df)
+        return df
 
     async def get_data_summary(self, file_id: str) -> DataSummarySchema:
         try:
-            file_path = self.upload_dir / f"{file_id}.csv"
+            df = await self._read_upload(file_id)
 
-            if not file_path.exists():
-                raise FileNotFoundError(f"File {file_id} not found")
+            with stage_timer("summary"):
+                # os tipos do prompt são sempre os originais, com ou sem compactação
+                data_types = df.dtypes.astype(str).to_dict()
+                missing_values = df.isnull().sum().to_dict()
+                duplicate_rows = df.duplicated().sum()
+                memory_usage = f"{memory_bytes(df) / 1024:.2f} KB"
 
-            df = await asyncio.get_event_loop().run_in_executor(
-                None, pd.read_csv, str(file_path)
-            )
-
-            data_types = df.dtypes.astype(str).to_dict()
-            missing_values = df.isnull().sum().to_dict()
-            duplicate_rows = df.duplicated().sum()
-            memory_usage = f"{df.memory_usage(deep=True).sum() / 1024:.2f} KB"
+                # limitado para economizar tokens
+                sample_size = min(5, len(df))
+                sample_rows = df.head(sample_size).fillna("").to_dict("records")
 
-            # limitado para economizar tokens
-            sample_size = min(5, len(df))
-            sample_rows = df.head(sample_size).fillna("").to_dict("records")
+            memory_usage_compacted = None
+            if settings.DTYPE_COMPACTION:
+                compacted = await asyncio.get_event_loop().run_in_executor(None, compact_dataframe, df)
+                memory_usage_compacted = f"{memory_bytes(compacted) / 1024:.2f} KB"
 
             return DataSummarySchema(
                 filename=f"{file_id}.csv",
@@ -106,32 +352,30 @@ class CSVService:
                 sample_rows=sample_rows,
                 duplicate_rows=int(duplicate_rows),
                 memory_usage=memory_usage,
+                memory_usage_compacted=memory_usage_compacted,
             )
 
         except Exception as e:
-            log.error(e, f"get_data_summary - file_id: {file_id}")
+            log.exception("get_data_summary failed - file_id: %s - %s", file_id, e)
             raise
 
     async def save_script(self, file_id: str, script: str) -> None:
         try:
-            script_path = self.upload_dir / f"{file_id}_script.py"
-
             script = self.format_script(script=script)
 
-            async with aiofiles.open(script_path, "w", encoding="utf-8") as f:
-                await f.write(script)
+            await self.storage.write_bytes(self._script_key(file_id), script.encode("utf-8"))
 
-            log.info(f"Script was salved in: {script_path}")
+            log.info("Script was salved in: %s", self._script_key(file_id))
 
         except Exception as e:
-            log.error(e, f"save_script - file_id: {file_id}")
+            log.exception("save_script failed - file_id: %s - %s", file_id, e)
             raise
 
     async def get_script(self, file_id: str) -> Optional[str]:
         try:
-            script_path = self.upload_dir / f"{file_id}_script.py"
+            script_path = await self.storage.fetch(self._script_key(file_id))
 
-            if not script_path.exists():
+            if script_path is None:
                 return None
             
             async with aiofiles.open(script_path, "r", encoding="utf-8") as f:
@@ -140,35 +384,82 @@ class CSVService:
             return script
 
         except Exception as e:
-            log.error(e, f"get_script - file_id: {file_id}")
+            log.exception("get_script failed - file_id: %s - %s", file_id, e)
             raise
 
     async def save_processed_data(self, file_id: str, df: pd.DataFrame) -> None:
         try:
-            processed_path = self.processed_dir / f"{file_id}_processed.csv"
-
-            await asyncio.get_event_loop().run_in_executor(
-                None, lambda: df.to_csv(str(processed_path), index=False, sep=';')
+            processed_path = self._processed_path(file_id)
+            if settings.DTYPE_COMPACTION:
+                # o CSV sai igual; o artefato tipado guarda as colunas já compactadas
+                df = await asyncio.get_event_loop().run_in_executor(None, compact_dataframe, df)
+
+            with stage_timer("processed_write"):
+                await asyncio.get_event_loop().run_in_executor(
+                    None, lambda: df.to_csv(str(processed_path), index=False, sep=';')
+                )
+                set_attributes({"data.rows": len(df), "data.bytes": processed_path.stat().st_size})
+            typed_path = await asyncio.get_event_loop().run_in_executor(
+                None, self._write_typed_artifact, file_id, df
             )
+            await self.storage.publish(self._processed_key(file_id))
+            typed_key = self._processed_key(file_id, "arrow")
+            if typed_path is not None:
+                await self.storage.publish(typed_key)
+            else:
+                await self.storage.delete(typed_key)
+            self._remove_processed_variants(file_id)
 
-            log.info(f"Dados processados salvos: {processed_path}")
+            log.info("Dados processados salvos: %s", processed_path)
 
         except Exception as e:
-            log.error(e, f"save_processed_data - file_id: {file_id}")
+            log.exception("save_processed_data failed - file_id: %s - %s", file_id, e)
             raise
 
-    async def get_processed_data(self, file_id: str) -> ProcessedDataSchema:
-        try:
-            processed_path = self.processed_dir / f"{file_id}_processed.csv"
+    async def append_processed_data(self, file_id: str, df: pd.DataFrame) -> Optional[int]:
+        # acrescenta linhas ao CSV processado e ao artefato tipado sem reescrever as antigas e
+        # devolve o total de linhas; None quando colunas ou tipos não batem e o arquivo
+        # precisa ser reprocessado inteiro
+        processed_path = await self._fetch_processed(file_id)
+        if processed_path is None:
+            raise FileNotFoundError(f"File processed {file_id} was not found")
+
+        loop = asyncio.get_event_loop()
+        header = await loop.run_in_executor(
+            None, lambda: pd.read_csv(str(processed_path), sep=";", nrows=0).columns.tolist()
+        )
+        if [str(column) for column in df.columns] != header:
+            return None
+
+        # as linhas novas assumem os tipos do arquivo já processado (ex.: 40 -> 40.0 numa
+        # coluna float), senão o CSV sai diferente de um /execute sobre o arquivo inteiro
+        table = await loop.run_in_executor(None, self._conform_to_typed_artifact, file_id, df)
+        if table is None:
+            return None
+        df = table.to_pandas()
+
+        with stage_timer("processed_write"):
+            await loop.run_in_executor(
+                None, lambda: df.to_csv(str(processed_path), mode="a", header=False, index=False, sep=";")
+            )
+            set_attributes({"data.rows": len(df), "data.bytes": processed_path.stat().st_size})
+        total_rows = await loop.run_in_executor(None, self._append_typed_artifact, file_id, table)
 
-            if not processed_path.exists():
-                raise FileNotFoundError(f"File processed {file_id} was not found")
+        await self.storage.publish(self._processed_key(file_id))
+        await self.storage.publish(self._processed_key(file_id, "arrow"))
+        self._remove_processed_variants(file_id)
+
+        log.info("%d processed rows appended: %s", len(df), processed_path)
+        return total_rows
 
+    async def get_processed_data(self, file_id: str) -> ProcessedDataSchema:
+        try:
+            await self._fetch_processed(file_id)
             df = await asyncio.get_event_loop().run_in_executor(
-                None, lambda: pd.read_csv(str(processed_path), sep=';')
+                None, self._read_processed, file_id
             )
 
-            data = df.fillna("").to_dict("records")
+            data = fill_missing(df).to_dict("records")
 
             return ProcessedDataSchema(
                 columns=df.columns.tolist(),
@@ -177,41 +468,328 @@ class CSVService:
             )
 
         except Exception as e:
-            log.error(e, f"get_processed_data - file_id: {file_id}")
+            log.exception("get_processed_data failed - file_id: %s - %s", file_id, e)
             raise
 
-    async def get_original_dataframe(self, file_id: str) -> pd.DataFrame:
+    def _processed_path(self, file_id: str, format: ProcessedFormat = "csv") -> Path:
+        return self.storage.path(self._processed_key(file_id, format))
+
+    def _processed_variants(self, file_id: str) -> list[Path]:
+        artifacts = {self._processed_path(file_id), self._processed_path(file_id, "arrow")}
+        return [
+            path
+            for path in self.processed_dir.glob(f"{file_id}_processed.*")
+            if path not in artifacts
+        ]
+
+    def _remove_processed_variants(self, file_id: str) -> None:
+        for variant_path in self._processed_variants(file_id):
+            variant_path.unlink(missing_ok=True)
+
+    def _to_arrow_table(self, df: pd.DataFrame) -> "pa.Table":
+        try:
+            return pa.Table.from_pandas(df, preserve_index=False)
+        except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+            # colunas object com tipos misturados viram texto, preservando os nulos
+            df = df.copy()
+            for col in df.columns[df.dtypes == object]:
+                df[col] = df[col].where(df[col].isna(), df[col].astype(str))
+            return pa.Table.from_pandas(df, preserve_index=False)
+
+    @timed_stage("typed_artifact_write")
+    def _write_typed_artifact(self, file_id: str, df: pd.DataFrame) -> Optional[Path]:
+        if pa is None:
+            return None
+
+        typed_path = self._processed_path(file_id, "arrow")
+        try:
+            table = self._to_arrow_table(df)
+        except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError) as e:
+            log.warning("Typed artifact skipped for %s: %s", file_id, e)
+            typed_path.unlink(missing_ok=True)
+            return None
+
+        tmp_path = typed_path.with_name(f"{typed_path.name}.{uuid.uuid4().hex}.tmp")
+        try:
+            with pa_ipc.new_file(str(tmp_path), table.schema) as writer:
+                writer.write_table(table, max_chunksize=settings.RESULT_STREAM_CHUNK_ROWS)
+            os.replace(tmp_path, typed_path)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+        return typed_path
+
+    def _conform_to_typed_artifact(self, file_id: str, df: pd.DataFrame) -> Optional["pa.Table"]:
+        # o schema do artefato tipado é o tipo de cada coluna no arquivo processado; sem ele
+        # (pyarrow ausente ou artefato descartado) não há como garantir a mesma saída
+        typed_path = self._processed_path(file_id, "arrow")
+        if pa is None or not typed_path.exists():
+            return None
+        try:
+            with pa.memory_map(str(typed_path)) as source:
+                schema = pa_ipc.open_file(source).schema
+            # cast seguro: 1.5 numa coluna int64 ou texto numa coluna numérica falham
+            return self._to_arrow_table(df).cast(schema)
+        except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError, ValueError) as e:
+            log.info("Appended rows of %s do not fit the processed dtypes: %s", file_id, e)
+            return None
+
+    @timed_stage("typed_artifact_write")
+    def _append_typed_artifact(self, file_id: str, table: "pa.Table") -> int:
+        # os lotes antigos são copiados do mmap como estão; as linhas novas já vêm no schema
+        typed_path = self._processed_path(file_id, "arrow")
+        tmp_path = typed_path.with_name(f"{typed_path.name}.{uuid.uuid4().hex}.tmp")
+        try:
+            with pa.memory_map(str(typed_path)) as source:
+                reader = pa_ipc.open_file(source)
+                total_rows = table.num_rows
+                with pa_ipc.new_file(str(tmp_path), reader.schema) as writer:
+                    for i in range(reader.num_record_batches):
+                        batch = reader.get_batch(i)
+                        writer.write_batch(batch)
+                        total_rows += batch.num_rows
+                    writer.write_table(table, max_chunksize=settings.RESULT_STREAM_CHUNK_ROWS)
+            os.replace(tmp_path, typed_path)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+        return total_rows
+
+    def _typed_artifact(self, file_id: str) -> Optional[Path]:
+        if pa is None:
+            return None
+
+        typed_path = self._processed_path(file_id, "arrow")
+        if not typed_path.exists():
+            # arquivos processados antes do artefato tipado: gera a partir do CSV
+            processed_path = self._processed_path(file_id)
+            if not processed_path.exists():
+                return None
+            self._write_typed_artifact(
+                file_id, read_csv(str(processed_path), PROCESSED_DIALECT)
+            )
+        return typed_path if typed_path.exists() else None
+
+    def _materialize(self, file_id: str, format: ProcessedFormat, target: Path) -> None:
+        typed_path = self._typed_artifact(file_id)
+        if typed_path is None:
+            raise FileNotFoundError(f"File processed {file_id} was not found")
+
+        tmp_path = target.with_name(f"{target.name}.{uuid.uuid4().hex}.tmp")
         try:
-            file_path = self.upload_dir / f"{file_id}.csv"
+            with pa.memory_map(str(typed_path)) as source:
+                table = pa_ipc.open_file(source).read_all()
+                if format == "parquet":
+                    pq.write_table(table, str(tmp_path))
+                elif format == "jsonl":
+                    with open(tmp_path, "wb") as f:
+                        for batch in table.to_batches():
+                            f.write(
+                                batch.to_pandas().to_json(
+                                    orient="records", lines=True, date_format="iso"
+                                ).encode("utf-8")
+                            )
+                elif format == "xlsx":
+                    with open(tmp_path, "wb") as f:
+                        table.to_pandas().to_excel(f, index=False, engine="openpyxl")
+                else:
+                    raise ValueError(f"Unsupported format: {format}")
+            shutil.copystat(typed_path, tmp_path)
+            os.replace(tmp_path, target)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+
+    async def _cached_variant(self, source: Path, target: Path, build) -> Path:
+        lock = self._variant_locks.setdefault(target, asyncio.Lock())
+        async with lock:
+            # a variante herda o mtime da origem, então qualquer diferença indica que está obsoleta
+            source_mtime = source.stat().st_mtime_ns
+            fresh = target.exists() and target.stat().st_mtime_ns == source_mtime
+            record_cache("processed_variant", fresh)
+            if not fresh:
+                await asyncio.get_event_loop().run_in_executor(None, build)
+                log.info("Processed variant created: %s", target)
+        return target
+
+    def format_available(self, format: ProcessedFormat) -> bool:
+        if format == "csv":
+            return True
+        if format == "xlsx":
+            return pa is not None and XLSX_AVAILABLE
+        return pa is not None
+
+    async def get_processed_file(
+        self, file_id: str, format: ProcessedFormat = "csv"
+    ) -> Path:
+        try:
+            processed_path = await self._fetch_processed(file_id)
+            if processed_path is None:
+                raise FileNotFoundError(f"File processed {file_id} was not found")
 
-            if not file_path.exists():
-                raise FileNotFoundError(f"File {file_id} not found")
+            target = self._processed_path(file_id, format)
+            if format == "csv":
+                return target
 
-            df = await asyncio.get_event_loop().run_in_executor(
-                None, pd.read_csv, str(file_path)
+            if not self.format_available(format):
+                raise RuntimeError(f"Format {format} is not available on this server")
+
+            typed_path = await asyncio.get_event_loop().run_in_executor(
+                None, self._typed_artifact, file_id
+            )
+            if typed_path is None:
+                raise FileNotFoundError(f"File processed {file_id} was not found")
+            if format in ("arrow", "feather"):
+                return typed_path
+
+            return await self._cached_variant(
+                typed_path, target, lambda: self._materialize(file_id, format, target)
+            )
+
+        except Exception as e:
+            log.exception("get_processed_file failed - file_id: %s - %s", file_id, e)
+            raise
+
+    async def get_compressed_processed_file(
+        self, file_id: str, encoding: str, format: ProcessedFormat = "csv"
+    ) -> Path:
+        try:
+            source = await self.get_processed_file(file_id, format)
+            target = source.with_name(source.name + ENCODING_SUFFIXES[encoding])
+
+            return await self._cached_variant(
+                source, target, lambda: compress_file(source, target, encoding)
+            )
+
+        except Exception as e:
+            log.exception("get_compressed_processed_file failed - file_id: %s - %s", file_id, e)
+            raise
+
+    def _read_processed(self, file_id: str) -> pd.DataFrame:
+        processed_path = self._processed_path(file_id)
+
+        if not processed_path.exists():
+            raise FileNotFoundError(f"File processed {file_id} was not found")
+
+        typed_path = self._typed_artifact(file_id)
+        if typed_path is not None:
+            with pa.memory_map(str(typed_path)) as source:
+                return pa_ipc.open_file(source).read_pandas()
+
+        return read_csv(str(processed_path), PROCESSED_DIALECT)
+
+    async def get_processed_payload(
+        self, file_id: str, orient: ResultOrient = "records"
+    ) -> bytes:
+        try:
+            await self._fetch_processed(file_id)
+            return await asyncio.get_event_loop().run_in_executor(
+                None, lambda: encode_result(file_id, self._read_processed(file_id), orient)
             )
 
+        except Exception as e:
+            log.exception("get_processed_payload failed - file_id: %s - %s", file_id, e)
+            raise
+
+    def _iter_typed_batches(self, typed_path: Path) -> Iterator["pa.RecordBatch"]:
+        with pa.memory_map(str(typed_path)) as source:
+            reader = pa_ipc.open_file(source)
+            for i in range(reader.num_record_batches):
+                yield reader.get_batch(i)
+
+    def iter_processed_ndjson(
+        self, file_id: str, chunk_rows: int = settings.RESULT_STREAM_CHUNK_ROWS
+    ) -> Iterator[bytes]:
+        processed_path = self._processed_path(file_id)
+
+        if not processed_path.exists():
+            raise FileNotFoundError(f"File processed {file_id} was not found")
+
+        typed_path = self._typed_artifact(file_id)
+        if typed_path is not None:
+            chunks = (batch.to_pandas() for batch in self._iter_typed_batches(typed_path))
+        else:
+            chunks = read_csv(str(processed_path), PROCESSED_DIALECT, chunksize=chunk_rows)
+
+        for chunk in chunks:
+            yield chunk.to_json(
+                orient="records", lines=True, date_format="iso"
+            ).encode("utf-8")
+
+    def arrow_available(self) -> bool:
+        return pa is not None
+
+    def iter_processed_arrow(self, file_id: str) -> Iterator[bytes]:
+        if pa is None:
+            raise RuntimeError("pyarrow is required to stream Arrow IPC results")
+
+        processed_path = self._processed_path(file_id)
+
+        if not processed_path.exists():
+            raise FileNotFoundError(f"File processed {file_id} was not found")
+
+        typed_path = self._typed_artifact(file_id)
+        if typed_path is not None:
+            with pa.memory_map(str(typed_path)) as source:
+                schema = pa_ipc.open_file(source).schema
+            batches = self._iter_typed_batches(typed_path)
+        else:
+            reader = pa_csv.open_csv(
+                str(processed_path),
+                parse_options=pa_csv.ParseOptions(delimiter=';'),
+            )
+            schema, batches = reader.schema, reader
+
+        sink = _ChunkSink()
+        with pa_ipc.new_stream(pa.PythonFile(sink, mode="w"), schema) as writer:
+            yield sink.drain()
+            for batch in batches:
+                writer.write_batch(batch)
+                yield sink.drain()
+        yield sink.drain()
+
+    async def get_original_dataframe(
+        self,
+        file_id: str,
+        columns: Optional[list[str]] = None,
+        compact: bool = False,
+    ) -> pd.DataFrame:
+        try:
+            # columns: só as colunas pedidas são convertidas
+            df = await self._read_upload(file_id, columns)
+            if compact:
+                df = await asyncio.get_event_loop().run_in_executor(None, compact_dataframe, df)
             return df
 
         except Exception as e:
-            log.error(e, f"get_original_dataframe - file_id: {file_id}")
+            log.exception("get_original_dataframe failed - file_id: %s - %s", file_id, e)
             raise
 
+    def artifact_files(self, file_id: str) -> list[Path]:
+        return [
+            path
+            for directory in (self.upload_dir, self.processed_dir)
+            for pattern in (f"{file_id}.*", f"{file_id}_*")
+            for path in directory.glob(pattern)
+        ]
+
     async def cleanup_files(self, file_id: str) -> None:
         try:
-            files_to_remove = [
-                self.upload_dir / f"{file_id}.csv",
-                self.upload_dir / f"{file_id}_script.py",
-                self.processed_dir / f"{file_id}_processed.csv",
-            ]
+            for prefix in (f"upload/{file_id}", f"processed/{file_id}"):
+                for stored in await self.storage.list_objects(prefix):
+                    await self.storage.delete(stored.key)
+                    log.info("Stored object removed: %s", stored.key)
+
+            # variantes derivadas só existem no disco local
+            files_to_remove = self.artifact_files(file_id)
+
+            for variant_path in files_to_remove:
+                self._variant_locks.pop(variant_path, None)
 
             for file_path in files_to_remove:
                 if file_path.exists():
                     file_path.unlink()
-                    log.info(f"File removed: {file_path}")
+                    log.info("File removed: %s", file_path)
 
         except Exception as e:
-            log.error(e, f"cleanup_files - file_id: {file_id}")
+            log.exception("cleanup_files failed - file_id: %s - %s", file_id, e)
 
     def format_script(self, script: str):
         if script.startswith("```python"):
@@ -222,4 +800,4 @@ class CSVService:
         return script
 
 
-csv_service = CSVService()
+csv_service = CSVService(storage)
@@ -0,0 +1,457 @@
+import ast
+import asyncio
+import hashlib
+import json
+import os
+import shutil
+import uuid
+from pathlib import Path
+from typing import Literal, Optional
+
+import numpy as np
+import pandas as pd
+
+from backend.core.cache_db import CacheDB, cache_db
+from backend.core.csv_reader import CSVDialect, read_csv, sniff_dialect
+from backend.core.logging import setup_logging
+from backend.core.metrics import stage_timer
+from backend.core.tracing import file_trace, set_attributes
+from backend.models.schemas import DiffRecordSchema, DiffResponseSchema
+from backend.services.append_service import _keyword, key_hashes
+from backend.services.csv_service import CSVService, csv_service
+from backend.services.execution_service import ExecutionService, execution_service, script_digest
+
+try:
+    import pyarrow as pa
+    from pyarrow import ipc as pa_ipc
+except ImportError:  # sem pyarrow não há onde guardar o diff; a rota responde 406
+    pa = None
+
+log = setup_logging("backend.diff_service")
+
+DiffStatus = Literal["all", "changed", "added", "dropped"]
+# key: colunas escolhidas pelo usuário; lineage: índice de origem rastreado numa reexecução
+# do script; position: linha i com linha i; content: linhas com os mesmos valores
+DiffAlignment = Literal["key", "lineage", "position", "content"]
+
+RECORD_STATUSES = ("changed", "added", "dropped")
+SUMMARY_METADATA = b"summary"
+
+LINEAGE_HOOK = "__diff_reset_index__"
+# a reexecução recebe o índice deslocado: rótulos abaixo disso nasceram no script
+LINEAGE_OFFSET = 1 << 40
+
+
+def _keep_index(frame, *args, **kwargs):
+    # reset_index de verdade, mas devolvendo o índice de origem; o CSV sai sem índice
+    index = frame.index
+    result = frame.reset_index(*args, **kwargs)
+    target = frame if result is None else result
+    if len(target) == len(index):
+        target.index = index
+    return result
+
+
+class _LineageRewriter(ast.NodeTransformer):
+    def visit_Call(self, node: ast.Call):
+        self.generic_visit(node)
+        for keyword in node.keywords:
+            if keyword.arg == "ignore_index":
+                keyword.value = ast.Constant(False)
+        if isinstance(node.func, ast.Attribute) and node.func.attr == "reset_index":
+            call = ast.Call(
+                func=ast.Name(id=LINEAGE_HOOK, ctx=ast.Load()),
+                args=[node.func.value, *node.args],
+                keywords=node.keywords,
+            )
+            return ast.copy_location(call, node)
+        return node
+
+
+def instrument_lineage(script: str) -> str:
+    # reset_index e ignore_index=True deixam de renumerar as linhas
+    tree = _LineageRewriter().visit(ast.parse(script))
+    return ast.unparse(ast.fix_missing_locations(tree))
+
+
+def column_renames(script: str, columns: list[str]) -> dict[str, str]:
+    # rename(columns={...}) com literais, na ordem do script; o resto é casado pelo nome
+    try:
+        tree = ast.parse(script)
+    except SyntaxError:
+        return {}
+    calls = sorted(
+        (
+            node for node in ast.walk(tree)
+            if isinstance(node, ast.Call)
+            and isinstance(node.func, ast.Attribute)
+            and node.func.attr == "rename"
+        ),
+        key=lambda node: (node.lineno, node.col_offset),
+    )
+
+    current = {column: column for column in columns}
+    for call in calls:
+        mapping = _keyword(call, "columns")
+        if not isinstance(mapping, ast.Dict):
+            continue
+        pairs = {
+            key.value: value.value
+            for key, value in zip(mapping.keys, mapping.values)
+            if isinstance(key, ast.Constant) and isinstance(value, ast.Constant)
+            and isinstance(key.value, str) and isinstance(value.value, str)
+        }
+        current = {column: pairs.get(name, name) for column, name in current.items()}
+    return {column: name for column, name in current.items() if column != name}
+
+
+def _plain(frame: pd.DataFrame) -> pd.DataFrame:
+    # category e string[pyarrow] (compactação, artefato tipado) comparam como object
+    frame = frame.loc[:, ~frame.columns.duplicated()]
+    converted = {
+        column: frame[column].astype(object).where(frame[column].notna(), None)
+        for column in frame.columns
+        if isinstance(frame[column].dtype, pd.CategoricalDtype) or frame[column].dtype == "string"
+    }
+    return frame.assign(**converted) if converted else frame
+
+
+def _numeric(series: pd.Series) -> bool:
+    return series.dtype.kind in "iuf"
+
+
+def _as_float(series: pd.Series) -> np.ndarray:
+    if _numeric(series):
+        return series.to_numpy(dtype=np.float64, na_value=np.nan)
+    try:
+        return pd.to_numeric(series, errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+    except (TypeError, ValueError):
+        return np.full(len(series), np.nan)
+
+
+def _text(series: pd.Series) -> np.ndarray:
+    values = series.astype(str).to_numpy(dtype=object)
+    values[series.isna().to_numpy()] = None
+    return values
+
+
+def _equal(before: pd.Series, after: pd.Series) -> np.ndarray:
+    same = before.isna().to_numpy() & after.isna().to_numpy()
+    if _numeric(before) or _numeric(after):
+        # "3500.50" x 3500.5: texto que é número compara pelo valor
+        same |= _as_float(before) == _as_float(after)
+        if _numeric(before) and _numeric(after):
+            return same
+    return same | (_text(before) == _text(after))
+
+
+def _first_match(source: np.ndarray) -> np.ndarray:
+    # uma linha original só se alinha com a primeira processada que aponta para ela
+    repeated = pd.Series(source).duplicated().to_numpy() & (source >= 0)
+    return np.where(repeated, -1, source)
+
+
+def _key_alignment(original: pd.DataFrame, processed: pd.DataFrame, key: list[tuple[str, str]]) -> np.ndarray:
+    original_keys = pd.Index(key_hashes(original[[column for column, _ in key]]))
+    if not original_keys.is_unique:
+        raise ValueError(f"Key {[name for _, name in key]} is not unique in the original file")
+    processed_keys = key_hashes(processed[[name for _, name in key]])
+    return _first_match(original_keys.get_indexer(processed_keys))
+
+
+def _content_alignment(original: pd.DataFrame, processed: pd.DataFrame, pairs: list[tuple[str, str]]) -> np.ndarray:
+    if not pairs:
+        return np.full(len(processed), -1, dtype=np.int64)
+    # linhas repetidas casam pela ordem de ocorrência
+    original_hashes = key_hashes(original[[column for column, _ in pairs]])
+    processed_hashes = key_hashes(processed[[name for _, name in pairs]])
+    original_keys = pd.MultiIndex.from_arrays(
+        [original_hashes, pd.Series(original_hashes).groupby(original_hashes).cumcount().to_numpy()]
+    )
+    processed_keys = pd.MultiIndex.from_arrays(
+        [processed_hashes, pd.Series(processed_hashes).groupby(processed_hashes).cumcount().to_numpy()]
+    )
+    return original_keys.get_indexer(processed_keys)
+
+
+def _file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(1024 * 1024):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class _HashSink:
+    # recebe o to_csv em pedaços, sem montar o CSV inteiro na memória
+    def __init__(self) -> None:
+        self.digest = hashlib.sha256()
+
+    def write(self, text: str) -> int:
+        self.digest.update(text.encode("utf-8"))
+        return len(text)
+
+
+def _values_list(rows: np.ndarray, frame: pd.DataFrame, columns: list[str]) -> "pa.ListArray":
+    # linhas inteiras (adicionadas ou removidas) como listas de texto, na ordem das colunas
+    values = np.empty((len(rows), len(columns)), dtype=object)
+    for position, column in enumerate(columns):
+        values[:, position] = _text(frame[column].iloc[rows])
+    offsets = np.arange(len(rows) + 1, dtype=np.int32) * len(columns)
+    return pa.ListArray.from_arrays(pa.array(offsets), pa.array(values.ravel(), type=pa.string()))
+
+
+class DiffService:
+    def __init__(
+        self, csv_service: CSVService, execution_service: ExecutionService, cache_db: CacheDB
+    ) -> None:
+        self.csv_service = csv_service
+        self.execution_service = execution_service
+        self.cache_db = cache_db
+
+    def available(self) -> bool:
+        return pa is not None
+
+    def _diff_path(self, file_id: str, key: Optional[list[str]]) -> Path:
+        # variante do CSV processado: some junto com as outras quando ele é regravado
+        suffix = f"-{hashlib.sha256(json.dumps(key).encode('utf-8')).hexdigest()[:12]}" if key else ""
+        return self.csv_service._processed_path(file_id).with_name(f"{file_id}_processed.diff{suffix}.arrow")
+
+    def _lineage(self, script: str, original: pd.DataFrame, processed_path: Path) -> Optional[np.ndarray]:
+        frame = original.set_axis(pd.RangeIndex(LINEAGE_OFFSET, LINEAGE_OFFSET + len(original)))
+        result = self.execution_service.run_script(
+            instrument_lineage(script), frame, {LINEAGE_HOOK: _keep_index}
+        )
+        df = result.processed_dataframe
+        if result.error_message or not isinstance(df, pd.DataFrame) or df.index.dtype.kind not in "iu":
+            return None
+
+        # o índice só vale se a reexecução gerou exatamente o CSV persistido
+        sink = _HashSink()
+        df.to_csv(sink, index=False, sep=";")
+        if sink.digest.hexdigest() != _file_sha256(processed_path):
+            log.info("Lineage run output differs from the processed file; falling back")
+            return None
+
+        labels = df.index.to_numpy(dtype=np.int64) - LINEAGE_OFFSET
+        source = np.where((labels >= 0) & (labels < len(original)), labels, -1)
+        if len(source) and not (source >= 0).any():
+            return None
+        return _first_match(source)
+
+    def _write_diff(
+        self,
+        file_id: str,
+        key: Optional[list[str]],
+        script: Optional[str],
+        upload_path: Path,
+        metadata: Optional[dict],
+        processed_path: Path,
+        target: Path,
+    ) -> None:
+        with stage_timer("diff_build"):
+            if metadata is not None:
+                original = read_csv(
+                    str(upload_path), CSVDialect.from_dict(metadata["dialect"]), metadata["dtypes"]
+                )
+            else:
+                original = read_csv(str(upload_path), sniff_dialect(str(upload_path)))
+            processed = _plain(self.csv_service._read_processed(file_id))
+            original = _plain(original)
+
+            renames = column_renames(script, original.columns.tolist()) if script else {}
+            pairs, claimed = [], set()
+            # nomes iguais primeiro; renomeadas só ficam com o que sobrar
+            for column in sorted(original.columns, key=lambda column: column in renames):
+                name = renames.get(column, column)
+                if name in processed.columns and name not in claimed:
+                    pairs.append((column, name))
+                    claimed.add(name)
+            pairs.sort(key=lambda pair: processed.columns.get_loc(pair[1]))
+
+            alignment: DiffAlignment
+            source = None
+            if key:
+                by_name = {name: column for column, name in pairs}
+                missing = [name for name in key if name not in by_name]
+                if missing:
+                    raise ValueError(f"Key columns not found in both files: {missing}")
+                alignment = "key"
+                source = _key_alignment(original, processed, [(by_name[name], name) for name in key])
+            elif script:
+                source = self._lineage(script, original, processed_path)
+                alignment = "lineage"
+            if source is None:
+                if len(original) == len(processed):
+                    alignment = "position"
+                    source = np.arange(len(processed))
+                else:
+                    alignment = "content"
+                    source = _content_alignment(original, processed, pairs)
+
+            aligned = source >= 0
+            rows = np.flatnonzero(aligned)
+            origin = source[aligned]
+            masks = np.zeros((len(rows), len(pairs)), dtype=bool)
+            for position, (column, name) in enumerate(pairs):
+                masks[:, position] = ~_equal(original[column].iloc[origin], processed[name].iloc[rows])
+
+            # células alteradas em formato longo, linha a linha e na ordem das colunas
+            changed = np.flatnonzero(masks.any(axis=1))
+            cell_rows, cell_columns = np.nonzero(masks[changed])
+            offsets = np.concatenate([[0], np.cumsum(masks[changed].sum(axis=1))]).astype(np.int32)
+            before = np.empty(len(cell_rows), dtype=object)
+            after = np.empty(len(cell_rows), dtype=object)
+            for position, (column, name) in enumerate(pairs):
+                cells = np.flatnonzero(cell_columns == position)
+                if len(cells):
+                    picked = changed[cell_rows[cells]]
+                    before[cells] = _text(original[column].iloc[origin[picked]])
+                    after[cells] = _text(processed[name].iloc[rows[picked]])
+            names = np.array([name for _, name in pairs], dtype=object)
+
+            added = np.flatnonzero(~aligned)
+            kept = np.zeros(len(original), dtype=bool)
+            kept[origin] = True
+            dropped = np.flatnonzero(~kept)
+
+            original_columns = original.columns.tolist()
+            processed_columns = processed.columns.tolist()
+            strings = pa.list_(pa.string())
+            table = pa.concat_tables([
+                pa.table({
+                    "status": pa.array(["changed"] * len(changed), pa.string()),
+                    "row": pa.array(rows[changed], pa.int64()),
+                    "original_row": pa.array(origin[changed], pa.int64()),
+                    "columns": pa.ListArray.from_arrays(pa.array(offsets), pa.array(names[cell_columns], pa.string())),
+                    "before": pa.ListArray.from_arrays(pa.array(offsets), pa.array(before, pa.string())),
+                    "after": pa.ListArray.from_arrays(pa.array(offsets), pa.array(after, pa.string())),
+                }),
+                pa.table({
+                    "status": pa.array(["added"] * len(added), pa.string()),
+                    "row": pa.array(added, pa.int64()),
+                    "original_row": pa.nulls(len(added), pa.int64()),
+                    "columns": pa.nulls(len(added), strings),
+                    "before": pa.nulls(len(added), strings),
+                    "after": _values_list(added, processed, processed_columns),
+                }),
+                pa.table({
+                    "status": pa.array(["dropped"] * len(dropped), pa.string()),
+                    "row": pa.nulls(len(dropped), pa.int64()),
+                    "original_row": pa.array(dropped, pa.int64()),
+                    "columns": pa.nulls(len(dropped), strings),
+                    "before": _values_list(dropped, original, original_columns),
+                    "after": pa.nulls(len(dropped), strings),
+                }),
+            ])
+
+            column_changes = masks.sum(axis=0)
+            paired = dict(pairs)
+            summary = {
+                "alignment": alignment,
+                "key": key,
+                "original_rows": len(original),
+                "processed_rows": len(processed),
+                "changed_rows": len(changed),
+                "added_rows": len(added),
+                "dropped_rows": len(dropped),
+                "changed_cells": int(column_changes.sum()),
+                "column_changes": {name: int(count) for (_, name), count in zip(pairs, column_changes)},
+                "added_columns": [name for name in processed_columns if name not in claimed],
+                "dropped_columns": [column for column in original_columns if column not in paired],
+                "renamed_columns": {column: name for column, name in pairs if column != name},
+                "original_columns": original_columns,
+                "processed_columns": processed_columns,
+            }
+            table = table.replace_schema_metadata({SUMMARY_METADATA: json.dumps(summary).encode("utf-8")})
+            set_attributes({"diff.alignment": alignment, "diff.records": table.num_rows})
+
+            tmp_path = target.with_name(f"{target.name}.{uuid.uuid4().hex}.tmp")
+            try:
+                with pa_ipc.new_file(str(tmp_path), table.schema) as writer:
+                    writer.write_table(table, max_chunksize=65536)
+                # mesmo mtime do CSV processado: é o que o _cached_variant confere
+                shutil.copystat(processed_path, tmp_path)
+                os.replace(tmp_path, target)
+            finally:
+                tmp_path.unlink(missing_ok=True)
+            log.info("Diff for %s built (%s): %d records", file_id, alignment, table.num_rows)
+
+    def _read_page(
+        self, diff_path: Path, status: DiffStatus, page: int, page_size: int
+    ) -> tuple[dict, int, list[dict]]:
+        # o artefato é mapeado em memória; só as linhas da página são convertidas
+        with pa.memory_map(str(diff_path)) as source:
+            table = pa_ipc.open_file(source).read_all()
+            summary = json.loads(table.schema.metadata[SUMMARY_METADATA])
+
+            counts = [summary[f"{name}_rows"] for name in RECORD_STATUSES]
+            if status == "all":
+                start, total = 0, table.num_rows
+            else:
+                index = RECORD_STATUSES.index(status)
+                start, total = sum(counts[:index]), counts[index]
+            offset = min((page - 1) * page_size, total)
+            records = table.slice(start + offset, min(page_size, total - offset)).to_pylist()
+        return summary, total, records
+
+    async def _diff_file(self, file_id: str, key: Optional[list[str]]) -> Path:
+        processed_path = await self.csv_service._fetch_processed(file_id)
+        if processed_path is None:
+            raise FileNotFoundError("Arquivo processado não encontrado. Execute /execute primeiro.")
+        upload_path = await self.csv_service.storage.fetch(self.csv_service._upload_key(file_id))
+        if upload_path is None:
+            raise FileNotFoundError("File not found")
+
+        metadata = await self.csv_service._load_metadata(file_id)
+        script = await self.csv_service.get_script(file_id)
+        status_info = await self.cache_db.get_status(file_id)
+        # a reexecução só explica o arquivo processado se ele veio deste mesmo script
+        if not script or status_info.get("executed_script") != script_digest(script):
+            script = None
+
+        target = self._diff_path(file_id, key)
+        return await self.csv_service._cached_variant(
+            processed_path,
+            target,
+            lambda: self._write_diff(file_id, key, script, upload_path, metadata, processed_path, target),
+        )
+
+    async def diff(
+        self,
+        file_id: str,
+        key: Optional[list[str]] = None,
+        status: DiffStatus = "all",
+        page: int = 1,
+        page_size: int = 100,
+    ) -> DiffResponseSchema:
+        with file_trace(file_id, "diff"):
+            diff_path = await self._diff_file(file_id, key or None)
+            summary, total, records = await asyncio.get_event_loop().run_in_executor(
+                None, self._read_page, diff_path, status, page, page_size
+            )
+
+        for record in records:
+            # linhas inteiras: as colunas são as do respectivo arquivo
+            if record["status"] == "added":
+                record["columns"] = summary["processed_columns"]
+            elif record["status"] == "dropped":
+                record["columns"] = summary["original_columns"]
+
+        return DiffResponseSchema(
+            message="Diff between the original and the processed file",
+            file_id=file_id,
+            **{
+                name: value
+                for name, value in summary.items()
+                if name not in ("original_columns", "processed_columns")
+            },
+            status=status,
+            page=page,
+            page_size=page_size,
+            total=total,
+            records=[DiffRecordSchema(**record) for record in records],
+        )
+
+
+diff_service = DiffService(csv_service, execution_service, cache_db)
@@ -1,14 +1,28 @@
 import ast
-import sys
+import asyncio
+import functools
+import hashlib
 from io import StringIO
-from typing import Any, Dict
+from typing import Any, Dict, Optional
 import pandas as pd
 import numpy as np
 import re
 import datetime
 
+from backend.core.compaction import is_compacted, restore_dtypes
+from backend.core.logging import setup_logging
+from backend.core.metrics import stage_timer
+from backend.core.settings import settings
+from backend.core.tracing import set_attributes
 from backend.models.schemas import ExecutionResultSchema
 
+log = setup_logging("backend.execution_service")
+
+
+def script_digest(script: str) -> str:
+    # identifica o script com que o arquivo processado foi gerado
+    return hashlib.sha256(script.encode("utf-8")).hexdigest()[:16]
+
 
 class ExecutionService:
     DANGEROUS_MODULES = {"os", "sys", "subprocess", "socket", "urllib", "requests"}
@@ -54,13 +68,18 @@ class ExecutionService:
 
         return True
 
-    def create_safe_environment(self, df: pd.DataFrame) -> Dict[str, Any]:
+    def create_safe_environment(
+        self, df: pd.DataFrame, output: Optional[StringIO] = None
+    ) -> Dict[str, Any]:
         import builtins
         safe_builtins = {
             name: getattr(builtins, name) 
             for name in self.SAFE_BUILTINS 
             if hasattr(builtins, name)
         }
+        if output is not None:
+            # print próprio por execução: captura a saída sem trocar o sys.stdout global
+            safe_builtins["print"] = functools.partial(builtins.print, file=output)
 
         return {
             "__builtins__": safe_builtins,
@@ -71,23 +90,39 @@ class ExecutionService:
             "df": df.copy() 
         }
 
-    async def execute_script(self, script: str, original_df: pd.DataFrame) -> ExecutionResultSchema:
+    async def execute_script(
+        self, script: str, original_df: pd.DataFrame, script_globals: Optional[Dict[str, Any]] = None
+    ) -> ExecutionResultSchema:
+        # exec é CPU-bound e síncrono; roda fora do event loop
+        return await asyncio.get_event_loop().run_in_executor(
+            None, self.run_script, script, original_df, script_globals
+        )
+
+    def run_script(
+        self, script: str, original_df: pd.DataFrame, script_globals: Optional[Dict[str, Any]] = None
+    ) -> ExecutionResultSchema:
         try:
-            if not self.validate_script(script):
+            with stage_timer("script_validate"):
+                valid = self.validate_script(script)
+            if not valid:
                 return ExecutionResultSchema(
                     error_message="Script did not pass validation"
                 )
 
-            safe_env = self.create_safe_environment(original_df)
-        
-            old_output = sys.stdout
             captured_output = StringIO()
-            sys.stdout = captured_output
+            safe_env = self.create_safe_environment(original_df, captured_output)
+            # nomes extras vistos pelo script (ex.: o índice de dedup do modo append)
+            safe_env.update(script_globals or {})
 
             try:
-                exec(script, safe_env)
+                with stage_timer("script_exec"):
+                    exec(script, safe_env)
+                    result_df = safe_env.get("df")
+                    set_attributes({
+                        "data.rows_in": len(original_df),
+                        "data.rows_out": len(result_df) if isinstance(result_df, pd.DataFrame) else None,
+                    })
                 
-                sys.stdout = old_output
                 output = captured_output.getvalue()
                 
                 if "df" not in safe_env:
@@ -104,7 +139,6 @@ class ExecutionService:
                 )
                 
             except Exception as e:
-                sys.stdout = old_output
                 return ExecutionResultSchema(
                     error_message=f"Execution error: {str(e)}"
                 )
@@ -114,6 +148,39 @@ class ExecutionService:
                 error_message=f"General error: {str(e)}"
             )
 
+    def _sample_output(self, script: str, df: pd.DataFrame) -> tuple[str, str]:
+        # o que seria persistido (CSV processado) e impresso pelo script
+        captured_output = StringIO()
+        safe_env = self.create_safe_environment(df, captured_output)
+        try:
+            exec(script, safe_env)
+        except Exception as e:
+            return f"{type(e).__name__}: {e}", captured_output.getvalue()
+        result_df = safe_env.get("df")
+        if not isinstance(result_df, pd.DataFrame):
+            return "no dataframe", captured_output.getvalue()
+        return result_df.to_csv(index=False, sep=";"), captured_output.getvalue()
+
+    def check_compaction(
+        self, script: str, df: pd.DataFrame, sample_rows: int = settings.COMPACT_CHECK_ROWS
+    ) -> pd.DataFrame:
+        # roda o script numa amostra com os tipos originais e com os compactados; o arquivo
+        # todo só segue compactado se a saída for idêntica
+        if not is_compacted(df) or not self.validate_script(script):
+            return df
+
+        with stage_timer("compaction_check"):
+            sample = df.sample(n=min(sample_rows, len(df)), random_state=0).sort_index()
+            expected = self._sample_output(script, restore_dtypes(sample))
+            if self._sample_output(script, sample) == expected:
+                return df
+            # string[pyarrow] muda o texto dos nulos (astype(str) dá "<NA>"); tenta sem ela
+            if self._sample_output(script, restore_dtypes(sample, only={"string"})) == expected:
+                log.info("Compaction check: string[pyarrow] columns restored to object")
+                return restore_dtypes(df, only={"string"})
+            log.info("Compaction check: output differs, running with the original dtypes")
+            return restore_dtypes(df)
+
     def clean_script(self, script: str) -> str:
         lines = script.split("\n")
         cleaned_lines = []
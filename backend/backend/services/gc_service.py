@@ -0,0 +1,106 @@
+import asyncio
+import time
+import uuid
+from collections import defaultdict
+from pathlib import PurePosixPath
+from typing import Optional
+
+from backend.core.cache_db import CacheDB, cache_db
+from backend.core.logging import setup_logging
+from backend.core.settings import settings
+from backend.models.schemas import GCReportSchema
+from backend.services.csv_service import CSVService, csv_service
+
+log = setup_logging("backend.gc_service")
+
+FILE_ID_LENGTH = 36
+
+
+class ArtifactGCService:
+    def __init__(self, csv_service: CSVService, cache_db: CacheDB) -> None:
+        self.csv_service = csv_service
+        self.cache_db = cache_db
+        self.last_report: Optional[GCReportSchema] = None
+
+    async def _scan(self) -> dict[str, tuple[int, float]]:
+        # file_id -> (bytes armazenados, mtime mais recente)
+        usage: dict[str, list] = defaultdict(lambda: [0, 0.0])
+        for prefix in ("upload/", "processed/"):
+            for stored in await self.csv_service.storage.list_objects(prefix):
+                file_id = PurePosixPath(stored.key).name[:FILE_ID_LENGTH]
+                try:
+                    uuid.UUID(file_id)
+                except ValueError:
+                    continue
+                usage[file_id][0] += stored.size
+                usage[file_id][1] = max(usage[file_id][1], stored.mtime)
+        return {file_id: (size, mtime) for file_id, (size, mtime) in usage.items()}
+
+    async def _evict(self, file_id: str) -> None:
+        await self.csv_service.cleanup_files(file_id)
+        await self.cache_db.purge(file_id)
+
+    async def run_once(self) -> GCReportSchema:
+        started = time.time()
+        usage = await self._scan()
+        known_access = await self.cache_db.get_last_access()
+
+        # artefatos sem registro de acesso (ex.: anteriores ao GC) usam o mtime
+        last_access = {
+            file_id: known_access.get(file_id, mtime)
+            for file_id, (_, mtime) in usage.items()
+        }
+        disk_usage = sum(size for size, _ in usage.values())
+        report = GCReportSchema()
+
+        candidates = sorted(
+            (
+                file_id
+                for file_id, accessed in last_access.items()
+                if started - accessed >= settings.GC_MIN_IDLE_SECONDS
+            ),
+            key=last_access.__getitem__,
+        )
+        for file_id in candidates:
+            expired = started - last_access[file_id] >= settings.ARTIFACT_TTL_SECONDS
+            if not expired and disk_usage <= settings.DISK_QUOTA_BYTES:
+                # candidatos estão em ordem LRU, os próximos são ainda mais recentes
+                break
+
+            await self._evict(file_id)
+            size = usage[file_id][0]
+            disk_usage -= size
+            report.reclaimed_bytes += size
+            if expired:
+                report.expired += 1
+            else:
+                report.evicted += 1
+
+        # registros de acesso cujos arquivos já não existem
+        for file_id in known_access.keys() - usage.keys():
+            if started - known_access[file_id] >= settings.ARTIFACT_TTL_SECONDS:
+                await self.cache_db.purge(file_id)
+
+        report.disk_usage_bytes = disk_usage
+        report.duration_seconds = round(time.time() - started, 3)
+        self.last_report = report
+        log.info(
+            "GC finished - expired: %s, evicted: %s, reclaimed: %s bytes, usage: %s bytes",
+            report.expired, report.evicted, report.reclaimed_bytes, report.disk_usage_bytes,
+        )
+        return report
+
+    async def run_forever(self) -> None:
+        while True:
+            try:
+                # com vários workers apenas um executa cada ciclo
+                if await self.cache_db.try_lock("artifact_gc", settings.GC_INTERVAL_SECONDS):
+                    await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                log.error("Error running artifact GC: %s", e)
+            await asyncio.sleep(settings.GC_INTERVAL_SECONDS)
+
+
+gc_service = ArtifactGCService(csv_service, cache_db)
@@ -1,27 +1,45 @@
-from dotenv import load_dotenv
+from typing import TYPE_CHECKING, Optional
+
 from fastapi import HTTPException, status
 from backend.core.logging import setup_logging
-from google import genai
-from google.genai import types
-from openai import OpenAI
-import os
 from backend.core.logging import log_request
 from backend.core.settings import settings
+from backend.core.metrics import record_llm_tokens, timed_stage
+from backend.models.schemas import DataSummarySchema
+
+if TYPE_CHECKING:
+    from google import genai
+    from openai import OpenAI
 
 log = setup_logging("backend.llm_service")
 
 
+# os SDKs dos provedores levam ~1s para importar; só entram na primeira chamada
+# (ou no preload em background disparado pelo lifespan)
+def _genai_types():
+    from google.genai import types
+
+    return types
+
+
 class LLMService:
-    client: str
-    openai_client: OpenAI
+    client: Optional["genai.Client"] = None
+    openai_client: Optional["OpenAI"] = None
 
     def __init__(self) -> None:
-        log.info(f"Inicialize Gemini Service")
-        load_dotenv()
-        log.info(f"Gemini Service has been initialized")
+        log.info("Inicialize Gemini Service")
+        log.info("Gemini Service has been initialized")
+
+    def preload(self) -> None:
+        import openai  # noqa: F401
+        from google import genai  # noqa: F401
+
+        log.info("LLM provider SDKs loaded")
 
     def initialize_gemini(self) -> None:
-        genkey = os.getenv("GEMINI_SECRET_KEY")
+        from google import genai
+
+        genkey = settings.GEMINI_SECRET_KEY
 
         if not genkey:
             log.error("The GEMINI_SECRET_KEY was not found on .env")
@@ -31,15 +49,24 @@ class LLMService:
         log.info("LLMService initialized succesfully.")
     
     def initialize_openai(self) -> None:
-        openkey = os.getenv("OPENAI_SECRET_KEY")
+        from openai import OpenAI
+
+        openkey = settings.OPENAI_SECRET_KEY
 
         if not openkey:
             log.error("The OPENAI_SECRET_KEY was not found on .env")
             raise ValueError("OpenAI API KEY not found")
-        self.openai_client = OpenAI(api_key=openkey)
+        self.openai_client = OpenAI(api_key=openkey, base_url=settings.OPENAI_BASE_URL)
         log.info("OpenAI initialized succesfully.")
     
+    def _record_gemini_usage(self, model: str, response) -> None:
+        usage = getattr(response, "usage_metadata", None)
+        if usage is not None:
+            record_llm_tokens(model, usage.prompt_token_count, usage.candidates_token_count)
+
+    @timed_stage("llm_generate")
     def send_gen_request(self, system_instruction: str, content: str):
+        types = _genai_types()
         log_request("Request Gemini API - Generate Content")
         response = self.client.models.generate_content(
             model=settings.GEMINI_BASE_MODEL,
@@ -57,9 +84,12 @@ class LLMService:
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail={"message": "missing data content"},
             )
+        self._record_gemini_usage(settings.GEMINI_BASE_MODEL, response)
         return response.text
     
+    @timed_stage("llm_generate")
     def send_genpro_request(self, system_instruction: str, content: str):
+        types = _genai_types()
         log_request("Request Gemini PRO API - Generate Content")
         response = self.client.models.generate_content(
             model=settings.GEMINI_PRO_MODEL,
@@ -84,10 +114,12 @@ class LLMService:
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail={"message": "missing data content"},
             )
+        self._record_gemini_usage(settings.GEMINI_PRO_MODEL, response)
         return response.text
 
+    @timed_stage("llm_generate")
     def send_openai_request(self, system_instruction: str, content: str): 
-        log_request("Request Gemini API - Generate Content")
+        log_request("Request OpenAI API - Responses")
         response = self.openai_client.responses.create(
             model="gpt-4.1",
             # reasoning={"effort": "minimal"}, # disponível apenas nas series o como gpt-o3.5
@@ -110,12 +142,59 @@ class LLMService:
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail={"message": "missing data content"},
             )
-        print("response text generated by openai:: " + response.output_text)
+        if response.usage is not None:
+            record_llm_tokens(
+                response.model, response.usage.input_tokens, response.usage.output_tokens
+            )
+        log.debug("Response text generated by openai: %s", response.output_text)
         return response.output_text
 
     def streaming_response(self, response: str):
         for chunk in response:
-            print(chunk, end=" ")
+            log.debug("Streaming chunk: %s", chunk)
+
+    @timed_stage("prompt_build")
+    def build_prompt(self, data_summary: DataSummarySchema) -> str:
+        prompt = f"""
+                    Analise os dados CSV abaixo e gere um script Python para limpeza:
+
+                    **Informações do Dataset:**
+                    - Arquivo: {data_summary.filename}
+                    - Linhas: {data_summary.rows_count}
+                    - Colunas: {data_summary.columns_count}
+                    - Colunas: {', '.join(data_summary.columns)}
+
+                    **Tipos de Dados:**
+                    {chr(10).join([f"- {col}: {dtype}" for col, dtype in data_summary.data_types.items()])}
+
+                    **Valores Faltantes:**
+                    {chr(10).join([f"- {col}: {count}" for col, count in data_summary.missing_values.items() if count > 0])}
+
+                    **Linhas Duplicadas:** {data_summary.duplicate_rows}
+
+                    **Amostra dos Dados:**
+                    {chr(10).join([str(row) for row in data_summary.sample_rows[:3]])}
+
+                    Gere um script Python que:
+                    1. Trate valores nulos de forma inteligente
+                    2. Remova duplicatas se necessário
+                    3. Corrija tipos de dados
+                    4. Padronize formatação (datas, emails, nomes, etc.)
+                    5. Remova linhas/colunas inválidas se necessário
+                    6. caso existe colunas com sequências numéricas, verifique se existem gaps e tente preenchê-los
+                    7. se uma sequencia de datas estiver incompleta, tente preenchê-la
+                    
+
+                    O script deve modificar o DataFrame 'df' in-place ou reatribuí-lo.
+                    """
+        return prompt
+
+    def generate_script(self, prompt: str) -> str:
+        # o cliente mantém um pool http próprio; é criado uma vez e reaproveitado
+        if getattr(self, "openai_client", None) is None:
+            self.initialize_openai()
+        system = self.get_system_prompt()
+        return self.send_openai_request(system_instruction=system, content=prompt)
 
     def get_system_prompt(self) -> str:
         system = """Você é um especialista em limpeza e tratamento de dados com Python e pandas.
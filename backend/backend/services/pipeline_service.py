@@ -0,0 +1,151 @@
+import asyncio
+
+from backend.core.cache_db import CacheDB, cache_db
+from backend.core.logging import setup_logging
+from backend.core.settings import settings
+from backend.core.tracing import file_trace, request_id_var
+from backend.models.schemas import DataSummarySchema, ExecutionResultSchema
+from backend.services.csv_service import CSVService, csv_service
+from backend.services.execution_service import ExecutionService, execution_service, script_digest
+from backend.services.llm_service import LLMService, llm_service
+from backend.services.scheduler_service import JobPriority, JobScheduler, job_scheduler
+
+log = setup_logging("backend.pipeline_service")
+
+
+# estágios process -> execute compartilhados pelas rotas síncronas e pelos workers de /jobs
+class PipelineService:
+    def __init__(
+        self,
+        csv_service: CSVService,
+        llm_service: LLMService,
+        execution_service: ExecutionService,
+        cache_db: CacheDB,
+        scheduler: JobScheduler,
+    ) -> None:
+        self.csv_service = csv_service
+        self.llm_service = llm_service
+        self.execution_service = execution_service
+        self.cache_db = cache_db
+        self.scheduler = scheduler
+
+    async def generate_script(self, file_id: str) -> tuple[str, DataSummarySchema]:
+        with file_trace(file_id, "process"):
+            if not await self.csv_service.file_exists(file_id):
+                raise FileNotFoundError("File not found")
+
+            data_summary = await self.csv_service.get_data_summary(file_id)
+            script = await self.request_script(data_summary)
+            await self.assign_script(file_id, script)
+            return script, data_summary
+
+    async def request_script(self, data_summary: DataSummarySchema) -> str:
+        prompt = self.llm_service.build_prompt(data_summary)
+        # o SDK da OpenAI é síncrono; fora do event loop a chamada não trava as outras requisições
+        return await asyncio.get_event_loop().run_in_executor(
+            None, self.llm_service.generate_script, prompt
+        )
+
+    async def assign_script(self, file_id: str, script: str) -> None:
+        await self.csv_service.save_script(file_id=file_id, script=script)
+
+        log.info("Redis cachedb updated - Processed by LLM: %s", file_id)
+        await self.cache_db.update_status(file_id, "processed_by_llm", True)
+
+    async def run_script(self, file_id: str) -> ExecutionResultSchema:
+        with file_trace(file_id, "execute"):
+            if not await self.csv_service.file_exists(file_id):
+                raise FileNotFoundError("File not found")
+
+            script = await self.csv_service.get_script(file_id)
+            if not script:
+                raise FileNotFoundError("Script not found. Execute /process first.")
+
+            original_df = await self.csv_service.get_original_dataframe(
+                file_id, compact=settings.DTYPE_COMPACTION
+            )
+            if settings.DTYPE_COMPACTION:
+                original_df = await asyncio.get_event_loop().run_in_executor(
+                    None, self.execution_service.check_compaction, script, original_df
+                )
+            result = await self.execution_service.execute_script(script, original_df)
+            if result.error_message:
+                raise ValueError(f"Error when trying to execute script: {result.error_message}")
+
+            await self.csv_service.save_processed_data(file_id, result.processed_dataframe)
+            log.info("Script successfully executed into file_id: %s", file_id)
+
+            log.info("Redis cachedb updated - Script executed: %s", file_id)
+            # o /append só processa o delta se o arquivo processado veio deste mesmo script
+            await self.cache_db.update_statuses(
+                file_id, {"script_executed": True, "executed_script": script_digest(script)}
+            )
+            return result
+
+    async def submit_job(
+        self, job_id: str, tenant: str, priority: JobPriority, size_bytes: int
+    ) -> None:
+        await self.cache_db.update_statuses(
+            job_id,
+            {
+                "job_state": "queued",
+                "job_stage": "",
+                "job_error": "",
+                "job_tenant": tenant,
+                "job_priority": priority,
+                "job_request_id": request_id_var.get() or "",
+            },
+        )
+        await self.scheduler.submit(job_id, tenant, priority, size_bytes)
+
+    async def cancel_job(self, job_id: str) -> bool:
+        # só jobs ainda na fila podem ser cancelados; os em execução seguem até o fim
+        if not await self.scheduler.cancel(job_id):
+            return False
+        await self.cache_db.update_statuses(job_id, {"job_state": "cancelled"})
+        log.info("Job %s cancelled", job_id)
+        return True
+
+    async def run_job(self, job_id: str) -> None:
+        log.info("Starting job %s", job_id)
+        # o worker herda o request id de quem enfileirou o job
+        status_info = await self.cache_db.get_status(job_id)
+        token = request_id_var.set(status_info.get("job_request_id") or None)
+        try:
+            with file_trace(job_id, "job", {"job.priority": status_info.get("job_priority")}):
+                await self.cache_db.update_statuses(job_id, {"job_state": "running", "job_stage": "process"})
+                await self.generate_script(job_id)
+                await self.cache_db.update_statuses(job_id, {"job_stage": "execute"})
+                await self.run_script(job_id)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            log.exception("Job %s failed: %s", job_id, e)
+            await self.cache_db.update_statuses(job_id, {"job_state": "failed", "job_error": str(e)})
+            return
+        finally:
+            request_id_var.reset(token)
+        await self.cache_db.update_statuses(job_id, {"job_state": "done", "job_stage": ""})
+        log.info("Job %s finished", job_id)
+
+    async def work(self, worker_id: int) -> None:
+        log.info("Job worker %s started", worker_id)
+        while True:
+            try:
+                job_id = await self.scheduler.next_job(settings.JOB_DEQUEUE_TIMEOUT)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                log.error("Job worker %s could not read the queue: %s", worker_id, e)
+                await asyncio.sleep(1)
+                continue
+            if job_id is not None:
+                await self.run_job(job_id)
+
+    def start_workers(self, concurrency: int) -> list[asyncio.Task]:
+        return [asyncio.create_task(self.work(worker_id)) for worker_id in range(concurrency)]
+
+
+pipeline_service = PipelineService(
+    csv_service, llm_service, execution_service, cache_db, job_scheduler
+)
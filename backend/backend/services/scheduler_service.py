@@ -0,0 +1,82 @@
+import hashlib
+import time
+from typing import Literal, Optional
+
+import numpy as np
+
+from backend.core.cache_db import CacheDB, cache_db
+from backend.core.logging import setup_logging
+from backend.core.settings import settings
+from backend.models.schemas import QueueMetricsSchema, WaitTimeSchema
+
+log = setup_logging("backend.scheduler_service")
+
+JobPriority = Literal["high", "normal", "low"]
+
+# deslocamento do score em múltiplos de JOB_PRIORITY_STEP_SECONDS
+PRIORITY_STEPS: dict[str, int] = {"high": -1, "normal": 0, "low": 1}
+
+DEFAULT_TENANT = "anonymous"
+
+
+def resolve_tenant(api_key: Optional[str], tenant_id: Optional[str]) -> str:
+    # a chave nunca vai para o Redis em claro, só o hash dela
+    if api_key:
+        return "key:" + hashlib.blake2b(api_key.encode("utf-8"), digest_size=8).hexdigest()
+    if tenant_id:
+        return f"tenant:{tenant_id}"
+    return DEFAULT_TENANT
+
+
+# fila justa: round-robin entre tenants e, dentro de cada tenant, o menor score
+# primeiro. O score é um "instante virtual de início": chegada + custo estimado
+# pelo tamanho (SJF) + ajuste de prioridade. Como a chegada faz parte do score,
+# arquivos grandes envelhecem e acabam passando na frente dos pequenos novos.
+class JobScheduler:
+    def __init__(self, cache_db: CacheDB) -> None:
+        self.cache_db = cache_db
+
+    def score(self, size_bytes: int, priority: JobPriority, now: float) -> float:
+        return (
+            now
+            + size_bytes / settings.JOB_SJF_BYTES_PER_SECOND
+            + PRIORITY_STEPS[priority] * settings.JOB_PRIORITY_STEP_SECONDS
+        )
+
+    async def submit(
+        self, job_id: str, tenant: str, priority: JobPriority, size_bytes: int
+    ) -> None:
+        score = self.score(size_bytes, priority, time.time())
+        await self.cache_db.enqueue_job(job_id, tenant, score, priority)
+        log.info("Job %s queued - tenant: %s, priority: %s, size: %s", job_id, tenant, priority, size_bytes)
+
+    async def next_job(self, timeout: int) -> Optional[str]:
+        return await self.cache_db.dequeue_job(timeout)
+
+    async def cancel(self, job_id: str) -> bool:
+        return await self.cache_db.cancel_job(job_id)
+
+    async def metrics(self) -> QueueMetricsSchema:
+        depths = await self.cache_db.get_queue_depths()
+        samples = await self.cache_db.get_wait_samples()
+
+        by_priority: dict[str, list[float]] = {"all": [wait for _, wait in samples]}
+        for priority, wait in samples:
+            by_priority.setdefault(priority, []).append(wait)
+
+        return QueueMetricsSchema(
+            depth=sum(depths.values()),
+            tenants=depths,
+            wait_seconds={
+                priority: WaitTimeSchema(
+                    samples=len(waits),
+                    p50=round(float(np.percentile(waits, 50)), 3),
+                    p95=round(float(np.percentile(waits, 95)), 3),
+                )
+                for priority, waits in by_priority.items()
+                if waits
+            },
+        )
+
+
+job_scheduler = JobScheduler(cache_db)
@@ -0,0 +1,47 @@
+import argparse
+import asyncio
+
+from backend.core.cache_db import cache_db
+from backend.core.logging import setup_logging
+from backend.core.settings import settings
+from backend.core.storage import storage
+from backend.core.tracing import install_context_executor, setup_tracing, shutdown_tracing
+from backend.services.pipeline_service import pipeline_service
+
+log = setup_logging("backend.worker")
+
+
+# worker avulso: consome a fila de /jobs fora do processo da API
+# uso: python -m backend.worker --concurrency 4
+async def run(concurrency: int) -> None:
+    storage.setup()
+    setup_tracing()
+    install_context_executor()
+    tasks = pipeline_service.start_workers(concurrency)
+    log.info("Worker running with %s concurrent jobs", concurrency)
+    try:
+        await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+        await cache_db.close()
+        shutdown_tracing()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Background worker for the /jobs pipeline")
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=max(settings.JOB_WORKERS, 1),
+        help="number of jobs processed at the same time",
+    )
+    args = parser.parse_args()
+    try:
+        asyncio.run(run(args.concurrency))
+    except KeyboardInterrupt:
+        log.info("Worker stopped")
+
+
+if __name__ == "__main__":
+    main()
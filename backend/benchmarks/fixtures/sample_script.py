@@ -104,7 +104,7 @@ if 'id' in df.columns:
     ids_existentes = set(df['id'].dropna().astype(int))
     proximo_id = 1
     def preencher_id(x):
-        nonlocal proximo_id
+        global proximo_id
         if not pd.isnull(x):
             return int(x)
         while proximo_id in ids_existentes:
@@ -0,0 +1,103 @@
+import argparse
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# mesmo formato do fixture em benchmarks/fixtures/sample.csv: id,nome,idade,email,data_cadastro,salario
+COLUMNS = ["id", "nome", "idade", "email", "data_cadastro", "salario"]
+
+FIRST_NAMES = np.array([
+    "Ana", "Bruno", "Carlos", "Daniel", "Fernanda", "João", "Maria", "Beatriz",
+    "Arlette", "Ivonne", "Nona", "Kingsley", "Gipsy", "Neale", "Lúcia", "Otávio",
+])
+DOMAINS = np.array(["email.com", "usatoday.com", "narod.ru", "boston.com", "mail.ru", "uol.com.br"])
+DATE_FORMATS = ["%Y-%m-%d", "%Y/%m/%d", "%d-%m-%Y", "%d/%m/%Y", "%Y%m%d"]
+TEXT_AGES = np.array(["trinta", "vinte e cinco", "quarenta"])
+TEXT_SALARIES = np.array(["quatro mil", "três mil e quinhentos", "a combinar"])
+
+CHUNK_ROWS = 500_000
+
+
+def _mask(rng: np.random.Generator, size: int, rate: float) -> np.ndarray:
+    return rng.random(size) < rate
+
+
+def dirty_chunk(rng: np.random.Generator, start: int, size: int) -> pd.DataFrame:
+    ids = np.arange(start + 1, start + size + 1).astype(str).astype(object)
+    ids[_mask(rng, size, 0.05)] = ""
+
+    names = FIRST_NAMES[rng.integers(0, len(FIRST_NAMES), size)].astype(object)
+    lower = _mask(rng, size, 0.05)
+    names[lower] = [name.lower() for name in names[lower]]
+    padded = _mask(rng, size, 0.05)
+    names[padded] = [f"  {name} " for name in names[padded]]
+    names[_mask(rng, size, 0.03)] = ""
+
+    ages = rng.integers(18, 70, size).astype(str).astype(object)
+    ages[_mask(rng, size, 0.04)] = ""
+    text_ages = _mask(rng, size, 0.01)
+    ages[text_ages] = TEXT_AGES[rng.integers(0, len(TEXT_AGES), text_ages.sum())]
+
+    users = pd.Series(names).str.strip().str.lower().replace("", "user").to_numpy(dtype=object)
+    emails = (users + "@" + DOMAINS[rng.integers(0, len(DOMAINS), size)].astype(object)).astype(object)
+    no_tld = _mask(rng, size, 0.03)
+    emails[no_tld] = [email.rsplit(".", 1)[0] for email in emails[no_tld]]
+    no_domain = _mask(rng, size, 0.02)
+    emails[no_domain] = [email.split("@")[0] + "@" for email in emails[no_domain]]
+    emails[_mask(rng, size, 0.03)] = ""
+
+    days = pd.Timestamp("2023-01-01") + pd.to_timedelta(rng.integers(0, 730, size), unit="D")
+    dates = np.empty(size, dtype=object)
+    formats = rng.integers(0, len(DATE_FORMATS), size)
+    for i, date_format in enumerate(DATE_FORMATS):
+        selected = formats == i
+        dates[selected] = days[selected].strftime(date_format)
+    dates[_mask(rng, size, 0.01)] = "2023-13-01"
+    dates[_mask(rng, size, 0.04)] = ""
+
+    # salários no formato pt-BR (milhar com ponto, decimal com vírgula), misturados com texto
+    cents = rng.integers(150_000, 2_000_000, size)
+    reais = cents // 100
+    salaries = np.char.add(np.char.add(reais.astype(str), ","), np.char.zfill((cents % 100).astype(str), 2)).astype(object)
+    thousands = _mask(rng, size, 0.3) & (reais >= 1000)
+    salaries[thousands] = [
+        f"{r // 1000}.{r % 1000:03d},{c % 100:02d}" for r, c in zip(reais[thousands], cents[thousands])
+    ]
+    plain = _mask(rng, size, 0.3)
+    salaries[plain] = reais[plain].astype(str)
+    text_salaries = _mask(rng, size, 0.01)
+    salaries[text_salaries] = TEXT_SALARIES[rng.integers(0, len(TEXT_SALARIES), text_salaries.sum())]
+    salaries[_mask(rng, size, 0.04)] = ""
+
+    df = pd.DataFrame(
+        {"id": ids, "nome": names, "idade": ages, "email": emails, "data_cadastro": dates, "salario": salaries},
+        columns=COLUMNS,
+    )
+    # linhas repetidas logo em seguida, como no raw-data.csv
+    duplicated = df[_mask(rng, size, 0.02)]
+    return pd.concat([df, duplicated]).sort_index(kind="stable").iloc[:size]
+
+
+def generate_dirty_csv(path: Path, rows: int, seed: int = 42) -> Path:
+    # escrito em blocos: 10M linhas nunca ficam inteiras em memória
+    path = Path(path)
+    rng = np.random.default_rng(seed)
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        for start in range(0, rows, CHUNK_ROWS):
+            chunk = dirty_chunk(rng, start, min(CHUNK_ROWS, rows - start))
+            chunk.to_csv(f, index=False, header=start == 0)
+    return path
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Generate a seeded dirty CSV for the benchmarks")
+    parser.add_argument("path", type=Path)
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    generate_dirty_csv(args.path, args.rows, args.seed)
+
+
+if __name__ == "__main__":
+    main()
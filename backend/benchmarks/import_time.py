@@ -0,0 +1,86 @@
+import argparse
+import os
+import re
+import subprocess
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+# SDKs que só podem ser importados sob demanda (primeiro uso ou preload no lifespan)
+LAZY_MODULES = ("google.genai", "openai", "boto3", "openpyxl")
+
+LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)$")
+
+
+def import_profile(module: str) -> list[tuple[str, int, int, int]]:
+    # -X importtime escreve no stderr: self us | cumulative us | nome indentado pela profundidade
+    env = {
+        **os.environ,
+        "OPENAI_SECRET_KEY": os.environ.get("OPENAI_SECRET_KEY", "import-time"),
+        "GEMINI_SECRET_KEY": os.environ.get("GEMINI_SECRET_KEY", "import-time"),
+        "LOG_LEVEL": "WARNING",
+    }
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True,
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{completed.stderr[-2000:]}")
+
+    entries = []
+    for line in completed.stderr.splitlines():
+        match = LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            entries.append((name, int(self_us), int(cumulative_us), len(indent) // 2))
+    return entries
+
+
+def direct_imports(entries: list[tuple[str, int, int, int]], module: str) -> list[tuple[str, int, int, int]]:
+    # os filhos aparecem antes do pai na saída; sobe a partir do módulo até a próxima raiz
+    index = max(i for i, entry in enumerate(entries) if entry[0] == module)
+    depth = entries[index][3]
+    children = []
+    for entry in reversed(entries[:index]):
+        if entry[3] <= depth:
+            break
+        if entry[3] == depth + 1:
+            children.append(entry)
+    return children
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Check the API cold-start import time against a budget")
+    parser.add_argument("--module", default="backend.main")
+    parser.add_argument("--budget-ms", type=float, default=2000.0, help="fail above this cumulative import time")
+    parser.add_argument("--top", type=int, default=15, help="top-level imports to list")
+    parser.add_argument("--repeat", type=int, default=3, help="runs; the fastest one is reported")
+    args = parser.parse_args()
+
+    # o menor tempo é o menos afetado por cache de disco e ruído da máquina
+    runs = [import_profile(args.module) for _ in range(args.repeat)]
+    entries = min(runs, key=lambda run: next(c for n, _, c, _ in run if n == args.module))
+    total_ms = next(c for n, _, c, _ in entries if n == args.module) / 1000
+
+    imported = {name for name, *_ in entries}
+    eager = [name for name in LAZY_MODULES if name in imported]
+
+    top_level = sorted(direct_imports(entries, args.module), key=lambda e: e[2], reverse=True)
+    print(f"{'module':<40}{'cumulative ms':>15}{'self ms':>10}")
+    for name, self_us, cumulative_us, _ in top_level[:args.top]:
+        print(f"{name:<40}{cumulative_us / 1000:>15.1f}{self_us / 1000:>10.1f}")
+    print(f"\nimport {args.module}: {total_ms:.1f} ms (budget {args.budget_ms:.0f} ms)")
+
+    failures = []
+    if total_ms > args.budget_ms:
+        failures.append(f"import time {total_ms:.1f} ms is above the {args.budget_ms:.0f} ms budget")
+    if eager:
+        failures.append(f"imported eagerly (should be lazy): {', '.join(eager)}")
+    if failures:
+        print("\n" + "\n".join(failures), file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Awaitable, Callable
+
+# os benchmarks nunca chamam os provedores de LLM, mas o Settings exige as chaves
+os.environ.setdefault("OPENAI_SECRET_KEY", "benchmark")
+os.environ.setdefault("GEMINI_SECRET_KEY", "benchmark")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+import numpy as np
+import pandas as pd
+from starlette.datastructures import UploadFile
+
+from backend.core.serialization import encode_result
+from backend.core.storage import LocalStorage
+from backend.services.csv_service import CSVService
+from backend.services.execution_service import ExecutionService
+
+from benchmarks.generator import generate_dirty_csv
+
+BENCHMARKS_DIR = Path(__file__).resolve().parent
+DEFAULT_BASELINE = BENCHMARKS_DIR / "baseline.json"
+# fora de upload/: o GC de artefatos removeria o fixture como um upload qualquer
+DEFAULT_SCRIPT = BENCHMARKS_DIR / "fixtures" / "sample_script.py"
+MIN_REGRESSION_SECONDS = 0.01
+
+
+async def measure(func: Callable[[], Awaitable[Any]], repeat: int) -> dict[str, Any]:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await func()
+        timings.append(time.perf_counter() - start)
+
+    # pico de memória numa rodada à parte: o tracemalloc distorce o tempo
+    tracemalloc.start()
+    try:
+        await func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "seconds_min": round(min(timings), 6),
+        "seconds_median": round(statistics.median(timings), 6),
+        "peak_memory_bytes": peak,
+    }
+
+
+async def run_size(rows: int, seed: int, repeat: int, script: str, workdir: Path) -> list[dict[str, Any]]:
+    source = workdir / f"dirty_{rows}_{seed}.csv"
+    if not source.exists():
+        generate_dirty_csv(source, rows, seed)
+
+    storage = LocalStorage(workdir / f"storage_{rows}")
+    storage.setup()
+    csv_service = CSVService(storage)
+    execution_service = ExecutionService()
+
+    uploaded: list[str] = []
+
+    async def save_uploaded_file() -> None:
+        with open(source, "rb") as f:
+            file_info = await csv_service.save_uploaded_file(UploadFile(file=f, filename=source.name))
+        uploaded.append(file_info.file_id)
+
+    # o upload é medido primeiro e deixa o arquivo usado pelos demais casos
+    results = {"save_uploaded_file": await measure(save_uploaded_file, repeat)}
+    file_id = uploaded[-1]
+    original_df = await csv_service.get_original_dataframe(file_id)
+
+    executed: dict[str, pd.DataFrame] = {}
+
+    async def execute_script() -> None:
+        result = await execution_service.execute_script(script, original_df)
+        if result.error_message:
+            raise RuntimeError(result.error_message)
+        executed["df"] = result.processed_dataframe
+
+    results["get_data_summary"] = await measure(lambda: csv_service.get_data_summary(file_id), repeat)
+    results["execute_script"] = await measure(execute_script, repeat)
+
+    await csv_service.save_processed_data(file_id, executed["df"])
+    processed_df = csv_service._read_processed(file_id)
+    loop = asyncio.get_event_loop()
+
+    results["get_processed_data"] = await measure(lambda: csv_service.get_processed_data(file_id), repeat)
+    for orient in ("columns", "records"):
+        results[f"encode_result_{orient}"] = await measure(
+            lambda orient=orient: loop.run_in_executor(None, encode_result, file_id, processed_df, orient),
+            repeat,
+        )
+
+    for stale_id in uploaded:
+        await csv_service.cleanup_files(stale_id)
+    return [{"case": case, "rows": rows, **metrics} for case, metrics in results.items()]
+
+
+def compare(results: list[dict[str, Any]], baseline: dict[str, Any], tolerance: float) -> list[str]:
+    reference = {(entry["case"], entry["rows"]): entry for entry in baseline["results"]}
+    regressions = []
+    print(f"\n{'case':<26}{'rows':>10}{'baseline s':>13}{'current s':>12}{'ratio':>8}{'best':>8}{'peak MB':>10}")
+    for entry in results:
+        previous = reference.get((entry["case"], entry["rows"]))
+        if previous is None:
+            continue
+        # compara medianas: o mínimo de poucas rodadas num único núcleo oscila demais.
+        # Só é regressão se o melhor tempo também piorou (um pico isolado não basta)
+        # e a diferença passa de alguns ms
+        ratio = entry["seconds_median"] / max(previous["seconds_median"], 1e-9)
+        best_ratio = entry["seconds_min"] / max(previous["seconds_min"], 1e-9)
+        flag = ""
+        if (
+            ratio > 1 + tolerance
+            and best_ratio > 1 + tolerance
+            and entry["seconds_median"] - previous["seconds_median"] > MIN_REGRESSION_SECONDS
+        ):
+            flag = "  REGRESSION"
+            regressions.append(f"{entry['case']} ({entry['rows']} rows): {ratio:.2f}x")
+        print(
+            f"{entry['case']:<26}{entry['rows']:>10}{previous['seconds_median']:>13.4f}"
+            f"{entry['seconds_median']:>12.4f}{ratio:>8.2f}{best_ratio:>8.2f}"
+            f"{entry['peak_memory_bytes'] / 2**20:>10.1f}{flag}"
+        )
+    return regressions
+
+
+def environment() -> dict[str, Any]:
+    return {
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+    }
+
+
+async def run(args: argparse.Namespace) -> int:
+    script = Path(args.script or DEFAULT_SCRIPT).read_text(encoding="utf-8")
+    results: list[dict[str, Any]] = []
+    with tempfile.TemporaryDirectory(prefix="dp-bench-") as tmp:
+        workdir = Path(args.workdir or tmp)
+        workdir.mkdir(parents=True, exist_ok=True)
+        for rows in args.rows:
+            print(f"Running benchmarks with {rows} rows...", file=sys.stderr)
+            results.extend(await run_size(rows, args.seed, args.repeat, script, workdir))
+
+    report = {
+        "environment": environment(),
+        "seed": args.seed,
+        "repeat": args.repeat,
+        "results": results,
+    }
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2) + "\n", encoding="utf-8")
+        print(f"Results written to {args.output}", file=sys.stderr)
+
+    writing_baseline = args.output is not None and args.baseline.resolve() == args.output.resolve()
+    if args.baseline.exists() and not writing_baseline:
+        regressions = compare(results, json.loads(args.baseline.read_text(encoding="utf-8")), args.tolerance)
+        if regressions:
+            print("\nRegressions above tolerance:\n  " + "\n  ".join(regressions), file=sys.stderr)
+            return 0 if args.advisory else 1
+    else:
+        print(json.dumps(results, indent=2))
+    return 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the CSV pipeline hot paths")
+    parser.add_argument(
+        "--rows", type=int, nargs="+", default=[10_000, 100_000],
+        help="dataset sizes (the generator goes up to 10M rows)",
+    )
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeat", type=int, default=7, help="timed runs per case (medians are compared)")
+    parser.add_argument("--script", type=Path, help="cleaning script (default: fixtures/sample_script.py)")
+    parser.add_argument("--workdir", type=Path, help="keep generated datasets here between runs")
+    parser.add_argument("--output", type=Path, help="write the results as JSON (e.g. a new baseline)")
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE, help="compare against this file")
+    parser.add_argument(
+        "--tolerance", type=float, default=0.25,
+        help="allowed slowdown (median and best run vs. baseline) before a case counts as a regression",
+    )
+    parser.add_argument(
+        "--advisory", action="store_true",
+        help="report regressions but exit 0 (shared or single-core machines)",
+    )
+    args = parser.parse_args()
+    sys.exit(asyncio.run(run(args)))
+
+
+if __name__ == "__main__":
+    main()
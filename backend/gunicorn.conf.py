@@ -0,0 +1,57 @@
+import multiprocessing
+import os
+from pathlib import Path
+
+# servidor de produção: o gunicorn gerencia os processos e cada worker roda o app
+# no uvicorn com uvloop e httptools
+#   gunicorn -c gunicorn.conf.py backend.main:app
+
+bind = f"{os.environ.get('DATAPROCESSOR_BACKEND_HOST', '0.0.0.0')}:{os.environ.get('DATAPROCESSOR_BACKEND_PORT', '8000')}"
+workers = int(os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+worker_class = "backend.core.server.Worker"
+
+# pandas, numpy e pyarrow são importados uma vez no master; os workers herdam as
+# páginas por copy-on-write e sobem sem pagar o import
+preload_app = True
+
+# maior que o idle timeout do proxy na frente, para que seja sempre o proxy a fechar
+keepalive = int(os.environ.get("KEEPALIVE_SECONDS", 75))
+# no SIGTERM cada worker para de aceitar conexões e tem esse tempo para terminar as atuais
+graceful_timeout = int(os.environ.get("GRACEFUL_TIMEOUT_SECONDS", 30))
+# worker com o event loop travado por mais que isso é reiniciado
+timeout = int(os.environ.get("WORKER_TIMEOUT_SECONDS", 120))
+# recicla os workers aos poucos: o heap fragmenta depois de muitos DataFrames grandes
+max_requests = int(os.environ.get("MAX_REQUESTS", 2000))
+max_requests_jitter = max_requests // 10
+
+accesslog = None
+errorlog = "-"
+
+# cada worker grava as métricas do Prometheus aqui e o /metrics agrega todos;
+# precisa estar definido antes do preload importar o prometheus_client
+metrics_dir = Path(os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", "/tmp/dataprocessor-metrics"))
+metrics_dir.mkdir(parents=True, exist_ok=True)
+
+
+def on_starting(server) -> None:
+    from backend.core.settings import settings
+
+    # estado só em memória não é visto pelos outros workers
+    if settings.CACHE_BACKEND == "memory" and server.cfg.workers > 1:
+        raise RuntimeError("CACHE_BACKEND=memory only works with a single worker; use redis")
+
+    # arquivos de uma execução anterior somariam contadores antigos
+    for stale in metrics_dir.glob("*.db"):
+        stale.unlink()
+
+    if settings.LLM_PRELOAD:
+        # os SDKs também entram antes do fork, uma vez só
+        from backend.services.llm_service import llm_service
+
+        llm_service.preload()
+
+
+def child_exit(server, worker) -> None:
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,180 @@
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Optional
+
+import httpx
+import numpy as np
+
+from benchmarks.generator import dirty_chunk
+
+# fluxo completo de um arquivo, na ordem em que o frontend chama a API
+ROUTES = ("upload", "process", "execute", "result")
+
+
+class Recorder:
+    def __init__(self) -> None:
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.statuses: dict[str, dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        self.flows_ok = 0
+        self.flows_failed = 0
+
+    def record(self, route: str, seconds: float, status: str) -> None:
+        self.latencies[route].append(seconds)
+        self.statuses[route][status] += 1
+
+    def report(self, elapsed: float, workers: int, cores: int) -> dict[str, Any]:
+        routes = {}
+        for route in ROUTES + ("flow",):
+            samples = self.latencies.get(route)
+            if not samples:
+                continue
+            p50, p95, p99 = np.percentile(samples, [50, 95, 99])
+            routes[route] = {
+                "requests": len(samples),
+                "throughput_rps": round(len(samples) / elapsed, 3),
+                "p50_ms": round(p50 * 1000, 1),
+                "p95_ms": round(p95 * 1000, 1),
+                "p99_ms": round(p99 * 1000, 1),
+                "max_ms": round(max(samples) * 1000, 1),
+                "statuses": dict(self.statuses[route]),
+            }
+        flows_per_second = self.flows_ok / elapsed
+        return {
+            "elapsed_seconds": round(elapsed, 3),
+            "flows_ok": self.flows_ok,
+            "flows_failed": self.flows_failed,
+            "flows_per_second": round(flows_per_second, 3),
+            # capacidade normalizada, para comparar configurações de deploy
+            "flows_per_second_per_worker": round(flows_per_second / max(workers, 1), 3),
+            "flows_per_second_per_core": round(flows_per_second / max(cores, 1), 3),
+            "routes": routes,
+        }
+
+
+def make_payload(rows: int, seed: int) -> bytes:
+    return dirty_chunk(np.random.default_rng(seed), 0, rows).to_csv(index=False).encode("utf-8")
+
+
+async def timed(
+    recorder: Recorder, route: str, client: httpx.AsyncClient, method: str, url: str, **kwargs
+) -> Optional[httpx.Response]:
+    start = time.perf_counter()
+    try:
+        response = await client.request(method, url, **kwargs)
+        if route == "result":
+            # o tempo do /result inclui o corpo inteiro (streaming)
+            await response.aread()
+    except httpx.HTTPError as e:
+        recorder.record(route, time.perf_counter() - start, type(e).__name__)
+        return None
+    recorder.record(route, time.perf_counter() - start, str(response.status_code))
+    return response if response.is_success else None
+
+
+async def run_flow(recorder: Recorder, client: httpx.AsyncClient, api: str, payload: bytes, orient: str) -> None:
+    start = time.perf_counter()
+    response = await timed(
+        recorder, "upload", client, "POST", f"{api}/upload",
+        files={"file": ("loadtest.csv", payload, "text/csv")},
+    )
+    ok = response is not None
+    if ok:
+        file_id = response.json()["file_id"]
+        ok = await timed(recorder, "process", client, "POST", f"{api}/process", params={"file_id": file_id}) is not None
+        ok = ok and await timed(
+            recorder, "execute", client, "POST", f"{api}/execute", params={"file_id": file_id}
+        ) is not None
+        ok = ok and await timed(
+            recorder, "result", client, "GET", f"{api}/result/{file_id}", params={"orient": orient}
+        ) is not None
+
+    if ok:
+        recorder.flows_ok += 1
+        recorder.record("flow", time.perf_counter() - start, "ok")
+    else:
+        recorder.flows_failed += 1
+
+
+async def run(args: argparse.Namespace) -> dict[str, Any]:
+    api = args.url.rstrip("/") + "/api/v1"
+    payloads = [make_payload(args.rows, args.seed + i) for i in range(args.distinct_files)]
+    recorder = Recorder()
+    limits = httpx.Limits(max_connections=args.max_in_flight, max_keepalive_connections=args.max_in_flight)
+    in_flight = asyncio.Semaphore(args.max_in_flight)
+    arrivals = random.Random(args.seed)
+    tasks: list[asyncio.Task] = []
+
+    async def guarded(payload: bytes) -> None:
+        async with in_flight:
+            await run_flow(recorder, client, api, payload, args.orient)
+
+    async with httpx.AsyncClient(timeout=args.timeout, limits=limits) as client:
+        started = time.perf_counter()
+        deadline = started + args.duration
+        next_arrival = started
+        # carga em malha aberta: chegadas de Poisson na taxa alvo, sem esperar as anteriores
+        while next_arrival < deadline:
+            await asyncio.sleep(max(next_arrival - time.perf_counter(), 0))
+            tasks.append(asyncio.create_task(guarded(payloads[len(tasks) % len(payloads)])))
+            next_arrival += arrivals.expovariate(args.rate)
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - started
+
+    report = recorder.report(elapsed, args.server_workers, args.server_cores)
+    report["config"] = {
+        "rate": args.rate,
+        "duration": args.duration,
+        "rows": args.rows,
+        "orient": args.orient,
+        "max_in_flight": args.max_in_flight,
+        "server_workers": args.server_workers,
+        "server_cores": args.server_cores,
+    }
+    return report
+
+
+def print_report(report: dict[str, Any]) -> None:
+    print(
+        f"\nflows ok: {report['flows_ok']}  failed: {report['flows_failed']}  "
+        f"in {report['elapsed_seconds']}s -> {report['flows_per_second']} flows/s "
+        f"({report['flows_per_second_per_worker']}/worker, {report['flows_per_second_per_core']}/core)"
+    )
+    print(f"\n{'route':<10}{'reqs':>7}{'rps':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}  statuses")
+    for route, stats in report["routes"].items():
+        print(
+            f"{route:<10}{stats['requests']:>7}{stats['throughput_rps']:>9}{stats['p50_ms']:>10}"
+            f"{stats['p95_ms']:>10}{stats['p99_ms']:>10}  {stats['statuses']}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Load test the upload -> process -> execute -> result flow")
+    parser.add_argument("--url", default="http://localhost:8000", help="API base url")
+    parser.add_argument("--rate", type=float, default=2.0, help="new flows started per second")
+    parser.add_argument("--duration", type=float, default=60.0, help="seconds spent starting flows")
+    parser.add_argument("--rows", type=int, default=1000, help="rows in each uploaded csv")
+    parser.add_argument("--distinct-files", type=int, default=8, help="different csv payloads to rotate")
+    parser.add_argument("--orient", choices=["records", "columns"], default="columns")
+    parser.add_argument("--max-in-flight", type=int, default=200, help="cap on concurrent flows")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--server-workers", type=int, default=1, help="API workers under test (for per-worker numbers)")
+    parser.add_argument("--server-cores", type=int, default=1, help="cores given to the API (for per-core numbers)")
+    parser.add_argument("--output", type=Path, help="write the report as JSON")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    print_report(report)
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2) + "\n", encoding="utf-8")
+        print(f"\nReport written to {args.output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
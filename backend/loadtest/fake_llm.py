@@ -0,0 +1,215 @@
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import re
+import time
+import uuid
+from pathlib import Path
+from typing import Any, AsyncIterator, Optional
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+# substituto local da Responses API da OpenAI: aponte OPENAI_BASE_URL para
+# http://<host>:<porta>/v1 e o LLMService passa a falar com este servidor
+
+
+class FakeLLMConfig:
+    def __init__(
+        self,
+        latency: str = "lognormal",
+        latency_ms: float = 800.0,
+        latency_sigma: float = 0.5,
+        error_rate: float = 0.0,
+        throttle_rate: float = 0.0,
+        stream_chunks: int = 20,
+        script: Optional[str] = None,
+        seed: Optional[int] = None,
+    ) -> None:
+        self.latency = latency
+        self.latency_ms = latency_ms
+        self.latency_sigma = latency_sigma
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.stream_chunks = max(stream_chunks, 1)
+        self.script = script
+        self.random = random.Random(seed)
+
+    def delay(self) -> float:
+        # latency_ms é a mediana; lognormal reproduz a cauda longa dos provedores
+        if self.latency == "fixed":
+            millis = self.latency_ms
+        elif self.latency == "uniform":
+            millis = self.random.uniform(0, 2 * self.latency_ms)
+        else:
+            millis = self.random.lognormvariate(0, self.latency_sigma) * self.latency_ms
+        return millis / 1000
+
+
+TYPE_PATTERN = re.compile(r"^\s*- (.+?): (object|int64|float64|bool|datetime64\[ns\])\s*$", re.MULTILINE)
+
+
+def templated_script(prompt: str) -> str:
+    # script de limpeza plausível a partir dos tipos listados no prompt
+    lines = ["# script gerado pelo servidor de LLM de teste", "df = df.drop_duplicates()"]
+    for column, dtype in TYPE_PATTERN.findall(prompt):
+        if dtype == "object":
+            lines.append(f"df[{column!r}] = df[{column!r}].astype(str).str.strip().replace('nan', '')")
+        elif dtype in ("int64", "float64"):
+            lines.append(f"df[{column!r}] = pd.to_numeric(df[{column!r}], errors='coerce')")
+    lines.append("df = df.reset_index(drop=True)")
+    return "\n".join(lines)
+
+
+def _prompt_text(body: dict[str, Any]) -> str:
+    content = body.get("input", "")
+    if isinstance(content, str):
+        return content
+    parts = []
+    for message in content:
+        value = message.get("content", "")
+        if isinstance(value, list):
+            value = " ".join(part.get("text", "") for part in value if isinstance(part, dict))
+        parts.append(str(value))
+    return "\n".join(parts)
+
+
+def _usage(prompt: str, text: str) -> dict[str, Any]:
+    # ~4 caracteres por token, suficiente para as métricas de tokens
+    input_tokens, output_tokens = len(prompt) // 4, len(text) // 4
+    return {
+        "input_tokens": input_tokens,
+        "input_tokens_details": {"cached_tokens": 0},
+        "output_tokens": output_tokens,
+        "output_tokens_details": {"reasoning_tokens": 0},
+        "total_tokens": input_tokens + output_tokens,
+    }
+
+
+def _response(model: str, text: str, usage: Optional[dict[str, Any]], status: str = "completed") -> dict[str, Any]:
+    content = [{"type": "output_text", "text": text, "annotations": []}] if text else []
+    return {
+        "id": f"resp_{uuid.uuid4().hex}",
+        "object": "response",
+        "created_at": int(time.time()),
+        "status": status,
+        "model": model,
+        "output": [
+            {
+                "type": "message",
+                "id": f"msg_{uuid.uuid4().hex}",
+                "status": status,
+                "role": "assistant",
+                "content": content,
+            }
+        ],
+        "parallel_tool_calls": False,
+        "tool_choice": "auto",
+        "tools": [],
+        "usage": usage,
+    }
+
+
+def _error(status_code: int, message: str, kind: str) -> JSONResponse:
+    return JSONResponse({"error": {"message": message, "type": kind, "code": None}}, status_code=status_code)
+
+
+def _sse(event: dict[str, Any], sequence: "itertools.count") -> bytes:
+    event = {**event, "sequence_number": next(sequence)}
+    return f"event: {event['type']}\ndata: {json.dumps(event)}\n\n".encode("utf-8")
+
+
+def create_app(config: FakeLLMConfig) -> FastAPI:
+    app = FastAPI(title="Fake LLM server")
+    stats = {"requests": 0, "errors": 0, "throttled": 0}
+
+    @app.get("/stats")
+    async def get_stats() -> dict[str, int]:
+        return stats
+
+    @app.post("/v1/responses")
+    async def create_response(request: Request):
+        body = await request.json()
+        stats["requests"] += 1
+        model = body.get("model", "fake-model")
+        prompt = _prompt_text(body)
+
+        roll = config.random.random()
+        if roll < config.throttle_rate:
+            stats["throttled"] += 1
+            return _error(429, "Rate limit reached (fake)", "rate_limit_error")
+        if roll < config.throttle_rate + config.error_rate:
+            await asyncio.sleep(config.delay() / 2)
+            stats["errors"] += 1
+            return _error(500, "Internal error (fake)", "server_error")
+
+        text = config.script if config.script is not None else templated_script(prompt)
+        delay = config.delay()
+        if not body.get("stream"):
+            await asyncio.sleep(delay)
+            return _response(model, text, _usage(prompt, text))
+
+        async def events() -> AsyncIterator[bytes]:
+            # mesma sequência de eventos da API real; o tempo total é o mesmo do modo sem stream
+            completed = _response(model, text, _usage(prompt, text))
+            item = completed["output"][0]
+            part = item["content"][0] if item["content"] else {"type": "output_text", "text": "", "annotations": []}
+            position = {"item_id": item["id"], "output_index": 0, "content_index": 0}
+            started = {**completed, "status": "in_progress", "output": [], "usage": None}
+            sequence = itertools.count()
+
+            yield _sse({"type": "response.created", "response": started}, sequence)
+            yield _sse({
+                "type": "response.output_item.added",
+                "output_index": 0,
+                "item": {**item, "status": "in_progress", "content": []},
+            }, sequence)
+            yield _sse({"type": "response.content_part.added", **position, "part": {**part, "text": ""}}, sequence)
+            size = max(len(text) // config.stream_chunks, 1)
+            for start in range(0, len(text), size):
+                await asyncio.sleep(delay / config.stream_chunks)
+                yield _sse({
+                    "type": "response.output_text.delta", **position, "delta": text[start:start + size], "logprobs": []
+                }, sequence)
+            yield _sse({"type": "response.output_text.done", **position, "text": text, "logprobs": []}, sequence)
+            yield _sse({"type": "response.content_part.done", **position, "part": part}, sequence)
+            yield _sse({"type": "response.output_item.done", "output_index": 0, "item": item}, sequence)
+            yield _sse({"type": "response.completed", "response": completed}, sequence)
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    return app
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Local stand-in for the OpenAI Responses API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--latency", choices=["fixed", "uniform", "lognormal"], default="lognormal")
+    parser.add_argument("--latency-ms", type=float, default=800.0, help="median response time")
+    parser.add_argument("--latency-sigma", type=float, default=0.5, help="spread of the lognormal latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of 500 responses")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="fraction of 429 responses")
+    parser.add_argument("--stream-chunks", type=int, default=20, help="deltas per streamed response")
+    parser.add_argument("--script", type=Path, help="canned script returned for every prompt")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    config = FakeLLMConfig(
+        latency=args.latency,
+        latency_ms=args.latency_ms,
+        latency_sigma=args.latency_sigma,
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+        stream_chunks=args.stream_chunks,
+        script=args.script.read_text(encoding="utf-8") if args.script else None,
+        seed=args.seed,
+    )
+    uvicorn.run(create_app(config), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,31 @@
+import os
+import tempfile
+
+# o Settings é lido no import do pacote: ambiente isolado antes de qualquer import do backend
+os.environ.setdefault("OPENAI_SECRET_KEY", "test")
+os.environ.setdefault("GEMINI_SECRET_KEY", "test")
+os.environ.setdefault("CACHE_BACKEND", "memory")
+os.environ.setdefault("GC_ENABLED", "false")
+os.environ.setdefault("JOB_WORKERS", "0")
+os.environ.setdefault("LLM_PRELOAD", "false")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+os.environ.setdefault("BASE_DIR", tempfile.mkdtemp(prefix="dp-tests-"))
+
+import pytest
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+def client():
+    from fastapi.testclient import TestClient
+
+    from backend.main import app
+    from backend.services.csv_service import csv_service
+
+    with TestClient(app) as client:
+        csv_service.storage.setup()
+        yield client
@@ -0,0 +1,196 @@
+import io
+
+import pandas as pd
+import pytest
+
+from backend.core.cache_db import cache_db
+from backend.core.settings import settings
+from backend.services.append_service import script_scope
+from backend.services.pipeline_service import pipeline_service
+from backend.services.csv_service import csv_service
+
+COLUMNS = ["id", "nome", "idade"]
+
+
+@pytest.mark.parametrize(
+    "script",
+    [
+        "m = max(df['id'].dropna())\ndf['id'] = df['id'].fillna(m + 1)",
+        "df['total'] = sum(df['idade'])",
+        "df['menor'] = min(df['idade'])",
+        "ids = set(df['id'])\ndf['novo'] = df['id'].apply(lambda x: x in ids)",
+        "df['ordem'] = sorted(df['idade'])",
+        "df['n'] = len(df)",
+        "df['pos'] = df.index",
+        "df['dobro'] = df['idade'].values * 2",
+        "df['dobro'] = df['idade'].to_numpy() * 2",
+        "df['lista'] = str(df['nome'].tolist())",
+        "df['idade'] = df['idade'].interpolate()",
+        "df['idade'] = df['idade'].fillna(df['idade'].median())",
+        "df = df.sort_values('idade')",
+        "df = df[:10]",
+        "df = df.reset_index()",
+        "df['nome'] = df['nome'].fillna(method='ffill')",
+        "n = 0\ndef conta(x):\n    global n\n    n += 1\n    return n\ndf['n'] = df['id'].apply(conta)",
+        "vistos = []\ndf['dup'] = df['nome'].apply(lambda x: vistos.append(x))",
+        "df['media'] = df['idade'].apply(lambda x: x / df['idade'].mean())",
+        "for _, row in df.iterrows():\n    print(row)",
+        "df = pd.concat([df, df])",
+        "df['data'] = pd.to_datetime(df['data'])",
+        "df['x'] = np.random.rand(len(df))",
+        "df['x'] = df.coluna_desconhecida",
+        "df = df.drop_duplicates(keep='last')",
+        "df = df.drop(0)",
+        "df = df.drop(index=[0, 1])",
+        "df.loc[0,'nome']='X'",
+        "df.loc[:2, 'nome'] = 'X'",
+        "df.at[0, 'nome'] = 'X'",
+        "df['nome'] = df['nome'].iloc[0]",
+        "df['primeiro'] = df['nome'][0]",
+        "df = df[[True, False]]",
+    ],
+)
+def test_dataset_wide_scripts(script):
+    assert script_scope(script, COLUMNS) == "dataset"
+
+
+@pytest.mark.parametrize(
+    "script, scope",
+    [
+        ("df['nome'] = df['nome'].astype(str).str.strip().str.title()", "rows"),
+        ("df['idade'] = pd.to_numeric(df['idade'], errors='coerce').fillna(0)", "rows"),
+        ("df['maior'] = np.where(df.idade > 18, 'sim', 'nao')", "rows"),
+        ("df['nome'] = df['nome'].apply(lambda x: x.strip().lower() if isinstance(x, str) else x)", "rows"),
+        ("df['data'] = pd.to_datetime(df['data'], format='%Y-%m-%d', errors='coerce')", "rows"),
+        ("df.columns = df.columns.str.strip().str.lower()\nif 'nome' in df.columns:\n    df = df.dropna()", "rows"),
+        ("df['soma'] = df[['id', 'idade']].sum(axis=1)", "rows"),
+        ("import re\ndf['id'] = df['id'].map(lambda x: re.sub(r'\\D', '', str(x))[:3])", "rows"),
+        ("df = df.drop_duplicates()\ndf = df.reset_index(drop=True)", "dedup"),
+        ("df = df.drop(columns=['idade'])\ndf = df.drop('id', axis=1)", "rows"),
+        ("df.loc[df['idade'] > 18, 'nome'] = 'adulto'", "rows"),
+        ("df = df[df['idade'].notna() & ~(df['nome'] == '')]", "rows"),
+        ("for coluna in ['nome']:\n    df[coluna] = df[coluna].str.strip()", "rows"),
+    ],
+)
+def test_row_wise_scripts(script, scope):
+    assert script_scope(script, COLUMNS) == scope
+
+
+def _upload(client, content: bytes) -> str:
+    response = client.post("/api/v1/upload", files={"file": ("dados.csv", content, "text/csv")})
+    assert response.status_code == 201
+    return response.json()["file_id"]
+
+
+def _processed(file_id: str) -> pd.DataFrame:
+    return pd.read_csv(csv_service._processed_path(file_id), sep=";")
+
+
+@pytest.mark.parametrize(
+    "script",
+    [
+        "m = max(df['id'].dropna())\ndf['id'] = df['id'].fillna(str(m + 1))",
+        "df['pos'] = df.index",
+        "df = df.drop(0)",
+        "df.loc[0, 'nome'] = 'X'",
+    ],
+)
+def test_dataset_wide_append_matches_full_execute(client, script):
+    first = b"id,nome,idade\n1,ana,20\n,bruno,30\n"
+    delta = b"id,nome,idade\n7,carla,40\n,davi,50\n"
+
+    file_id = _upload(client, first)
+    client.portal.call(pipeline_service.assign_script, file_id, script)
+    assert client.post(f"/api/v1/execute?file_id={file_id}").status_code == 200
+
+    response = client.post(
+        f"/api/v1/append/{file_id}", files={"file": ("delta.csv", delta, "text/csv")}
+    )
+    assert response.status_code == 200
+    assert response.json()["mode"] == "full"
+
+    expected_id = _upload(client, first + delta.split(b"\n", 1)[1])
+    client.portal.call(pipeline_service.assign_script, expected_id, script)
+    assert client.post(f"/api/v1/execute?file_id={expected_id}").status_code == 200
+    pd.testing.assert_frame_equal(_processed(file_id), _processed(expected_id))
+
+
+def test_row_wise_append_is_incremental(client):
+    script = "df['nome'] = df['nome'].str.upper()"
+    file_id = _upload(client, b"id,nome\n1,ana\n2,bruno\n")
+    client.portal.call(pipeline_service.assign_script, file_id, script)
+    assert client.post(f"/api/v1/execute?file_id={file_id}").status_code == 200
+
+    response = client.post(
+        f"/api/v1/append/{file_id}", files={"file": ("delta.csv", b"id,nome\n3,carla\n", "text/csv")}
+    )
+    assert response.json()["mode"] == "incremental"
+    assert response.json()["appended_rows"] == 1
+    assert response.json()["processed_rows"] == 3
+    assert _processed(file_id)["nome"].tolist() == ["ANA", "BRUNO", "CARLA"]
+
+
+def _csv_text(file_id: str) -> str:
+    return csv_service._processed_path(file_id).read_text(encoding="utf-8")
+
+
+@pytest.mark.parametrize(
+    "script",
+    [
+        "df['idade'] = pd.to_numeric(df['idade'], errors='coerce')",
+        "df['nome'] = df['nome'].str.upper()",
+    ],
+)
+def test_incremental_append_writes_the_same_csv_as_full_execute(client, script):
+    # "?" vira NaN na primeira carga (float64); o delta sozinho sairia int64
+    first = b"id,nome,idade\n1,ana,20\n2,bruno,?\n"
+    delta = b"id,nome,idade\n3,carla,40\n"
+
+    file_id = _upload(client, first)
+    client.portal.call(pipeline_service.assign_script, file_id, script)
+    assert client.post(f"/api/v1/execute?file_id={file_id}").status_code == 200
+    response = client.post(
+        f"/api/v1/append/{file_id}", files={"file": ("delta.csv", delta, "text/csv")}
+    )
+    assert response.json()["mode"] == "incremental"
+
+    expected_id = _upload(client, first + delta.split(b"\n", 1)[1])
+    client.portal.call(pipeline_service.assign_script, expected_id, script)
+    assert client.post(f"/api/v1/execute?file_id={expected_id}").status_code == 200
+    assert _csv_text(file_id) == _csv_text(expected_id)
+    result, expected = (client.get(f"/api/v1/result/{fid}").json() for fid in (file_id, expected_id))
+    assert {**result, "file_id": None} == {**expected, "file_id": None}
+
+
+def test_append_that_breaks_the_processed_dtypes_runs_full(client):
+    script = "df['idade'] = pd.to_numeric(df['idade'], errors='coerce')"
+    file_id = _upload(client, b"id,nome,idade\n1,ana,20\n2,bruno,30\n")
+    client.portal.call(pipeline_service.assign_script, file_id, script)
+    assert client.post(f"/api/v1/execute?file_id={file_id}").status_code == 200
+
+    # 40.5 não cabe na coluna int64 já processada
+    response = client.post(
+        f"/api/v1/append/{file_id}", files={"file": ("delta.csv", b"id,nome,idade\n3,carla,40.5\n", "text/csv")}
+    )
+    assert response.json()["mode"] == "full"
+    assert response.json()["appended_rows"] == 1
+    assert response.json()["processed_rows"] == 3
+    assert _processed(file_id)["idade"].tolist() == [20.0, 30.0, 40.5]
+
+
+def test_append_waits_for_the_lock_only_until_the_deadline(client, monkeypatch):
+    monkeypatch.setattr(settings, "APPEND_LOCK_WAIT_SECONDS", 0.3)
+    file_id = _upload(client, b"id,nome\n1,ana\n")
+    # lock órfão de um worker que morreu no meio do append
+    token = client.portal.call(cache_db.try_lock, f"append:{file_id}", 60)
+
+    response = client.post(
+        f"/api/v1/append/{file_id}", files={"file": ("delta.csv", b"id,nome\n2,bruno\n", "text/csv")}
+    )
+    assert response.status_code == 409
+
+    client.portal.call(cache_db.release_lock, f"append:{file_id}", token)
+    response = client.post(
+        f"/api/v1/append/{file_id}", files={"file": ("delta.csv", b"id,nome\n2,bruno\n", "text/csv")}
+    )
+    assert response.status_code == 200
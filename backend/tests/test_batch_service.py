@@ -0,0 +1,70 @@
+import io
+import zipfile
+
+import pytest
+from fastapi import UploadFile
+
+from backend.core.settings import settings
+from backend.services.batch_service import batch_service
+
+
+def _zip(members: dict[str, bytes]) -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        for name, data in members.items():
+            archive.writestr(name, data)
+    return buffer.getvalue()
+
+
+def _upload(name: str, content: bytes) -> UploadFile:
+    return UploadFile(file=io.BytesIO(content), filename=name)
+
+
+@pytest.fixture
+def no_decompression(monkeypatch):
+    # os limites têm que barrar o zip só pelo índice, sem descompactar nada
+    def read(self, *args, **kwargs):
+        raise AssertionError("member decompressed before the limits were checked")
+
+    monkeypatch.setattr(zipfile.ZipFile, "read", read)
+
+
+@pytest.mark.anyio
+async def test_zip_members_are_read_within_the_limits():
+    content = _zip({"a.csv": b"id\n1\n", "dir/b.csv": b"id\n2\n", "notes.txt": b"x", "__MACOSX/a.csv": b"x"})
+    entries = await batch_service.read_files([_upload("lote.zip", content)])
+    assert entries == [("a.csv", b"id\n1\n"), ("b.csv", b"id\n2\n")]
+
+
+@pytest.mark.anyio
+async def test_too_many_zip_members_fail_before_decompressing(monkeypatch, no_decompression):
+    monkeypatch.setattr(settings, "BATCH_MAX_FILES", 3)
+    content = _zip({f"{i}.csv": b"id\n1\n" for i in range(4)})
+    with pytest.raises(ValueError, match="max: 3 files,"):
+        await batch_service.read_files([_upload("lote.zip", content)])
+
+
+@pytest.mark.anyio
+async def test_zip_members_count_towards_files_already_read(monkeypatch, no_decompression):
+    monkeypatch.setattr(settings, "BATCH_MAX_FILES", 3)
+    content = _zip({f"{i}.csv": b"id\n1\n" for i in range(2)})
+    files = [_upload("a.csv", b"id\n1\n"), _upload("b.csv", b"id\n1\n"), _upload("lote.zip", content)]
+    with pytest.raises(ValueError, match="max: 3 files,"):
+        await batch_service.read_files(files)
+
+
+@pytest.mark.anyio
+async def test_declared_uncompressed_total_is_capped(monkeypatch, no_decompression):
+    monkeypatch.setattr(settings, "BATCH_MAX_BYTES", 1024 * 1024)
+    # comprime para poucos KB, mas declara 1.5MB descompactado
+    content = _zip({f"{i}.csv": b"0" * (512 * 1024) for i in range(3)})
+    assert len(content) < 64 * 1024
+    with pytest.raises(ValueError, match="uncompressed"):
+        await batch_service.read_files([_upload("lote.zip", content)])
+
+
+@pytest.mark.anyio
+async def test_size_errors_report_the_configured_limit(monkeypatch):
+    monkeypatch.setattr(settings, "MAX_FILE_SIZE", 4 * 1024 * 1024)
+    with pytest.raises(ValueError, match=r"^File big.csv is too large \(max: 4MB\)$"):
+        await batch_service.read_files([_upload("big.csv", b"0" * (5 * 1024 * 1024))])
@@ -0,0 +1,86 @@
+import fakeredis
+import pytest
+
+from backend.core.cache_db import RELEASE_LOCK_SCRIPT, InMemoryCacheDB, RedisCacheDB
+
+
+def _redis_cache_db() -> RedisCacheDB:
+    db = RedisCacheDB()
+    db.client = fakeredis.FakeAsyncRedis(decode_responses=True)
+    db._release_lock_script = db.client.register_script(RELEASE_LOCK_SCRIPT)
+    return db
+
+
+@pytest.fixture(params=["memory", "redis"])
+def cache_db(request):
+    return InMemoryCacheDB() if request.param == "memory" else _redis_cache_db()
+
+
+@pytest.mark.anyio
+async def test_lock_is_exclusive_until_released(cache_db):
+    token = await cache_db.try_lock("append:f", 60)
+    assert token
+    assert await cache_db.try_lock("append:f", 60) is None
+    assert await cache_db.release_lock("append:f", token)
+    assert await cache_db.try_lock("append:f", 60)
+
+
+@pytest.mark.anyio
+async def test_stale_token_does_not_release_new_owner(cache_db):
+    stale = await cache_db.try_lock("append:f", 60)
+    # simula a expiração do TTL e um segundo worker pegando o lock
+    if isinstance(cache_db, InMemoryCacheDB):
+        cache_db._locks.clear()
+    else:
+        await cache_db.client.delete("lock:append:f")
+    owner = await cache_db.try_lock("append:f", 60)
+    assert owner and owner != stale
+
+    assert not await cache_db.release_lock("append:f", stale)
+    assert await cache_db.try_lock("append:f", 60) is None
+    assert await cache_db.release_lock("append:f", owner)
+
+
+@pytest.mark.anyio
+async def test_memory_status_roundtrip():
+    db = InMemoryCacheDB()
+    await db.initialize_hash("f", uploaded=True)
+    await db.update_statuses("f", {"script_executed": True, "executed_script": "abc"})
+
+    assert await db.get_status("f") == {
+        "file_id": "f", "uploaded": True, "processed_by_llm": False,
+        "script_executed": True, "ready": False, "executed_script": "abc",
+    }
+    assert await db.get_statuses(["f", "missing"]) == [await db.get_status("f"), {}]
+    assert "f" in await db.get_last_access()
+
+    await db.purge("f")
+    assert await db.get_status("f") == {}
+    assert await db.get_last_access() == {}
+
+
+@pytest.mark.anyio
+async def test_memory_subscribe_receives_decoded_updates():
+    db = InMemoryCacheDB()
+    async with db.subscribe("f") as updates:
+        await db.update_status("f", "ready", True)
+        await db.update_statuses("other", {"ready": True})
+        assert updates.get_nowait() == {"ready": True}
+        assert updates.empty()
+    assert db._listeners == {}
+
+
+@pytest.mark.anyio
+async def test_memory_job_queue_is_fair_between_tenants():
+    db = InMemoryCacheDB()
+    await db.enqueue_job("a1", "a", 1, "normal")
+    await db.enqueue_job("a2", "a", 2, "normal")
+    await db.enqueue_job("a3", "a", 3, "normal")
+    await db.enqueue_job("b1", "b", 5, "high")
+    assert await db.get_queue_depths() == {"a": 3, "b": 1}
+
+    assert await db.cancel_job("a2")
+    assert not await db.cancel_job("a2")
+    assert [await db.dequeue_job(1) for _ in range(3)] == ["a1", "b1", "a3"]
+    assert await db.dequeue_job(0.01) is None
+    assert [priority for priority, _ in await db.get_wait_samples()] == ["normal", "high", "normal"]
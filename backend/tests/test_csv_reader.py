@@ -0,0 +1,58 @@
+import codecs
+
+import pandas as pd
+import pytest
+
+from backend.core import csv_reader
+from backend.core.csv_reader import CSVDialect, read_csv, sniff_dialect
+from backend.core.settings import settings
+
+
+def _write(tmp_path, content: bytes, name: str = "data.csv") -> str:
+    path = tmp_path / name
+    path.write_bytes(content)
+    return str(path)
+
+
+@pytest.mark.parametrize(
+    "content, expected",
+    [
+        (b"a,b\n1,2\n", CSVDialect()),
+        (b"a;b\n1;2\n3;4\n", CSVDialect(delimiter=";")),
+        (b"a\tb\n1\t2\n3\t4\n", CSVDialect(delimiter="\t")),
+        (codecs.BOM_UTF8 + b"a,b\n1,2\n", CSVDialect(encoding="utf-8-sig")),
+        ("nome,cidade\nJoão,São Paulo\n".encode("cp1252"), CSVDialect(encoding="cp1252")),
+        (b"1,2\n3,4\n5,6\n", CSVDialect(header=False, names=("column_1", "column_2"))),
+        (b'a,b\n1,"linha\nquebrada"\n', CSVDialect(multiline=True)),
+    ],
+)
+def test_sniff_dialect(tmp_path, content, expected):
+    assert sniff_dialect(_write(tmp_path, content)) == expected
+
+
+PARITY_CASES = {
+    "mixed": b"id,name,price,active,when\n1,a,1.5,true,2024-01-01\n2,,NA,false,2024-01-02\n",
+    "empty_column": b"a,b\n1,\n2,\n",
+    "headerless": b"1,2\n3,4\n5,6\n",
+    "duplicate_names": b"a,a\n1,2\n",
+    "big_int": b"a,b\n1,99999999999999999999\n2,3\n",
+    "uint64": b"a,b\n1,10000000000000000000\n2,3\n",
+    "big_float": b"a,b\n1,1.5\n2,1e20\n",
+}
+
+
+@pytest.mark.skipif(csv_reader.pa is None, reason="pyarrow not installed")
+@pytest.mark.parametrize("case", sorted(PARITY_CASES))
+def test_arrow_engine_matches_c_engine(tmp_path, monkeypatch, case):
+    path = _write(tmp_path, PARITY_CASES[case])
+    monkeypatch.setattr(settings, "CSV_ENGINE", "pyarrow")
+    arrow = read_csv(path)
+    monkeypatch.setattr(settings, "CSV_ENGINE", "c")
+    pd.testing.assert_frame_equal(arrow, read_csv(path))
+
+
+@pytest.mark.skipif(csv_reader.pa is None, reason="pyarrow not installed")
+def test_big_integers_keep_their_digits(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "CSV_ENGINE", "pyarrow")
+    df = read_csv(_write(tmp_path, b"a,b\n1,99999999999999999999\n"))
+    assert df["b"].tolist() == ["99999999999999999999"]
@@ -0,0 +1,67 @@
+import asyncio
+import json
+
+import pytest
+
+from backend.core.cache_db import cache_db
+from backend.core.settings import settings
+
+
+def _upload(client) -> str:
+    response = client.post("/api/v1/upload", files={"file": ("dados.csv", b"id\n1\n", "text/csv")})
+    assert response.status_code == 201
+    return response.json()["file_id"]
+
+
+def _events(client, file_id: str) -> list[tuple[str, dict]]:
+    response = client.get(f"/api/v1/status/{file_id}/stream")
+    assert response.status_code == 200
+    events = []
+    for block in response.text.split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines() if not line.startswith(":"))
+        if lines:
+            events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+@pytest.mark.parametrize("fields, reason", [
+    ({"ready": True}, "ready"),
+    ({"job_state": "done"}, "done"),
+    ({"job_state": "cancelled"}, "cancelled"),
+])
+def test_stream_ends_on_terminal_status(client, fields, reason):
+    file_id = _upload(client)
+    client.portal.call(cache_db.update_statuses, file_id, fields)
+
+    events = _events(client, file_id)
+    assert [event for event, _ in events] == ["status", "end"]
+    assert events[-1][1]["reason"] == reason
+
+
+def test_stream_reports_failure_pushed_while_open(client, monkeypatch):
+    monkeypatch.setattr(settings, "STATUS_STREAM_KEEPALIVE", 0.05)
+    file_id = _upload(client)
+
+    async def fail_later():
+        await asyncio.sleep(0.2)
+        await cache_db.update_statuses(file_id, {"job_state": "failed", "job_error": "boom"})
+
+    client.portal.start_task_soon(fail_later)
+    events = _events(client, file_id)
+    assert events[0][0] == "status" and "job_state" not in events[0][1]
+    assert events[-2] == ("status", {**events[0][1], "job_state": "failed", "job_error": "boom"})
+    assert events[-1] == ("end", {"reason": "failed", "job_error": "boom"})
+
+
+def test_stream_ends_after_deadline(client, monkeypatch):
+    monkeypatch.setattr(settings, "STATUS_STREAM_KEEPALIVE", 0.05)
+    monkeypatch.setattr(settings, "STATUS_STREAM_MAX_SECONDS", 0.2)
+    file_id = _upload(client)
+
+    events = _events(client, file_id)
+    assert [event for event, _ in events] == ["status", "end"]
+    assert events[-1][1] == {"reason": "timeout", "job_error": None}
+
+
+def test_stream_unknown_file(client):
+    assert client.get("/api/v1/status/missing/stream").status_code == 404
@@ -0,0 +1,128 @@
+import socket
+import uuid
+
+import pytest
+
+from backend.core.storage import LocalStorage, S3Storage, Storage
+
+boto3 = pytest.importorskip("boto3")
+moto_server = pytest.importorskip("moto.server")
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@pytest.fixture(scope="module")
+def s3_endpoint():
+    # servidor S3 local em HTTP, como um MinIO: exercita o endpoint_url de verdade
+    port = _free_port()
+    server = moto_server.ThreadedMotoServer(ip_address="127.0.0.1", port=port, verbose=False)
+    server.start()
+    yield f"http://127.0.0.1:{port}"
+    server.stop()
+
+
+@pytest.fixture
+def s3_bucket(s3_endpoint, monkeypatch):
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "test")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "test")
+    bucket = f"test-{uuid.uuid4().hex[:12]}"
+    boto3.client("s3", endpoint_url=s3_endpoint, region_name="us-east-1").create_bucket(Bucket=bucket)
+    return bucket
+
+
+def _s3_storage(root, endpoint: str, bucket: str) -> S3Storage:
+    storage = S3Storage(root, bucket=bucket, prefix="tenant", endpoint_url=endpoint, region="us-east-1")
+    storage.setup()
+    return storage
+
+
+@pytest.fixture(params=["local", "s3"])
+def storage(request, tmp_path):
+    if request.param == "local":
+        storage = LocalStorage(tmp_path)
+        storage.setup()
+        return storage
+    endpoint = request.getfixturevalue("s3_endpoint")
+    return _s3_storage(tmp_path, endpoint, request.getfixturevalue("s3_bucket"))
+
+
+async def _chunks(*parts: bytes):
+    for part in parts:
+        yield part
+
+
+def test_storage_is_abstract(tmp_path):
+    with pytest.raises(TypeError):
+        Storage(tmp_path)
+
+
+@pytest.mark.anyio
+async def test_write_and_fetch(storage):
+    await storage.write_bytes("upload/a.csv", b"a,b\n1,2\n")
+    assert await storage.exists("upload/a.csv")
+    path = await storage.fetch("upload/a.csv")
+    assert path.read_bytes() == b"a,b\n1,2\n"
+
+    assert await storage.write_stream("upload/b.csv", _chunks(b"a,b\n", b"3,4\n")) == 8
+    assert (await storage.fetch("upload/b.csv")).read_bytes() == b"a,b\n3,4\n"
+
+
+@pytest.mark.anyio
+async def test_missing_object(storage):
+    assert not await storage.exists("upload/missing.csv")
+    assert await storage.fetch("upload/missing.csv") is None
+
+
+@pytest.mark.anyio
+async def test_list_and_delete(storage):
+    await storage.write_bytes("upload/a.csv", b"1")
+    await storage.write_bytes("upload/ab.csv", b"22")
+    await storage.write_bytes("processed/a_processed.csv", b"333")
+
+    objects = await storage.list_objects("upload/a")
+    assert sorted((o.key, o.size) for o in objects) == [("upload/a.csv", 1), ("upload/ab.csv", 2)]
+
+    await storage.delete("upload/a.csv")
+    assert not await storage.exists("upload/a.csv")
+    assert [o.key for o in await storage.list_objects("upload/")] == ["upload/ab.csv"]
+
+
+@pytest.mark.anyio
+async def test_failed_write_keeps_previous_content(storage):
+    await storage.write_bytes("upload/a.csv", b"old")
+    with pytest.raises(TypeError):
+        await storage.write_bytes("upload/a.csv", "not bytes")
+    assert (await storage.fetch("upload/a.csv")).read_bytes() == b"old"
+    assert not list(storage.path("upload").glob("*.tmp"))
+
+
+@pytest.mark.anyio
+async def test_s3_replicas_see_each_others_writes(tmp_path, s3_endpoint, s3_bucket):
+    writer = _s3_storage(tmp_path / "writer", s3_endpoint, s3_bucket)
+    reader = _s3_storage(tmp_path / "reader", s3_endpoint, s3_bucket)
+
+    await writer.write_bytes("processed/a_processed.csv", b"v1")
+    assert (await reader.fetch("processed/a_processed.csv")).read_bytes() == b"v1"
+
+    await writer.write_bytes("processed/a_processed.csv", b"version 2")
+    reader._verified.clear()
+    assert (await reader.fetch("processed/a_processed.csv")).read_bytes() == b"version 2"
+
+    await writer.delete("processed/a_processed.csv")
+    reader._verified.clear()
+    assert await reader.fetch("processed/a_processed.csv") is None
+    assert not reader.path("processed/a_processed.csv").exists()
+
+
+@pytest.mark.anyio
+async def test_s3_multipart_upload(tmp_path, s3_endpoint, s3_bucket):
+    storage = _s3_storage(tmp_path, s3_endpoint, s3_bucket)
+    data = bytes(range(256)) * (6 * 1024 * 1024 // 256)  # acima da parte mínima de 5MB
+    await storage.write_bytes("upload/big.csv", data)
+
+    reader = _s3_storage(tmp_path / "reader", s3_endpoint, s3_bucket)
+    assert (await reader.fetch("upload/big.csv")).read_bytes() == data
@@ -62,7 +62,7 @@ export default function Home() {
     toast.success(`File ${response.filename} with id: ${response.file_id}`);
     setIsLoading(false);
     setFile(null);
-    fetchStatus(response.file_id);
+    subscribeStatus(response.file_id);
     handleProcess(response.file_id);
   };
 
@@ -81,7 +81,6 @@ export default function Home() {
       }
 
       toast.success(`${response.message}`);
-      fetchStatus(fileId);
       handleExecute(fileId);
     } catch (e) {
       toast.error(`Error when trying to process the file - message: ${e}`);
@@ -101,7 +100,6 @@ export default function Home() {
       toast.success(
         `${response.message} - Processed Rows: ${response.processed_rows}`
       );
-      fetchStatus(fileId);
       handleResult(fileId);
     } catch (e) {
       toast.error(`Error when trying to execute the script - message: ${e}`);
@@ -117,7 +115,6 @@ export default function Home() {
       }
 
       setResult(response);
-      fetchStatus(fileId);
     } catch (err) {
       toast.error(`Error when trying to get the results - message: ${err}`);
     }
@@ -138,6 +135,30 @@ export default function Home() {
     }
   };
 
+  const subscribeStatus = (fileId: string) => {
+    setStatusLoading(true);
+    apiClient.streamStatus(
+      fileId,
+      (status) => {
+        setStatusProcess(status);
+        setError(null);
+        setStatusLoading(false);
+      },
+      // sem SSE (proxy, rede), cai para uma leitura pontual do status
+      () => fetchStatus(fileId),
+      (end) => {
+        setStatusLoading(false);
+        if (end.reason === "failed" || end.reason === "cancelled") {
+          const message =
+            end.reason === "failed"
+              ? "Processamento falhou"
+              : "Processamento cancelado";
+          setError(end.job_error ? `${message}: ${end.job_error}` : message);
+        }
+      }
+    );
+  };
+
   const handleDownload = async (file_id: string | undefined) => {
     if (!file_id) return;
 
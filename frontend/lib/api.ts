@@ -1,9 +1,12 @@
 import {
   APIError,
+  DiffResponse,
+  DiffStatus,
   ExecuteResponse,
   ProcessResponse,
   ResultResponse,
   StatusProcess,
+  StatusStreamEnd,
   UploadResponse,
 } from "@/types";
 
@@ -44,6 +47,41 @@ class APIClient {
     return this.handleResponse<StatusProcess>(response);
   }
 
+  streamStatus(
+    fileId: string,
+    onStatus: (status: StatusProcess) => void,
+    onError?: () => void,
+    onEnd?: (end: StatusStreamEnd) => void
+  ): () => void {
+    let source: EventSource;
+    const connect = () => {
+      source = new EventSource(
+        `${this.baseUrl}/api/v1/status/${fileId}/stream`
+      );
+
+      source.addEventListener("status", (event) => {
+        onStatus(JSON.parse((event as MessageEvent).data));
+      });
+      // o servidor sempre encerra com "end"; no prazo máximo da conexão, reconecta
+      source.addEventListener("end", (event) => {
+        const end: StatusStreamEnd = JSON.parse((event as MessageEvent).data);
+        source.close();
+        if (end.reason === "timeout") {
+          connect();
+        } else {
+          onEnd?.(end);
+        }
+      });
+      source.onerror = () => {
+        source.close();
+        onError?.();
+      };
+    };
+    connect();
+
+    return () => source.close();
+  }
+
   async getScript(fileId: string): Promise<Blob> {
     const response = await fetch(`${this.baseUrl}/api/v1/script/${fileId}`);
     if (!response.ok) {
@@ -100,6 +138,23 @@ class APIClient {
     const response = await fetch(`${this.baseUrl}/api/v1/result/${fileId}`);
     return this.handleResponse<ResultResponse>(response);
   }
+
+  async diff(
+    fileId: string,
+    page: number = 1,
+    status: DiffStatus = "all",
+    pageSize: number = 100
+  ): Promise<DiffResponse> {
+    const params = new URLSearchParams({
+      page: String(page),
+      page_size: String(pageSize),
+      status,
+    });
+    const response = await fetch(
+      `${this.baseUrl}/api/v1/diff/${fileId}?${params}`
+    );
+    return this.handleResponse<DiffResponse>(response);
+  }
 }
 
 export const apiClient = new APIClient();
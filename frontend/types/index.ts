@@ -42,10 +42,51 @@ export interface ResultResponse {
   rows_count: number;
 }
 
+export type DiffStatus = "all" | "changed" | "added" | "dropped";
+
+export interface DiffRecord {
+  status: "changed" | "added" | "dropped";
+  row: number | null;
+  original_row: number | null;
+  columns: string[];
+  before: (string | null)[] | null;
+  after: (string | null)[] | null;
+}
+
+export interface DiffResponse {
+  file_id: string;
+  message: string;
+  alignment: "key" | "lineage" | "position" | "content";
+  key: string[] | null;
+  original_rows: number;
+  processed_rows: number;
+  changed_rows: number;
+  added_rows: number;
+  dropped_rows: number;
+  changed_cells: number;
+  column_changes: Record<string, number>;
+  added_columns: string[];
+  dropped_columns: string[];
+  renamed_columns: Record<string, string>;
+  status: DiffStatus;
+  page: number;
+  page_size: number;
+  total: number;
+  records: DiffRecord[];
+}
+
 export interface StatusProcess {
   file_id: string;
   uploaded: boolean;
   processed_by_llm: boolean;
   script_executed: boolean;
   ready: boolean;
+  job_state?: string;
+  job_error?: string;
+}
+
+// último evento do SSE de status; "timeout" só fecha a conexão, o job segue rodando
+export interface StatusStreamEnd {
+  reason: "ready" | "done" | "failed" | "cancelled" | "timeout";
+  job_error: string | null;
 }
\ No newline at end of file